@@ -0,0 +1,13 @@
+"""Performance benchmarks on deterministic synthetic inputs.
+
+Run from the repository root::
+
+    python -m benchmarks list
+    python -m benchmarks run --quick            # smallest size of every case
+    python -m benchmarks run -k 'sbom.*,lock.*' --compare
+    python -m benchmarks compare --base v0.1.0
+
+Results (median wall time, peak RSS, tracemalloc peak) are appended to
+``results/bench/history.jsonl``; ``compare`` exits with 1 when a case got
+slower or bigger than ``--threshold`` so it can gate CI.
+"""
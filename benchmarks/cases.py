@@ -0,0 +1,218 @@
+"""Benchmark cases: each prepares its input once and returns the callable to time."""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+from . import generators as gen
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+@dataclass(frozen=True)
+class Case:
+    name: str
+    # (work 目录, 规模) -> 被计时的无参函数；输入生成与加载都在这里完成，不计入耗时
+    setup: Callable[[Path, int], Callable[[], Any]]
+    sizes: tuple[int, ...]
+    unit: str
+    description: str
+    # 被测代码在子进程中运行：峰值 RSS 取子进程的，不统计 tracemalloc
+    in_child: bool = False
+    # 中位耗时的绝对上限（秒）；超出时 run 的退出码为 1，与历史记录无关
+    budget: float | None = None
+
+
+def _detect_dir(work: Path, size: int) -> Callable[[], Any]:
+    from unified_sca.detect import detect_project_types
+
+    tree = gen.ensure_tree(work, size)
+    return lambda: detect_project_types(tree)
+
+
+def _detect_zip(work: Path, size: int) -> Callable[[], Any]:
+    from unified_sca.detect import detect_fs
+    from unified_sca.vfs import open_archive_fs
+
+    zp = gen.ensure_zip(work, size)
+
+    def run() -> Any:
+        with open_archive_fs(zp) as fs:
+            return detect_fs(fs)
+
+    return run
+
+
+def _extract_zip(work: Path, size: int) -> Callable[[], Any]:
+    from unified_sca.zip_utils import safe_extract_zip
+
+    zp = gen.ensure_zip(work, size)
+    out = work / f"extract-{size}"
+
+    def run() -> Any:
+        shutil.rmtree(out, ignore_errors=True)
+        return safe_extract_zip(zp, out)
+
+    return run
+
+
+def _sbom_npm(work: Path, size: int) -> Callable[[], Any]:
+    from sca_tools.analyzers.javascript_npm import _build_sbom_from_package_lock
+
+    lock = json.loads(gen.ensure_file(work, "npm", size).read_bytes())
+    return lambda: _build_sbom_from_package_lock(lock)
+
+
+def _sbom_npm_stream(work: Path, size: int) -> Callable[[], Any]:
+    from sca_tools.analyzers.javascript_npm import _build_sbom_from_lock_events, _iter_lock_events_stream
+
+    path = gen.ensure_file(work, "npm", size)
+
+    def run() -> Any:
+        with open(path, "rb") as fp:
+            return _build_sbom_from_lock_events(_iter_lock_events_stream(fp))
+
+    return run
+
+
+def _lock_reader(kind: str, *, full: bool) -> Callable[[Path, int], Callable[[], Any]]:
+    def setup(work: Path, size: int) -> Callable[[], Any]:
+        from sca_tools.tomllock import load_lock, load_toml
+
+        data = gen.ensure_file(work, kind, size).read_bytes()
+        return (lambda: load_toml(data)) if full else (lambda: load_lock(data))
+
+    return setup
+
+
+def _sbom_cargo(work: Path, size: int) -> Callable[[], Any]:
+    from sca_tools.analyzers.rust_cargo import _build_sbom_from_cargo_lock
+    from sca_tools.tomllock import load_lock
+
+    lock = load_lock(gen.ensure_file(work, "cargo", size).read_bytes())
+    return lambda: _build_sbom_from_cargo_lock(lock, project_name="bench")
+
+
+def _sbom_python_uv(work: Path, size: int) -> Callable[[], Any]:
+    from sca_tools.analyzers.python_pyproject import _build_sbom, _extract_packages_from_toml_lock
+    from sca_tools.tomllock import load_lock
+
+    lock = load_lock(gen.ensure_file(work, "uv", size).read_bytes())
+    project = {"name": "bench", "version": "1.0.0"}
+    return lambda: _build_sbom(project, _extract_packages_from_toml_lock(lock))
+
+
+def _sbom_python_requirements(work: Path, size: int) -> Callable[[], Any]:
+    from sca_tools.analyzers.python_pyproject import _build_sbom, _parse_requirements_lock
+
+    text = gen.ensure_file(work, "requirements", size).read_text(encoding="utf-8")
+    project = {"name": "bench", "version": "1.0.0"}
+    return lambda: _build_sbom(project, _parse_requirements_lock(text))
+
+
+def _go_sum(work: Path, size: int) -> Callable[[], Any]:
+    from sca_tools.analyzers.go_mod import parse_go_sum
+
+    text = gen.ensure_file(work, "gosum", size).read_text(encoding="utf-8")
+    return lambda: parse_go_sum(text)
+
+
+def _sbom_go(work: Path, size: int) -> Callable[[], Any]:
+    from sca_tools.analyzers.go_mod import _build_sbom_from_go, parse_go_mod, parse_go_sum
+
+    mod_text = gen.ensure_file(work, "gomod", size).read_text(encoding="utf-8")
+    sum_text = gen.ensure_file(work, "gosum", size).read_text(encoding="utf-8")
+    return lambda: _build_sbom_from_go(parse_go_mod(mod_text), parse_go_sum(sum_text), "bench")
+
+
+def _sbom_maven(warm: bool) -> Callable[[Path, int], Callable[[], Any]]:
+    def setup(work: Path, size: int) -> Callable[[], Any]:
+        from sca_tools.analyzers.java_maven import PomCache, _build_sbom_from_maven, resolve_build
+
+        project, repo = gen.ensure_maven(work, size)
+        shared = PomCache()
+
+        def _read(rel: str) -> bytes | None:
+            path = project / rel
+            return path.read_bytes() if path.is_file() else None
+
+        def run() -> Any:
+            resolver, graph, _modules = resolve_build("pom.xml", _read, repo=repo, pom_cache=shared if warm else PomCache())
+            return _build_sbom_from_maven(graph, resolver.project_model("pom.xml"), "bench")
+
+        return run
+
+    return setup
+
+
+def _write_json(fmt: str) -> Callable[[Path, int], Callable[[], Any]]:
+    def setup(work: Path, size: int) -> Callable[[], Any]:
+        from sca_tools.analyzers.javascript_npm import _build_sbom_from_package_lock
+        from sca_tools.utils import sbom_file_name, write_json
+
+        sbom = _build_sbom_from_package_lock(json.loads(gen.ensure_file(work, "npm", size).read_bytes()))
+        out = work / f"write-{size}" / sbom_file_name(fmt)
+        return lambda: write_json(out, sbom, fmt=fmt)
+
+    return setup
+
+
+def _startup(*argv: str) -> Callable[[Path, int], Callable[[], Any]]:
+    def setup(work: Path, size: int) -> Callable[[], Any]:
+        code = "import sys; from unified_sca.cli import main; raise SystemExit(main(sys.argv[1:]))"
+        cmd = [sys.executable, "-c", code, *argv]
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(p for p in (str(REPO_ROOT), os.environ.get("PYTHONPATH")) if p))
+        return lambda: subprocess.run(cmd, env=env, stdout=subprocess.DEVNULL, check=True)
+
+    return setup
+
+
+CASES: dict[str, Case] = {
+    c.name: c
+    for c in (
+        Case("detect.dir", _detect_dir, (1_000, 10_000), "dirs", "detect_project_types 下钻深层目录树"),
+        Case("detect.zip", _detect_zip, (1_000, 10_000), "dirs", "detect_fs 识别 zip（成员索引，不解压）"),
+        Case("extract.zip", _extract_zip, (1_000, 10_000), "dirs", "safe_extract_zip 完整解压"),
+        Case("sbom.npm", _sbom_npm, (1_000, 10_000, 100_000), "nodes", "_build_sbom_from_package_lock（已解析的 lock）"),
+        Case("sbom.npm-stream", _sbom_npm_stream, (1_000, 10_000, 100_000), "nodes", "流式读取 package-lock.json 并生成 SBOM"),
+        Case("lock.cargo", _lock_reader("cargo", full=False), (1_500, 15_000), "packages", "tomllock.load_lock 读取 Cargo.lock"),
+        Case("lock.cargo-tomllib", _lock_reader("cargo", full=True), (1_500, 15_000), "packages", "tomllib 完整解析 Cargo.lock（对照）"),
+        Case("lock.uv", _lock_reader("uv", full=False), (1_500, 15_000), "packages", "tomllock.load_lock 读取 uv.lock"),
+        Case("lock.uv-tomllib", _lock_reader("uv", full=True), (1_500, 15_000), "packages", "tomllib 完整解析 uv.lock（对照）"),
+        Case("sbom.cargo", _sbom_cargo, (1_500, 15_000), "packages", "_build_sbom_from_cargo_lock（深依赖列表）"),
+        Case("sbom.python-uv", _sbom_python_uv, (1_500, 15_000), "packages", "uv.lock -> _build_sbom"),
+        Case("sbom.python-requirements", _sbom_python_requirements, (1_500, 15_000), "packages", "requirements.lock -> _build_sbom"),
+        Case("lock.go-sum", _go_sum, (1_000, 10_000), "modules", "parse_go_sum（每模块 2-5 行，10k 模块约 3.5 万行）"),
+        Case("sbom.go", _sbom_go, (1_000, 10_000), "modules", "go.mod + go.sum 解析并生成 SBOM"),
+        Case("sbom.maven", _sbom_maven(False), (1_000, 5_000), "artifacts", "多模块 pom.xml + 本地仓库解析依赖图（POM 缓存为空）"),
+        Case("sbom.maven-warm", _sbom_maven(True), (1_000, 5_000), "artifacts", "同上，仓库 POM 已在进程内缓存"),
+        Case("write.json", _write_json("json"), (10_000, 100_000), "components", "write_json 缩进格式"),
+        Case("write.json-compact", _write_json("json-compact"), (10_000, 100_000), "components", "write_json 紧凑格式"),
+        Case("write.json.gz", _write_json("json.gz"), (10_000, 100_000), "components", "write_json gzip 格式"),
+        Case(
+            "startup.detect-help",
+            _startup("detect", "--help"),
+            (1,),
+            "runs",
+            "子进程执行 sca detect --help（含解释器启动与模块导入）",
+            in_child=True,
+            budget=0.25,
+        ),
+        Case(
+            "startup.detect",
+            _startup("detect", str(REPO_ROOT / "test_project" / "javascript" / "rich_npm")),
+            (1,),
+            "runs",
+            "子进程执行 sca detect（含解释器启动与模块导入）",
+            in_child=True,
+            budget=0.25,
+        ),
+    )
+}
@@ -0,0 +1,364 @@
+"""Deterministic synthetic inputs: large locks, deep trees and zips.
+
+Every generator takes a size and a seed and produces the same bytes for the
+same arguments, so timings from different versions compare like for like.
+``ensure_*`` helpers write to ``<work>/<kind>-<size>-s<seed>`` once and reuse
+the file on later runs.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import random
+import zipfile
+from pathlib import Path
+from typing import Any, Callable
+
+DEFAULT_SEED = 20240601
+
+
+def _names(rng: random.Random, n: int, *, scoped: float = 0.0) -> list[str]:
+    out: list[str] = []
+    seen: set[str] = set()
+    while len(out) < n:
+        base = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 10)))
+        name = f"{base}-{len(out)}"
+        if scoped and rng.random() < scoped:
+            name = f"@{base[:4]}/{name}"
+        if name not in seen:
+            seen.add(name)
+            out.append(name)
+    return out
+
+
+def _version(rng: random.Random) -> str:
+    return f"{rng.randint(0, 12)}.{rng.randint(0, 40)}.{rng.randint(0, 20)}"
+
+
+def _hash(rng: random.Random) -> str:
+    return f"{rng.getrandbits(256):064x}"
+
+
+def npm_lock(n: int, *, seed: int = DEFAULT_SEED) -> dict[str, Any]:
+    """lockfileVersion 3 with ``n`` nodes; ~10% are nested duplicates with another version."""
+    rng = random.Random(seed)
+    names = _names(rng, max(1, int(n * 0.9)), scoped=0.15)
+    packages: dict[str, Any] = {
+        "": {"name": "bench-app", "version": "1.0.0", "dependencies": {m: "^1.0.0" for m in names[:20]}}
+    }
+    paths: list[tuple[str, str]] = []
+    for name in names:
+        paths.append((f"node_modules/{name}", name))
+    while len(paths) < n:
+        parent = rng.choice(names)
+        child = rng.choice(names)
+        path = f"node_modules/{parent}/node_modules/{child}"
+        paths.append((path, child))
+    for path, name in paths:
+        version = _version(rng)
+        entry: dict[str, Any] = {
+            "version": version,
+            "resolved": f"https://registry.npmjs.org/{name}/-/{name.rsplit('/', 1)[-1]}-{version}.tgz",
+            "integrity": f"sha512-{_hash(rng)}",
+        }
+        deps = rng.sample(names, k=min(len(names), rng.randint(0, 6)))
+        if deps:
+            entry["dependencies"] = {d: f"^{_version(rng)}" for d in deps}
+        if rng.random() < 0.1:
+            entry["dev"] = True
+        packages[path] = entry
+    return {"name": "bench-app", "version": "1.0.0", "lockfileVersion": 3, "requires": True, "packages": packages}
+
+
+def cargo_lock(n: int, *, seed: int = DEFAULT_SEED, max_deps: int = 12) -> str:
+    """Cargo.lock v3 with ``n`` packages; dependencies point at earlier packages, giving deep chains."""
+    rng = random.Random(seed)
+    names = _names(rng, n)
+    versions = {name: _version(rng) for name in names}
+    # 少量同名多版本，依赖项需写成 "name version"
+    dup = set(rng.sample(names, k=n // 20))
+    lines = ["# This file is automatically @generated by Cargo.", "# It is not intended for manual editing.", "version = 3", ""]
+    for i, name in enumerate(names):
+        entries = [(name, versions[name])]
+        if name in dup:
+            entries.append((name, _version(rng)))
+        for pname, pver in entries:
+            lines += ["[[package]]", f'name = "{pname}"', f'version = "{pver}"']
+            if i:
+                lines.append('source = "registry+https://github.com/rust-lang/crates.io-index"')
+                lines.append(f'checksum = "{_hash(rng)}"')
+            deps = sorted(set(rng.sample(names[:i], k=min(i, rng.randint(0, max_deps)))))
+            if deps:
+                lines.append("dependencies = [")
+                lines += [f' "{d} {versions[d]}",' if d in dup else f' "{d}",' for d in deps]
+                lines.append("]")
+            lines.append("")
+    return "\n".join(lines)
+
+
+def uv_lock(n: int, *, seed: int = DEFAULT_SEED) -> str:
+    """uv.lock (revision 2) with sdist/wheel tables and ``[package.metadata]`` sections."""
+    rng = random.Random(seed)
+    names = _names(rng, n)
+    lines = [
+        "version = 1",
+        "revision = 2",
+        'requires-python = ">=3.9"',
+        "resolution-markers = [",
+        '    "sys_platform == \'win32\'",',
+        '    "sys_platform != \'win32\'",',
+        "]",
+        "",
+    ]
+    for i, name in enumerate(names):
+        version = _version(rng)
+        lines += ["[[package]]", f'name = "{name}"', f'version = "{version}"']
+        lines.append('source = { registry = "https://pypi.org/simple" }')
+        deps = rng.sample(names[:i], k=min(i, rng.randint(0, 5)))
+        if deps:
+            lines.append("dependencies = [")
+            for d in deps:
+                marker = ', marker = "sys_platform == \'linux\'"' if rng.random() < 0.2 else ""
+                lines.append(f'    {{ name = "{d}"{marker} }},')
+            lines.append("]")
+        url = f"https://files.pythonhosted.org/packages/{_hash(rng)[:2]}/{name}"
+        lines.append(
+            f'sdist = {{ url = "{url}/{name}-{version}.tar.gz", hash = "sha256:{_hash(rng)}", size = {rng.randint(1000, 999999)} }}'
+        )
+        lines.append("wheels = [")
+        for tag in rng.sample(["py3-none-any", "cp311-cp311-manylinux_2_17_x86_64", "cp312-cp312-win_amd64"], k=rng.randint(1, 3)):
+            lines.append(
+                f'    {{ url = "{url}/{name}-{version}-{tag}.whl", hash = "sha256:{_hash(rng)}", size = {rng.randint(1000, 999999)} }},'
+            )
+        lines.append("]")
+        if deps and rng.random() < 0.3:
+            lines += ["", "[package.metadata]", "requires-dist = ["]
+            lines += [f'    {{ name = "{d}", specifier = ">=1.0" }},' for d in deps]
+            lines.append("]")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def requirements_lock(n: int, *, seed: int = DEFAULT_SEED) -> str:
+    """Pinned ``requirements.lock`` (uv pip compile style) with ``# via`` comments."""
+    rng = random.Random(seed)
+    names = _names(rng, n)
+    lines = ["# This file was autogenerated by uv via the following command:", "#    uv pip compile pyproject.toml -o requirements.lock"]
+    for i, name in enumerate(names):
+        lines.append(f"{name}=={_version(rng)}")
+        if i:
+            lines.append(f"    # via {names[rng.randrange(i)]}")
+    return "\n".join(lines) + "\n"
+
+
+def _go_modules(n: int, seed: int) -> list[tuple[str, str, list[str]]]:
+    """(module path, selected version, older versions only pinned by ``/go.mod`` lines)."""
+    rng = random.Random(seed)
+    hosts = ("github.com", "golang.org/x", "gopkg.in", "go.uber.org", "k8s.io")
+    out: list[tuple[str, str, list[str]]] = []
+    for name in _names(rng, n):
+        host = rng.choice(hosts)
+        path = f"{host}/{name[:4]}/{name}" if host == "github.com" else f"{host}/{name}"
+        version = f"v{_version(rng)}"
+        if rng.random() < 0.1:
+            version = f"v0.0.0-2023{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}120000-{_hash(rng)[:12]}"
+        older = [f"v{_version(rng)}" for _ in range(rng.randint(0, 3))]
+        out.append((path, version, older))
+    return out
+
+
+def go_mod(n: int, *, seed: int = DEFAULT_SEED) -> str:
+    """go 1.21 ``go.mod``: a direct and an ``// indirect`` require block, some replaces."""
+    mods = _go_modules(n, seed)
+    lines = ["module example.com/bench", "", "go 1.21", "", "require ("]
+    lines += [f"\t{path} {version}" for path, version, _ in mods[: max(1, n // 10)]]
+    lines += [")", "", "require ("]
+    lines += [f"\t{path} {version} // indirect" for path, version, _ in mods[max(1, n // 10) :]]
+    lines += [")", ""]
+    lines += [f"replace {path} => {path}-fork {version}" for path, version, _ in mods[::50]]
+    return "\n".join(lines) + "\n"
+
+
+def go_sum(n: int, *, seed: int = DEFAULT_SEED) -> str:
+    """``go.sum`` for ``go_mod(n)``: zip + ``/go.mod`` lines, extra ``/go.mod`` lines for older versions."""
+    rng = random.Random(seed + 1)
+    lines: list[str] = []
+    for path, version, older in _go_modules(n, seed):
+        for v in older:
+            lines.append(f"{path} {v}/go.mod h1:{_hash(rng)[:43]}=")
+        lines.append(f"{path} {version} h1:{_hash(rng)[:43]}=")
+        lines.append(f"{path} {version}/go.mod h1:{_hash(rng)[:43]}=")
+    return "\n".join(lines) + "\n"
+
+
+def _pom(coords: str, body: str) -> str:
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n<project xmlns="http://maven.apache.org/POM/4.0.0">\n'
+        f"  <modelVersion>4.0.0</modelVersion>\n{coords}{body}</project>\n"
+    )
+
+
+def _pom_dep(group: str, artifact: str, version: str | None = None, extra: str = "") -> str:
+    v = f"<version>{version}</version>" if version else ""
+    return f"    <dependency><groupId>{group}</groupId><artifactId>{artifact}</artifactId>{v}{extra}</dependency>\n"
+
+
+def maven_build(root: Path, n: int, *, seed: int = DEFAULT_SEED, modules: int = 10) -> tuple[Path, Path]:
+    """(project, local repository): ``n`` artifacts, each depending on up to 6 earlier ones.
+
+    Every artifact inherits a shared parent POM whose versions come from an
+    imported BOM, as in real repositories; the project has ``modules``
+    modules (each with a padded ``<build>`` section) depending on the newest
+    artifacts, so resolution walks most of the repository.
+    """
+    rng = random.Random(seed)
+    repo = root / "repository"
+    names = _names(rng, n)
+    groups = [f"org.{names[i % len(names)][:6]}.g{i % 17}" for i in range(n)]
+    versions = [_version(rng) for _ in range(n)]
+
+    def _write(group: str, artifact: str, version: str, text: str) -> None:
+        d = repo.joinpath(*group.split("."), artifact, version)
+        d.mkdir(parents=True, exist_ok=True)
+        (d / f"{artifact}-{version}.pom").write_text(text, encoding="utf-8")
+
+    managed = "".join(_pom_dep(groups[i], names[i], versions[i]) for i in range(n))
+    _write(
+        "org.bench", "bench-bom", "1.0",
+        _pom("  <groupId>org.bench</groupId><artifactId>bench-bom</artifactId><version>1.0</version>\n",
+             f"  <packaging>pom</packaging>\n  <dependencyManagement><dependencies>\n{managed}  </dependencies></dependencyManagement>\n"),
+    )
+    _write(
+        "org.bench", "bench-parent", "1.0",
+        _pom("  <groupId>org.bench</groupId><artifactId>bench-parent</artifactId><version>1.0</version>\n",
+             "  <packaging>pom</packaging>\n  <properties><bench.bom>1.0</bench.bom></properties>\n"
+             "  <dependencyManagement><dependencies>\n"
+             + _pom_dep("org.bench", "bench-bom", "${bench.bom}", "<type>pom</type><scope>import</scope>")
+             + "  </dependencies></dependencyManagement>\n"),
+    )
+    parent = "  <parent><groupId>org.bench</groupId><artifactId>bench-parent</artifactId><version>1.0</version></parent>\n"
+    for i in range(n):
+        deps = "".join(
+            _pom_dep(groups[j], names[j], None, "<scope>test</scope>" if rng.random() < 0.1 else "")
+            for j in sorted(rng.sample(range(i), min(i, rng.randint(0, 6))))
+        )
+        _write(
+            groups[i], names[i], versions[i],
+            _pom(f"{parent}  <groupId>{groups[i]}</groupId><artifactId>{names[i]}</artifactId><version>{versions[i]}</version>\n",
+                 f"  <dependencies>\n{deps}  </dependencies>\n"),
+        )
+
+    project = root / "project"
+    build = "  <build><plugins>\n" + "".join(
+        f"    <plugin><artifactId>plugin-{k}</artifactId><configuration><x>{'y' * 200}</x></configuration></plugin>\n"
+        for k in range(50)
+    ) + "  </plugins></build>\n"
+    mods = "".join(f"    <module>m{k}</module>\n" for k in range(modules))
+    project.mkdir(parents=True, exist_ok=True)
+    (project / "pom.xml").write_text(
+        _pom(f"{parent}  <groupId>org.app</groupId><artifactId>app</artifactId><version>1.0.0</version>\n",
+             f"  <packaging>pom</packaging>\n  <modules>\n{mods}  </modules>\n{build}"),
+        encoding="utf-8",
+    )
+    for k in range(modules):
+        deps = "".join(_pom_dep(groups[j], names[j]) for j in rng.sample(range(max(0, n - n // 5), n), min(n, 10)))
+        (project / f"m{k}").mkdir(exist_ok=True)
+        (project / f"m{k}" / "pom.xml").write_text(
+            _pom("  <parent><groupId>org.app</groupId><artifactId>app</artifactId><version>1.0.0</version></parent>\n"
+                 f"  <artifactId>m{k}</artifactId>\n",
+                 f"  <dependencies>\n{deps}  </dependencies>\n{build}"),
+            encoding="utf-8",
+        )
+    return project, repo
+
+
+def project_tree(root: Path, n_dirs: int, *, seed: int = DEFAULT_SEED, fanout: int = 6) -> Path:
+    """A tree of ``n_dirs`` directories with filler files and pruned dirs; markers sit at depth 4."""
+    rng = random.Random(seed)
+    root.mkdir(parents=True, exist_ok=True)
+    level = [root]
+    made = 0
+    depth = 0
+    while made < n_dirs and level:
+        nxt: list[Path] = []
+        for d in level:
+            for j in range(fanout):
+                if made >= n_dirs:
+                    break
+                sub = d / (rng.choice(["src", "lib", "docs", "assets", "node_modules", "target", "pkg"]) + f"_{j}")
+                if j == 0 and depth < 2:
+                    sub = d / "node_modules"
+                sub.mkdir(exist_ok=True)
+                made += 1
+                for k in range(rng.randint(1, 4)):
+                    (sub / f"file_{k}.txt").write_bytes(b"x" * rng.randint(10, 400))
+                nxt.append(sub)
+        level = nxt
+        depth += 1
+    # 表征文件只放在第 4 层，识别需要逐层下钻
+    project = root / "a" / "b" / "c" / "app"
+    project.mkdir(parents=True, exist_ok=True)
+    (project / "package.json").write_text('{"name": "app", "version": "1.0.0"}\n', encoding="utf-8")
+    (project / "package-lock.json").write_text(json.dumps(npm_lock(50, seed=seed)), encoding="utf-8")
+    (project / "Cargo.toml").write_text('[package]\nname = "app"\nversion = "0.1.0"\n', encoding="utf-8")
+    return root
+
+
+def zip_dir(src: Path, zip_path: Path) -> Path:
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+        for dirpath, dirnames, filenames in os.walk(src):
+            dirnames.sort()
+            rel_dir = Path(dirpath).relative_to(src.parent).as_posix()
+            zf.writestr(f"{rel_dir}/", b"")
+            for fn in sorted(filenames):
+                zf.write(os.path.join(dirpath, fn), f"{rel_dir}/{fn}")
+    return zip_path
+
+
+def _cached(path: Path, build: Callable[[Path], object]) -> Path:
+    if not path.exists():
+        tmp = path.with_name(path.name + ".tmp")
+        build(tmp)
+        os.replace(tmp, path)
+    return path
+
+
+def ensure_file(work: Path, kind: str, size: int, *, seed: int = DEFAULT_SEED) -> Path:
+    """Generated lock of ``kind`` (npm / cargo / uv / requirements / gomod / gosum) under ``work``."""
+    makers: dict[str, tuple[str, Callable[[], str]]] = {
+        "npm": ("package-lock.json", lambda: json.dumps(npm_lock(size, seed=seed), indent=2)),
+        "cargo": ("Cargo.lock", lambda: cargo_lock(size, seed=seed)),
+        "uv": ("uv.lock", lambda: uv_lock(size, seed=seed)),
+        "requirements": ("requirements.lock", lambda: requirements_lock(size, seed=seed)),
+        "gomod": ("go.mod", lambda: go_mod(size, seed=seed)),
+        "gosum": ("go.sum", lambda: go_sum(size, seed=seed)),
+    }
+    file_name, make = makers[kind]
+    target = work / f"{kind}-{size}-s{seed}" / file_name
+    target.parent.mkdir(parents=True, exist_ok=True)
+    return _cached(target, lambda tmp: tmp.write_text(make(), encoding="utf-8"))
+
+
+def ensure_tree(work: Path, n_dirs: int, *, seed: int = DEFAULT_SEED) -> Path:
+    target = work / f"tree-{n_dirs}-s{seed}"
+    marker = target / ".complete"
+    if not marker.exists():
+        project_tree(target / "repo", n_dirs, seed=seed)
+        marker.write_text("", encoding="utf-8")
+    return target / "repo"
+
+
+def ensure_maven(work: Path, n: int, *, seed: int = DEFAULT_SEED) -> tuple[Path, Path]:
+    """(project, local repository) from ``maven_build`` under ``work``."""
+    target = work / f"maven-{n}-s{seed}"
+    marker = target / ".complete"
+    if not marker.exists():
+        maven_build(target, n, seed=seed)
+        marker.write_text("", encoding="utf-8")
+    return target / "project", target / "repository"
+
+
+def ensure_zip(work: Path, n_dirs: int, *, seed: int = DEFAULT_SEED) -> Path:
+    tree = ensure_tree(work, n_dirs, seed=seed)
+    return _cached(tree.parent / "repo.zip", lambda tmp: zip_dir(tree, tmp))
@@ -0,0 +1,308 @@
+"""Run cases in fresh interpreters, append results to a JSON-lines history, compare runs.
+
+Each (case, size) runs in its own ``python -m benchmarks _child`` process so
+that peak RSS (``ru_maxrss`` is a high-water mark) and imports are not
+carried over from earlier cases. A warm-up call is followed by ``repeat``
+timed calls and one extra call under ``tracemalloc`` for the allocation peak.
+"""
+
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Iterable
+
+from .cases import CASES, REPO_ROOT, Case
+
+DEFAULT_HISTORY = Path("results") / "bench" / "history.jsonl"
+DEFAULT_WORK = Path(tempfile.gettempdir()) / "sca-bench"
+# 对比时忽略小于该值的耗时变化（秒），避免把计时噪声当成回退
+_MIN_WALL_DELTA = 0.002
+
+
+def _max_rss(children: bool = False) -> int | None:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # Linux 以 KiB 为单位，macOS 以字节为单位
+    return usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+
+
+def measure(case: Case, size: int, work: Path, repeat: int) -> dict[str, Any]:
+    """Time ``case`` at ``size`` in this process (called in the child)."""
+    work.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
+    fn = case.setup(work, size)
+    setup_seconds = time.perf_counter() - started
+    fn()
+    gc.collect()
+    rss_before = _max_rss(case.in_child)
+    times: list[float] = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    rss_peak = _max_rss(case.in_child)
+    alloc_peak = None
+    if not case.in_child:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            fn()
+            alloc_peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return {
+        "case": case.name,
+        "size": size,
+        "unit": case.unit,
+        "repeat": repeat,
+        "wallSeconds": {
+            "min": round(min(times), 6),
+            "median": round(statistics.median(times), 6),
+            "mean": round(statistics.fmean(times), 6),
+        },
+        "setupSeconds": round(setup_seconds, 3),
+        "rssPeakBytes": rss_peak,
+        # 计时阶段相对准备阶段新增的峰值（准备阶段更高时为 0）
+        "rssGrowthBytes": None if rss_peak is None or rss_before is None else rss_peak - rss_before,
+        "allocPeakBytes": alloc_peak,
+    }
+
+
+def _run_child(case: str, size: int, work: Path, repeat: int) -> dict[str, Any]:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(p for p in (str(REPO_ROOT), os.environ.get("PYTHONPATH")) if p))
+    cmd = [sys.executable, "-m", "benchmarks", "_child", case, str(size), "--work", str(work), "--repeat", str(repeat)]
+    proc = subprocess.run(cmd, env=env, cwd=str(REPO_ROOT), capture_output=True, text=True)
+    if proc.returncode != 0:
+        tail = (proc.stderr or proc.stdout).strip().splitlines()[-1:] or ["?"]
+        return {"case": case, "size": size, "error": tail[0]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def select_cases(patterns: Iterable[str] | None) -> list[Case]:
+    pats = [p for p in patterns or () if p]
+    if not pats:
+        return list(CASES.values())
+    return [c for c in CASES.values() if any(fnmatch.fnmatchcase(c.name, p) for p in pats)]
+
+
+def _git_commit() -> str | None:
+    try:
+        proc = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=str(REPO_ROOT), capture_output=True, text=True, timeout=10
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if proc.returncode != 0:
+        return None
+    return proc.stdout.strip() or None
+
+
+def _fmt_bytes(n: int | None) -> str:
+    return "-" if n is None else f"{n / (1024 * 1024):.1f}MiB"
+
+
+def _fmt_line(r: dict[str, Any]) -> str:
+    head = f"{r['case']}@{r['size']}"
+    if "error" in r:
+        return f"{head:<32} 失败: {r['error']}"
+    wall = r["wallSeconds"]
+    return (
+        f"{head:<32} median {wall['median'] * 1000:9.2f} ms  min {wall['min'] * 1000:9.2f} ms  "
+        f"rss {_fmt_bytes(r['rssPeakBytes']):>9}  alloc {_fmt_bytes(r['allocPeakBytes']):>9}"
+    )
+
+
+def run(
+    cases: list[Case],
+    *,
+    work: Path,
+    repeat: int,
+    quick: bool = False,
+    sizes: list[int] | None = None,
+) -> list[dict[str, Any]]:
+    results: list[dict[str, Any]] = []
+    for case in cases:
+        for size in sizes or (case.sizes[:1] if quick else case.sizes):
+            rec = _run_child(case.name, size, work, repeat)
+            print(_fmt_line(rec), flush=True)
+            results.append(rec)
+    return results
+
+
+def over_budget(results: list[dict[str, Any]], *, scale: float = 1.0) -> list[str]:
+    """Print and return the results whose median wall time exceeds their case's absolute budget."""
+    over: list[str] = []
+    for r in results:
+        budget = CASES[r["case"]].budget if r.get("case") in CASES else None
+        if budget is None or "error" in r:
+            continue
+        limit = budget * scale
+        median = r["wallSeconds"]["median"]
+        if median > limit:
+            line = f"{r['case']}@{r['size']} median {median * 1000:.1f} ms 超出预算 {limit * 1000:.0f} ms"
+            print(line)
+            over.append(line)
+    return over
+
+
+def record(history: Path, results: list[dict[str, Any]], *, label: str | None) -> dict[str, Any]:
+    from sca_tools.utils import utc_now_iso
+
+    commit = _git_commit()
+    entry = {
+        "timestamp": utc_now_iso(),
+        "label": label or commit,
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "results": results,
+    }
+    history.parent.mkdir(parents=True, exist_ok=True)
+    with open(history, "a", encoding="utf-8") as fp:
+        fp.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    return entry
+
+
+def load_history(history: Path) -> list[dict[str, Any]]:
+    if not history.exists():
+        return []
+    with open(history, encoding="utf-8") as fp:
+        return [json.loads(line) for line in fp if line.strip()]
+
+
+def _pick(runs: list[dict[str, Any]], ref: str | None, default: int) -> dict[str, Any] | None:
+    """Run by label/commit, by index (``-1`` = latest), or ``runs[default]``."""
+    if ref is None:
+        return runs[default] if len(runs) >= abs(default) else None
+    try:
+        return runs[int(ref)]
+    except (ValueError, IndexError):
+        pass
+    for r in reversed(runs):
+        if ref in (r.get("label"), r.get("commit")):
+            return r
+    return None
+
+
+def compare(base: dict[str, Any], new: dict[str, Any], *, threshold: float) -> list[str]:
+    """Print the per-case ratios new/base; returns the regressions beyond ``threshold``."""
+    old = {(r["case"], r["size"]): r for r in base["results"] if "error" not in r}
+    regressions: list[str] = []
+    print(f"基线: {base.get('label')} ({base['timestamp']})  对比: {new.get('label')} ({new['timestamp']})")
+    for r in new["results"]:
+        key = (r["case"], r["size"])
+        b = old.get(key)
+        if b is None or "error" in r:
+            continue
+        parts: list[str] = []
+        flagged = False
+        bw, nw = b["wallSeconds"]["median"], r["wallSeconds"]["median"]
+        if bw:
+            parts.append(f"wall x{nw / bw:.2f}")
+            if nw > bw * (1 + threshold) and nw - bw > _MIN_WALL_DELTA:
+                flagged = True
+        for metric, short in (("allocPeakBytes", "alloc"), ("rssPeakBytes", "rss")):
+            bv, nv = b.get(metric), r.get(metric)
+            if bv and nv:
+                parts.append(f"{short} x{nv / bv:.2f}")
+                if nv > bv * (1 + threshold):
+                    flagged = True
+        line = f"{r['case']}@{r['size']:<8} " + "  ".join(parts)
+        if flagged:
+            regressions.append(line)
+            line += "  <-- 回退"
+        print(line)
+    return regressions
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog="python -m benchmarks", description="SCA 性能基准（合成大输入）")
+    sub = p.add_subparsers(dest="cmd")
+
+    r = sub.add_parser("run", help="运行基准并追加到历史记录（默认命令）")
+    r.add_argument("-k", "--cases", default="", help="按名称选择用例，逗号分隔的 glob，如 'sbom.*,detect.dir'")
+    r.add_argument("--sizes", default="", help="覆盖规模，逗号分隔，如 1000,10000")
+    r.add_argument("--quick", action="store_true", help="每个用例只跑最小规模")
+    r.add_argument("--repeat", type=int, default=3, help="计时次数（取中位数），默认 3")
+    r.add_argument("--work", default=str(DEFAULT_WORK), help=f"生成输入的缓存目录，默认 {DEFAULT_WORK}")
+    r.add_argument("--history", default=str(DEFAULT_HISTORY), help=f"历史记录文件(JSON lines)，默认 {DEFAULT_HISTORY}")
+    r.add_argument("--label", default=None, help="本次记录的标签，默认为当前 git 提交")
+    r.add_argument("--no-record", action="store_true", help="只打印结果，不写历史记录")
+    r.add_argument("--compare", action="store_true", help="运行后与历史中上一条记录对比")
+    r.add_argument("--threshold", type=float, default=0.10, help="判定回退的相对阈值，默认 0.10")
+    r.add_argument("--budget-scale", type=float, default=1.0, help="按比例放宽用例的绝对耗时预算（较慢的机器），默认 1.0")
+
+    sub.add_parser("list", help="列出全部用例")
+
+    c = sub.add_parser("compare", help="对比历史中的两次运行，存在回退时退出码为 1")
+    c.add_argument("--history", default=str(DEFAULT_HISTORY))
+    c.add_argument("--base", default=None, help="基线：标签/提交或序号（默认倒数第二条）")
+    c.add_argument("--new", default=None, help="对比对象：标签/提交或序号（默认最后一条）")
+    c.add_argument("--threshold", type=float, default=0.10)
+
+    ch = sub.add_parser("_child")
+    ch.add_argument("case")
+    ch.add_argument("size", type=int)
+    ch.add_argument("--work", required=True)
+    ch.add_argument("--repeat", type=int, default=3)
+    return p
+
+
+def main(argv: list[str] | None = None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0].startswith("-"):
+        argv.insert(0, "run")
+    args = build_parser().parse_args(argv)
+
+    if args.cmd == "_child":
+        rec = measure(CASES[args.case], args.size, Path(args.work), max(1, args.repeat))
+        print(json.dumps(rec))
+        return 0
+
+    if args.cmd == "list":
+        for case in CASES.values():
+            sizes = "/".join(str(s) for s in case.sizes)
+            print(f"{case.name:<28} {sizes:<20} {case.unit:<10} {case.description}")
+        return 0
+
+    if args.cmd == "compare":
+        runs = load_history(Path(args.history))
+        base, new = _pick(runs, args.base, -2), _pick(runs, args.new, -1)
+        if base is None or new is None:
+            print("历史记录不足两条，或未找到指定的运行", file=sys.stderr)
+            return 2
+        return 1 if compare(base, new, threshold=args.threshold) else 0
+
+    cases = select_cases(args.cases.split(","))
+    if not cases:
+        print(f"没有匹配的用例: {args.cases}", file=sys.stderr)
+        return 2
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()] or None
+    results = run(cases, work=Path(args.work), repeat=max(1, args.repeat), quick=args.quick, sizes=sizes)
+    failed = sum(1 for r in results if "error" in r) + len(over_budget(results, scale=args.budget_scale))
+    if args.no_record:
+        return 1 if failed else 0
+    history = Path(args.history)
+    runs = load_history(history)
+    entry = record(history, results, label=args.label)
+    print(f"已追加到历史记录: {history}")
+    if args.compare and runs:
+        if compare(runs[-1], entry, threshold=args.threshold):
+            return 1
+    return 1 if failed else 0
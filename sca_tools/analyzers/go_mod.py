@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import re
+from pathlib import Path
+from typing import Any, NamedTuple
+from urllib.parse import quote
+
+from ..base import ScanArtifacts, ScanContext
+from ..cache import cache_key, cache_status, cached_build
+from ..context import ensure_scan_context
+from ..utils import input_name, make_cyclonedx_base, slug, ts_compact, sbom_file_name, unique_output_dir, write_json
+from ..versions import semver_key
+from ..vulndb import build_vuln_report
+
+
+_TOOL = "sca-go-mod"
+_TOOL_VERSION = "0.1.0"
+
+# go 1.17 起 go.mod 的 require 列出构建所需的全部模块（含 // indirect），go.sum 只作校验和
+_COMPLETE_REQUIRE_GO = (1, 17)
+_PURL_PATH_OK = re.compile(r"[A-Za-z0-9/._~-]*\Z")
+_PURL_VERSION_OK = re.compile(r"[A-Za-z0-9._~-]*\Z")
+
+
+class GoMod(NamedTuple):
+    module: str | None
+    go: str | None
+    # (模块路径, 版本, 是否 // indirect)
+    requires: list[tuple[str, str, bool]]
+    # (旧路径, 旧版本或 None) -> (新路径, 新版本；本地目录替换时为 None)
+    replaces: dict[tuple[str, str | None], tuple[str, str | None]]
+    excludes: set[tuple[str, str]]
+
+
+def _unquote(token: str) -> str:
+    if len(token) >= 2 and token[0] == token[-1] and token[0] in "\"`":
+        return token[1:-1]
+    return token
+
+
+def _is_local_path(path: str) -> bool:
+    return path.startswith(("./", "../", "/")) or path in (".", "..") or (len(path) > 1 and path[1] == ":")
+
+
+def parse_go_mod(text: str) -> GoMod:
+    """Single pass over ``go.mod``: module, go version, require/replace/exclude (blocks included)."""
+    module: str | None = None
+    go: str | None = None
+    requires: list[tuple[str, str, bool]] = []
+    replaces: dict[tuple[str, str | None], tuple[str, str | None]] = {}
+    excludes: set[tuple[str, str]] = set()
+    block: str | None = None
+    for raw in text.splitlines():
+        line, _, comment = raw.partition("//")
+        fields = line.split()
+        if not fields:
+            continue
+        if block is not None:
+            if fields[0] == ")":
+                block = None
+                continue
+            verb, args = block, fields
+        else:
+            verb, args = fields[0], fields[1:]
+            if args[:1] == ["("]:
+                block = verb
+                continue
+        if verb == "require" and len(args) >= 2:
+            note = comment.strip()
+            requires.append((_unquote(args[0]), _unquote(args[1]), note == "indirect" or note.startswith("indirect;")))
+        elif verb == "replace" and "=>" in args:
+            i = args.index("=>")
+            old, new = args[:i], args[i + 1 :]
+            if not old or not new:
+                continue
+            old_ver = _unquote(old[1]) if len(old) > 1 else None
+            new_path = _unquote(new[0])
+            new_ver = _unquote(new[1]) if len(new) > 1 and not _is_local_path(new_path) else None
+            replaces[(_unquote(old[0]), old_ver)] = (new_path, new_ver)
+        elif verb == "exclude" and len(args) >= 2:
+            excludes.add((_unquote(args[0]), _unquote(args[1])))
+        elif verb == "module" and args:
+            module = _unquote(args[0])
+        elif verb == "go" and args:
+            go = args[0]
+    return GoMod(module, go, requires, replaces, excludes)
+
+
+def parse_go_sum(text: str) -> dict[tuple[str, str], str]:
+    """``go.sum`` -> {(module, version): "h1:..."} of the module zips.
+
+    ``<version>/go.mod`` lines only pin the module's go.mod (read for version
+    selection, the module itself is not built) and are folded away; they are
+    usually more than half of the file, so they are dropped by a substring
+    test before any splitting.
+    """
+    sums: dict[tuple[str, str], str] = {}
+    for line in text.splitlines():
+        if "/go.mod h" in line:
+            continue
+        parts = line.split()
+        if len(parts) == 3:
+            sums[(parts[0], parts[1])] = parts[2]
+    return sums
+
+
+def _go_version(go: str | None) -> tuple[int, int]:
+    if not go:
+        return (0, 0)
+    major, _, rest = go.partition(".")
+    minor = rest.split(".", 1)[0]
+    try:
+        return (int(major), int(minor or 0))
+    except ValueError:
+        return (0, 0)
+
+
+def _purl(path: str, version: str | None) -> str:
+    # 绝大多数模块路径/版本无需转义，先用正则判断，省去逐个 quote 的开销
+    if not _PURL_PATH_OK.match(path):
+        path = quote(path, safe="/-._~")
+    if not version:
+        return f"pkg:golang/{path}"
+    if not _PURL_VERSION_OK.match(version):
+        version = quote(version, safe="-._~")
+    return f"pkg:golang/{path}@{version}"
+
+
+def _build_sbom_from_go(mod: GoMod | None, sums: dict[tuple[str, str], str], project_name: str) -> dict[str, Any]:
+    sbom = make_cyclonedx_base(_TOOL, _TOOL_VERSION)
+    excludes = mod.excludes if mod is not None else set()
+    replaces = mod.replaces if mod is not None else {}
+
+    # 构建列表：(路径, 版本, indirect)；go 1.17 之前 go.mod 只列直接依赖，其余模块取 go.sum 中的最高版本
+    selected: list[tuple[str, str, bool]] = []
+    required: set[str] = set()
+    if mod is not None:
+        for path, version, indirect in mod.requires:
+            if (path, version) in excludes or path in required:
+                continue
+            required.add(path)
+            selected.append((path, version, indirect))
+    if mod is None or _go_version(mod.go) < _COMPLETE_REQUIRE_GO:
+        best: dict[str, tuple[str, str | None]] = {}
+        replaced_targets = {new for new, _v in replaces.values()}
+        for path, version in sums:
+            if path in required or path in replaced_targets or (path, version) in excludes:
+                continue
+            key = semver_key(version)
+            cur = best.get(path)
+            if cur is None or (key is not None and (cur[1] is None or key > cur[1])):
+                best[path] = (version, key)
+        selected.extend((path, version, True) for path, (version, _key) in sorted(best.items()))
+
+    components: list[dict[str, Any]] = []
+    seen: set[str] = set()
+    for path, version, indirect in selected:
+        rep = replaces.get((path, version)) or replaces.get((path, None))
+        props: list[dict[str, str]] = []
+        name, ver = path, version
+        if rep is not None:
+            new_path, new_ver = rep
+            if new_ver is None:
+                # 替换为本地目录：代码随项目提供，不对应任何已发布版本
+                props.append({"name": "sca:replacedBy", "value": new_path})
+            else:
+                name, ver = new_path, new_ver
+                props.append({"name": "sca:replaces", "value": f"{path}@{version}"})
+        local = rep is not None and rep[1] is None
+        ref = f"golang-local:{path}" if local else _purl(name, ver)
+        if ref in seen:
+            continue
+        seen.add(ref)
+        h = sums.get((name, ver))
+        if h is not None:
+            props.append({"name": "sca:goSum", "value": h})
+        if indirect:
+            props.append({"name": "sca:indirect", "value": "true"})
+        comp: dict[str, Any] = {"type": "library", "name": name, "version": ver}
+        if not local:
+            comp["purl"] = ref
+        comp["bom-ref"] = ref
+        if props:
+            comp["properties"] = props
+        components.append(comp)
+
+    # top-level component (application)
+    sbom["metadata"]["component"] = {
+        "type": "application",
+        "name": mod.module if mod is not None and mod.module else project_name,
+        "version": "unknown",
+    }
+    # go.mod/go.sum 不含模块之间的依赖边（需要 go mod graph），直接/间接依赖见 sca:indirect
+    sbom["components"] = components
+    return sbom
+
+
+def scan_go_mod(*, input_path: Path, results_dir: Path, context: ScanContext | None = None) -> ScanArtifacts:
+    input_path = input_path.resolve()
+    results_dir = results_dir.resolve()
+
+    with ensure_scan_context(input_path, results_dir, context) as ctx:
+        mod_rel = ctx.find("go.mod")
+        sum_rel = ctx.find("go.sum")
+        if mod_rel is None and sum_rel is None:
+            if ctx.fs.is_archive:
+                raise FileNotFoundError("zip 内未找到 go.mod / go.sum")
+            raise FileNotFoundError("未找到 go.mod / go.sum")
+        mod_path = ctx.display_path(mod_rel) if mod_rel is not None else None
+        mod_bytes = ctx.read_bytes(mod_rel) if mod_rel is not None else None
+        sum_bytes = ctx.read_bytes(sum_rel) if sum_rel is not None else b""
+        cache = ctx.cache
+        sbom_format = ctx.sbom_format
+        vulndb = ctx.vulndb
+
+    out_dir = unique_output_dir(results_dir / "go" / slug(input_name(input_path)) / ts_compact())
+    sbom_path = out_dir / sbom_file_name(sbom_format)
+    vuln_report_path = out_dir / "vuln_report.json"
+    details_path = out_dir / "scan_details.json"
+
+    project_name = input_name(input_path)
+
+    def _build() -> tuple[dict[str, Any], dict[str, Any]]:
+        mod = parse_go_mod(mod_bytes.decode("utf-8", errors="replace")) if mod_bytes is not None else None
+        sums = parse_go_sum(sum_bytes.decode("utf-8", errors="replace"))
+        built = _build_sbom_from_go(mod, sums, project_name)
+        if mod is None:
+            source = "go.sum"
+        elif _go_version(mod.go) < _COMPLETE_REQUIRE_GO and sums:
+            source = "go.mod+go.sum"
+        else:
+            source = "go.mod"
+        return built, {
+            "module": mod.module if mod is not None else None,
+            "goVersion": mod.go if mod is not None else None,
+            "dependencySource": source,
+            "requires": len(mod.requires) if mod is not None else 0,
+            "replaces": len(mod.replaces) if mod is not None else 0,
+            "excludes": len(mod.excludes) if mod is not None else 0,
+            "goSumModules": len(sums),
+            "components": len(built.get("components", [])),
+        }
+
+    inputs = [("go.mod", mod_bytes or b""), ("go.sum", sum_bytes), ("project", project_name.encode("utf-8"))]
+    key = cache_key(_TOOL, _TOOL_VERSION, inputs)
+    sbom, cached_details, hit = cached_build(cache, key, _build)
+    write_json(sbom_path, sbom, fmt=sbom_format)
+
+    write_json(vuln_report_path, build_vuln_report(sbom, tool=_TOOL, index=vulndb))
+
+    write_json(
+        details_path,
+        {
+            "inputPath": str(input_path),
+            "goMod": str(mod_path) if mod_path else None,
+            **cached_details,
+            "cache": cache_status(cache, hit),
+        },
+    )
+
+    return ScanArtifacts(out_dir, sbom_path, vuln_report_path, details_path)
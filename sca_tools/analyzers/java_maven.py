@@ -0,0 +1,857 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+import posixpath
+import re
+import threading
+import xml.etree.ElementTree as ET
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Any, Callable, NamedTuple, Optional, Tuple
+from urllib.parse import quote
+
+from ..base import ScanArtifacts, ScanContext
+from ..cache import cache_key, cache_status, cached_build, restamp_sbom
+from ..context import ensure_scan_context
+from ..tracing import count, span
+from ..utils import input_name, make_cyclonedx_base, slug, ts_compact, sbom_file_name, unique_output_dir, write_json
+from ..versions import in_range, maven_key, maven_ranges
+from ..vulndb import build_vuln_report
+
+
+_TOOL = "sca-java-maven"
+_TOOL_VERSION = "0.1.0"
+
+# 本地仓库目录（~/.m2/repository 的布局）；未设置时使用 Maven 的默认位置
+LOCAL_REPO_ENV = "SCA_MAVEN_REPO"
+# 进程内已解析 POM 的条目上限：父 POM / BOM 会被多个模块、多次扫描反复引用
+POM_CACHE_ENTRIES = 4096
+_MAX_INTERPOLATE_DEPTH = 10
+_MAX_PARENT_DEPTH = 32
+_MISSING_SAMPLES = 20
+_PROPERTY_RE = re.compile(r"\$\{([^}]+)\}")
+_PURL_OK = re.compile(r"[A-Za-z0-9._~-]*\Z")
+
+# (声明方的生效作用域, 被依赖 POM 中声明的作用域) -> 传递后的作用域；不在表中的不传递（test/provided/system）
+_SCOPE_MEDIATION = {
+    ("compile", "compile"): "compile",
+    ("compile", "runtime"): "runtime",
+    ("runtime", "compile"): "runtime",
+    ("runtime", "runtime"): "runtime",
+    ("provided", "compile"): "provided",
+    ("provided", "runtime"): "provided",
+    ("test", "compile"): "test",
+    ("test", "runtime"): "test",
+}
+_SCOPE_STRENGTH = {"compile": 4, "runtime": 3, "provided": 2, "system": 2, "test": 1}
+
+# (groupId, artifactId, type, classifier)：Maven 判定依赖冲突与依赖管理匹配的键
+DepKey = Tuple[str, str, str, Optional[str]]
+
+
+class Dependency(NamedTuple):
+    group: str
+    artifact: str
+    version: str | None
+    scope: str | None
+    type: str
+    classifier: str | None
+    optional: bool
+    # (groupId, artifactId)，可为 "*"
+    exclusions: tuple[tuple[str, str], ...]
+
+    @property
+    def key(self) -> DepKey:
+        return (self.group, self.artifact, self.type, self.classifier)
+
+
+@dataclass
+class Pom:
+    """The parts of one ``pom.xml`` the analyzer uses, not yet interpolated."""
+
+    group: str | None = None
+    artifact: str | None = None
+    version: str | None = None
+    packaging: str = "jar"
+    # (groupId, artifactId, version, relativePath)
+    parent: tuple[str, str, str, str | None] | None = None
+    properties: dict[str, str] = field(default_factory=dict)
+    dependencies: list[Dependency] = field(default_factory=list)
+    managed: list[Dependency] = field(default_factory=list)
+    modules: list[str] = field(default_factory=list)
+
+
+def _dependency(fields: dict[str, str], exclusions: list[tuple[str, str]]) -> Dependency | None:
+    group, artifact = fields.get("groupId"), fields.get("artifactId")
+    if not group or not artifact:
+        return None
+    return Dependency(
+        group,
+        artifact,
+        fields.get("version") or None,
+        fields.get("scope") or None,
+        fields.get("type") or "jar",
+        fields.get("classifier") or None,
+        fields.get("optional", "").lower() == "true",
+        tuple(exclusions),
+    )
+
+
+def parse_pom(source: IO[bytes]) -> Pom:
+    """Read a POM with ``iterparse``, keeping only coordinates, parent, properties,
+    dependencies, dependency management and modules.
+
+    Elements are cleared as soon as they end, so ``<build>`` / ``<reporting>``
+    (often most of the file) never build up a tree. Dependencies inside
+    profiles and plugins are ignored.
+    """
+    pom = Pom()
+    path: list[str] = []
+    root: ET.Element | None = None
+    parent: dict[str, str] = {}
+    dep: dict[str, str] = {}
+    exclusions: list[tuple[str, str]] = []
+    exclusion: dict[str, str] = {}
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        tag = elem.tag.rpartition("}")[2]
+        if event == "start":
+            if root is None:
+                root = elem
+            path.append(tag)
+            continue
+        depth = len(path)
+        if depth >= 2 and path[0] == "project":
+            section = path[1]
+            text = (elem.text or "").strip()
+            if depth == 2:
+                if section in ("groupId", "artifactId", "version", "packaging") and text:
+                    setattr(pom, "group" if section == "groupId" else "artifact" if section == "artifactId" else section, text)
+                elif section == "parent" and parent.get("groupId") and parent.get("artifactId"):
+                    pom.parent = (
+                        parent["groupId"],
+                        parent["artifactId"],
+                        parent.get("version", ""),
+                        parent.get("relativePath"),
+                    )
+            elif depth == 3 and section == "properties":
+                pom.properties[tag] = text
+            elif depth == 3 and section == "parent":
+                parent[tag] = text
+            elif depth == 3 and section == "modules":
+                if tag == "module" and text:
+                    pom.modules.append(text)
+            else:
+                base = 2 if section == "dependencies" else 3 if section == "dependencyManagement" else 0
+                rel = path[base:] if base and (base == 2 or path[2] == "dependencies") else []
+                if rel and rel[0] == "dependency":
+                    if len(rel) == 1:
+                        d = _dependency(dep, exclusions)
+                        if d is not None:
+                            (pom.dependencies if base == 2 else pom.managed).append(d)
+                        dep, exclusions = {}, []
+                    elif len(rel) == 2:
+                        dep[tag] = text
+                    elif len(rel) == 3 and rel[1:] == ["exclusions", "exclusion"]:
+                        exclusions.append((exclusion.get("groupId") or "*", exclusion.get("artifactId") or "*"))
+                        exclusion = {}
+                    elif len(rel) == 4 and rel[1:3] == ["exclusions", "exclusion"]:
+                        exclusion[tag] = text
+        path.pop()
+        elem.clear()
+        if depth == 2 and root is not None:
+            # 顶层子元素处理完即丢弃，根元素不再挂着空壳
+            root.clear()
+    return pom
+
+
+def local_repository() -> Path:
+    """The local repository to resolve parents, BOMs and dependency POMs from."""
+    env = os.environ.get(LOCAL_REPO_ENV)
+    if env:
+        return Path(env).expanduser()
+    return Path.home() / ".m2" / "repository"
+
+
+def _stat_stamp(path: Path | str) -> tuple[int, int] | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class PomCache:
+    """Parsed repository POMs by path, reused while the file's mtime and size are unchanged.
+
+    Shared by every scan of the process: parents and BOMs such as
+    ``spring-boot-dependencies`` are read once, not once per module or job.
+    Project POMs (read from a directory or archive) are keyed by content
+    through ``parse_bytes``.
+    """
+
+    def __init__(self, max_entries: int = POM_CACHE_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[tuple[int, int], Pom | None]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: Path) -> tuple[Pom | None, tuple[int, int] | None, bool]:
+        """(pom, (mtime_ns, size), parsed now); (None, None, False) when the file is missing.
+
+        A file that exists but does not parse is cached as None as well.
+        """
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None, None, False
+        stamp = (st.st_mtime_ns, st.st_size)
+        key = str(path)
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is not None and hit[0] == stamp:
+                self._entries.move_to_end(key)
+                return hit[1], stamp, False
+        pom: Pom | None
+        try:
+            with open(path, "rb") as fp:
+                pom = parse_pom(fp)
+            count(bytesRead=st.st_size)
+        except (OSError, ET.ParseError):
+            pom = None
+        with self._lock:
+            self._entries[key] = (stamp, pom)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return pom, stamp, True
+
+    def parse_bytes(self, data: bytes) -> Pom:
+        """Parse POM ``data``, reusing an earlier parse of the same bytes; raises ``ET.ParseError``."""
+        key = "sha256:" + hashlib.sha256(data).hexdigest()
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is not None and hit[1] is not None:
+                self._entries.move_to_end(key)
+                return hit[1]
+        pom = parse_pom(io.BytesIO(data))
+        with self._lock:
+            self._entries[key] = ((0, len(data)), pom)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return pom
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+POM_CACHE = PomCache()
+
+
+@dataclass
+class _Model:
+    """Effective POM: inheritance, interpolation, BOM imports and management applied."""
+
+    group: str
+    artifact: str
+    version: str
+    dependencies: list[Dependency]
+    # 依赖管理按优先级分层：本 POM（含继承）显式声明的在前，其后是导入 BOM 的各层。
+    # BOM 的层按引用共享，不为每个继承它的 POM 复制一份（大 BOM 有上千条）
+    managed: tuple[dict[DepKey, Dependency], ...]
+
+    def managed_for(self, key: DepKey) -> Dependency | None:
+        for layer in self.managed:
+            d = layer.get(key)
+            if d is not None:
+                return d
+        return None
+
+
+@dataclass
+class _Inherited:
+    """A POM merged with its parents, before interpolation."""
+
+    group: str
+    artifact: str
+    version: str
+    packaging: str
+    parent: tuple[str, str, str, str | None] | None
+    properties: dict[str, str]
+    dependencies: dict[DepKey, Dependency]
+    managed: dict[DepKey, Dependency]
+
+
+def _interpolate(value: str | None, props: dict[str, str], depth: int = 0) -> str | None:
+    if value is None or "${" not in value:
+        return value
+
+    def _sub(m: re.Match[str]) -> str:
+        v = props.get(m.group(1))
+        if v is None or depth >= _MAX_INTERPOLATE_DEPTH:
+            return m.group(0) if v is None else v
+        return _interpolate(v, props, depth + 1) or ""
+
+    return _PROPERTY_RE.sub(_sub, value)
+
+
+def _interpolate_dep(d: Dependency, props: dict[str, str]) -> Dependency:
+    if not any("${" in (v or "") for v in (d.group, d.artifact, d.version, d.scope, d.type, d.classifier)):
+        return d
+    return d._replace(
+        group=_interpolate(d.group, props) or d.group,
+        artifact=_interpolate(d.artifact, props) or d.artifact,
+        version=_interpolate(d.version, props),
+        scope=_interpolate(d.scope, props),
+        type=_interpolate(d.type, props) or "jar",
+        classifier=_interpolate(d.classifier, props),
+        exclusions=tuple((_interpolate(g, props) or g, _interpolate(a, props) or a) for g, a in d.exclusions),
+    )
+
+
+def _resolved(version: str | None) -> bool:
+    return bool(version) and "${" not in (version or "")
+
+
+def _excluded(d: Dependency, exclusions: frozenset[tuple[str, str]]) -> bool:
+    for g, a in exclusions:
+        if (g == "*" or g == d.group) and (a == "*" or a == d.artifact):
+            return True
+    return False
+
+
+def _purl(group: str, artifact: str, version: str | None, type_: str = "jar", classifier: str | None = None) -> str:
+    parts = [p if _PURL_OK.match(p) else quote(p, safe="-._~") for p in (group, artifact)]
+    purl = f"pkg:maven/{parts[0]}/{parts[1]}"
+    if version:
+        purl += "@" + (version if _PURL_OK.match(version) else quote(version, safe="-._~"))
+    qualifiers = []
+    if classifier:
+        qualifiers.append(f"classifier={quote(classifier, safe='-._~')}")
+    if type_ != "jar":
+        qualifiers.append(f"type={quote(type_, safe='-._~')}")
+    if qualifiers:
+        purl += "?" + "&".join(qualifiers)
+    return purl
+
+
+class MavenResolver:
+    """Effective models and dependency graph of one Maven build.
+
+    Project POMs are read through ``read_project`` (relative paths inside the
+    scanned fs) and parsed once per scan; parents, BOM imports and the POMs
+    of dependencies come from the local repository through ``PomCache``. No
+    network: what is not in the repository is reported as missing and its
+    dependencies are not followed.
+    """
+
+    def __init__(
+        self, read_project: Callable[[str], bytes | None], *, repo: Path | None, pom_cache: PomCache = POM_CACHE
+    ) -> None:
+        self._read_project = read_project
+        self.repo = repo
+        self._pom_cache = pom_cache
+        self.project_poms: dict[str, Pom | None] = {}
+        self.project_bytes: dict[str, bytes] = {}
+        # 读取过的仓库 POM -> (mtime_ns, size)，不存在为 None；参与 SBOM 缓存键
+        self.repo_files: dict[str, tuple[int, int] | None] = {}
+        # 为版本区间列举过的 <group>/<artifact> 目录 -> (mtime_ns, size)，新增版本目录会改变其 mtime
+        self.repo_dirs: dict[str, tuple[int, int] | None] = {}
+        self.repo_parsed = 0
+        self.missing: dict[str, None] = {}
+        self.reactor: dict[tuple[str, str], str] = {}
+        self._inherited: dict[tuple[str, ...], _Inherited] = {}
+        self._models: dict[tuple[str, ...], _Model] = {}
+        self._versions: dict[tuple[str, str], list[str]] = {}
+        self._repo_poms: dict[tuple[str, str, str], Pom | None] = {}
+
+    # ------------------------------------------------------------ POM sources
+
+    def project_pom(self, rel: str) -> Pom | None:
+        if rel not in self.project_poms:
+            data = self._read_project(rel)
+            pom = None
+            if data is not None:
+                try:
+                    # 工作区识别已按内容解析过根 POM 时直接复用
+                    pom = self._pom_cache.parse_bytes(data)
+                except ET.ParseError as e:
+                    raise ValueError(f"{rel} 解析失败: {e}") from None
+                self.project_bytes[rel] = data
+            self.project_poms[rel] = pom
+        return self.project_poms[rel]
+
+    def _repo_path(self, group: str, artifact: str, version: str) -> Path | None:
+        if self.repo is None:
+            return None
+        return self.repo.joinpath(*group.split("."), artifact, version, f"{artifact}-{version}.pom")
+
+    def repo_pom(self, group: str, artifact: str, version: str) -> Pom | None:
+        gav = (group, artifact, version)
+        if gav in self._repo_poms:
+            return self._repo_poms[gav]
+        path = self._repo_path(group, artifact, version)
+        pom: Pom | None = None
+        if path is not None:
+            pom, stamp, parsed = self._pom_cache.get(path)
+            self.repo_files[str(path)] = stamp
+            self.repo_parsed += int(parsed)
+        if pom is None:
+            self.missing.setdefault(f"{group}:{artifact}:{version}")
+        self._repo_poms[gav] = pom
+        return pom
+
+    def _repo_versions(self, group: str, artifact: str) -> list[str]:
+        key = (group, artifact)
+        if key not in self._versions:
+            names: list[str] = []
+            if self.repo is not None:
+                d = self.repo.joinpath(*group.split("."), artifact)
+                self.repo_dirs[str(d)] = _stat_stamp(d)
+                try:
+                    with os.scandir(d) as it:
+                        names = [e.name for e in it if e.is_dir()]
+                except OSError:
+                    pass
+            self._versions[key] = names
+        return self._versions[key]
+
+    def pick_version(self, group: str, artifact: str, spec: str) -> str | None:
+        """Highest locally available version inside a range spec such as ``[1.2,2.0)``."""
+        ranges = maven_ranges(spec)
+        if ranges is None:
+            return spec
+        best: tuple[str, str] | None = None
+        for v in self._repo_versions(group, artifact):
+            k = maven_key(v)
+            if k is not None and any(in_range(k, r) for r in ranges) and (best is None or k > best[0]):
+                best = (k, v)
+        return best[1] if best is not None else None
+
+    # ------------------------------------------------------------ models
+
+    def _parent_of(self, pom: Pom, rel: str | None, props: dict[str, str]) -> tuple[tuple[str, ...], Pom | None]:
+        assert pom.parent is not None
+        group, artifact, version, relative = pom.parent
+        version = _interpolate(version, props) or version
+        if rel is not None:
+            # 与 Maven 相同：先按 relativePath（缺省 ../pom.xml）在项目内查找，坐标一致才采用
+            cand = _module_pom_rel(rel, "../pom.xml" if relative is None else relative) if relative != "" else None
+            found = self.project_pom(cand) if cand is not None else None
+            if found is not None and found.artifact == artifact and (found.group or (found.parent or ("",))[0]) == group:
+                return ("project", cand), found
+        return ("repo", group, artifact, version), self.repo_pom(group, artifact, version)
+
+    def _inherit(
+        self, key: tuple[str, ...], pom: Pom, rel: str | None, stack: tuple[tuple[str, ...], ...] = ()
+    ) -> _Inherited:
+        if key in self._inherited:
+            return self._inherited[key]
+        base: _Inherited | None = None
+        if pom.parent is not None and key not in stack and len(stack) < _MAX_PARENT_DEPTH:
+            pkey, ppom = self._parent_of(pom, rel, pom.properties)
+            if ppom is not None and pkey not in stack:
+                base = self._inherit(pkey, ppom, pkey[1] if pkey[0] == "project" else None, stack + (key,))
+        group = pom.group or (pom.parent[0] if pom.parent else "")
+        version = pom.version or (pom.parent[2] if pom.parent else "")
+        props = dict(base.properties) if base else {}
+        props.update(pom.properties)
+        deps: dict[DepKey, Dependency] = {d.key: d for d in pom.dependencies}
+        managed: dict[DepKey, Dependency] = {d.key: d for d in pom.managed}
+        if base is not None:
+            # 子 POM 的声明优先，父 POM 中其余条目排在其后
+            for k, d in base.dependencies.items():
+                deps.setdefault(k, d)
+            for k, d in base.managed.items():
+                managed.setdefault(k, d)
+        out = _Inherited(group, pom.artifact or "", version, pom.packaging, pom.parent, props, deps, managed)
+        self._inherited[key] = out
+        return out
+
+    def model(
+        self, key: tuple[str, ...], pom: Pom, rel: str | None, stack: tuple[tuple[str, ...], ...] = ()
+    ) -> _Model:
+        if key in self._models:
+            return self._models[key]
+        inh = self._inherit(key, pom, rel)
+        props = dict(inh.properties)
+        builtins = {"groupId": inh.group, "artifactId": inh.artifact, "version": inh.version, "packaging": inh.packaging}
+        for name, value in builtins.items():
+            props[f"project.{name}"] = props[f"pom.{name}"] = value
+        if inh.parent is not None:
+            props["project.parent.groupId"] = inh.parent[0]
+            props["project.parent.version"] = inh.parent[2]
+        group = _interpolate(inh.group, props) or inh.group
+        version = _interpolate(inh.version, props) or inh.version
+        props["project.groupId"] = props["pom.groupId"] = group
+        props["project.version"] = props["pom.version"] = version
+
+        own: dict[DepKey, Dependency] = {}
+        layers: list[dict[DepKey, Dependency]] = [own]
+        imports: list[Dependency] = []
+        for d in inh.managed.values():
+            d = _interpolate_dep(d, props)
+            if d.scope == "import" and d.type == "pom":
+                imports.append(d)
+            else:
+                own.setdefault(d.key, d)
+        for imp in imports:
+            # 先声明的 BOM 优先，已显式管理的条目不被覆盖
+            if not _resolved(imp.version):
+                continue
+            assert imp.version is not None
+            ikey = ("repo", imp.group, imp.artifact, imp.version)
+            if ikey in stack or ikey == key:
+                continue
+            bom = self.repo_pom(imp.group, imp.artifact, imp.version)
+            bom_model = self.model(ikey, bom, None, stack + (key,)) if bom is not None else None
+            if bom_model is not None:
+                layers.extend(layer for layer in bom_model.managed if layer and all(layer is not x for x in layers))
+
+        out = _Model(group, inh.artifact, version, [], tuple(layer for layer in layers if layer))
+        deps = out.dependencies
+        for d in inh.dependencies.values():
+            d = _interpolate_dep(d, props)
+            m = out.managed_for(d.key)
+            if m is not None:
+                d = d._replace(
+                    version=d.version or m.version,
+                    scope=d.scope or m.scope,
+                    exclusions=d.exclusions + tuple(e for e in m.exclusions if e not in d.exclusions),
+                )
+            deps.append(d)
+        self._models[key] = out
+        return out
+
+    def project_model(self, rel: str) -> _Model | None:
+        pom = self.project_pom(rel)
+        return self.model(("project", rel), pom, rel) if pom is not None else None
+
+    def _dependency_model(self, d: Dependency, version: str) -> _Model | None:
+        rel = self.reactor.get((d.group, d.artifact))
+        if rel is not None:
+            return self.project_model(rel)
+        key = ("repo", d.group, d.artifact, version)
+        if key in self._models:
+            return self._models[key]
+        pom = self.repo_pom(d.group, d.artifact, version)
+        return self.model(key, pom, None) if pom is not None else None
+
+    # ------------------------------------------------------------ graph
+
+    def resolve(self, rel: str, root: _Model, graph: "MavenGraph") -> None:
+        """Breadth-first transitive resolution from one module, Maven style.
+
+        Nearest declaration wins (first one at equal depth); the module's
+        dependency management also pins transitive versions and scopes;
+        optional and test/provided dependencies of dependencies are not
+        followed; exclusions apply to the whole subtree.
+        """
+        root_ref = graph.add_module(rel, root)
+        chosen: dict[DepKey, str] = {}
+        queue: deque[tuple[str, Dependency, str, frozenset[tuple[str, str]], bool]] = deque(
+            (root_ref, d, d.scope or "compile", frozenset(d.exclusions), True) for d in root.dependencies
+        )
+        while queue:
+            parent_ref, d, scope, exclusions, direct = queue.popleft()
+            if not direct:
+                m = root.managed_for(d.key)
+                if m is not None:
+                    d = d._replace(version=m.version or d.version, scope=m.scope or d.scope)
+                    if m.scope:
+                        scope = m.scope
+            ref = chosen.get(d.key)
+            if ref is not None:
+                graph.link(parent_ref, ref, scope)
+                continue
+            version = d.version
+            if version and _resolved(version) and version[:1] in "[(":
+                version = self.pick_version(d.group, d.artifact, version)
+            reactor_rel = self.reactor.get((d.group, d.artifact))
+            if reactor_rel is not None:
+                ref = graph.module_ref(reactor_rel) or _purl(d.group, d.artifact, version, d.type, d.classifier)
+            else:
+                ref = graph.add_library(d, version if _resolved(version) else None)
+            chosen[d.key] = ref
+            graph.link(parent_ref, ref, scope)
+            if scope == "system" or (reactor_rel is None and not _resolved(version)):
+                continue
+            assert version is not None
+            model = self._dependency_model(d, version)
+            if model is None:
+                continue
+            for child in model.dependencies:
+                child_scope = _SCOPE_MEDIATION.get((scope, child.scope or "compile"))
+                if child_scope is None or child.optional or _excluded(child, exclusions):
+                    continue
+                queue.append((ref, child, child_scope, exclusions | frozenset(child.exclusions), False))
+
+
+class MavenGraph:
+    """Components and ``dependsOn`` edges accumulated over the modules of a build."""
+
+    def __init__(self, root_dir: str = "") -> None:
+        self.root_dir = root_dir
+        self.components: dict[str, dict[str, Any]] = {}
+        self.scopes: dict[str, str] = {}
+        self.edges: dict[str, dict[str, None]] = {}
+        self.unresolved = 0
+        self._module_refs: dict[str, str] = {}
+
+    def module_label(self, rel: str) -> str:
+        """Directory of a module POM relative to the build root ("." for the root)."""
+        d = posixpath.dirname(rel)
+        if self.root_dir:
+            d = posixpath.relpath(d or ".", self.root_dir)
+        return d or "."
+
+    def module_ref(self, rel: str) -> str | None:
+        return self._module_refs.get(rel)
+
+    def register_module(self, rel: str, model: _Model) -> None:
+        self._module_refs[rel] = _purl(model.group, model.artifact, model.version or None)
+
+    def add_module(self, rel: str, model: _Model) -> str:
+        ref = _purl(model.group, model.artifact, model.version or None)
+        if ref not in self.components:
+            self.components[ref] = {
+                "type": "library",
+                "group": model.group,
+                "name": model.artifact,
+                "version": model.version or "unknown",
+                "purl": ref,
+                "bom-ref": ref,
+                "properties": [{"name": "sca:module", "value": self.module_label(rel)}],
+            }
+            self.edges.setdefault(ref, {})
+        return ref
+
+    def add_library(self, d: Dependency, version: str | None) -> str:
+        ref = _purl(d.group, d.artifact, version, d.type, d.classifier)
+        if ref not in self.components:
+            comp: dict[str, Any] = {"type": "library", "group": d.group, "name": d.artifact}
+            if version:
+                comp["version"] = version
+            else:
+                self.unresolved += 1
+            comp["purl"] = ref
+            comp["bom-ref"] = ref
+            if not version:
+                comp["properties"] = [{"name": "sca:unresolvedVersion", "value": d.version or ""}]
+            self.components[ref] = comp
+            self.edges.setdefault(ref, {})
+        return ref
+
+    def link(self, parent: str, child: str, scope: str) -> None:
+        if parent != child:
+            self.edges.setdefault(parent, {})[child] = None
+        cur = self.scopes.get(child)
+        if cur is None or _SCOPE_STRENGTH.get(scope, 0) > _SCOPE_STRENGTH.get(cur, 0):
+            self.scopes[child] = scope
+
+
+def _module_pom_rel(pom_rel: str, module: str) -> str | None:
+    rel = posixpath.normpath(posixpath.join(posixpath.dirname(pom_rel), module))
+    if rel.startswith("../") or rel == "..":
+        return None
+    if not rel.endswith(".xml"):
+        rel = "pom.xml" if rel == "." else posixpath.join(rel, "pom.xml")
+    return rel
+
+
+def resolve_build(
+    root_rel: str, read_project: Callable[[str], bytes | None], *, repo: Path | None, pom_cache: PomCache = POM_CACHE
+) -> tuple[MavenResolver, MavenGraph, list[str]]:
+    """Resolve the build rooted at ``root_rel`` (its ``<modules>``, recursively).
+
+    Returns the resolver (for inputs and statistics), the graph and the
+    module POM paths in reactor order (root first).
+    """
+    resolver = MavenResolver(read_project, repo=repo, pom_cache=pom_cache)
+    modules: list[str] = []
+    pending = [root_rel]
+    while pending:
+        rel = pending.pop(0)
+        if rel in modules:
+            continue
+        pom = resolver.project_pom(rel)
+        if pom is None:
+            if rel == root_rel:
+                raise FileNotFoundError(f"未找到 {rel}")
+            continue
+        modules.append(rel)
+        pending.extend(m for m in (_module_pom_rel(rel, mod) for mod in pom.modules) if m is not None)
+
+    graph = MavenGraph(posixpath.dirname(root_rel))
+    models: list[tuple[str, _Model]] = []
+    for rel in modules:
+        model = resolver.project_model(rel)
+        if model is None:
+            continue
+        resolver.reactor[(model.group, model.artifact)] = rel
+        graph.register_module(rel, model)
+        models.append((rel, model))
+    for rel, model in models:
+        resolver.resolve(rel, model, graph)
+    return resolver, graph, modules
+
+
+def _build_sbom_from_maven(graph: MavenGraph, root: _Model | None, project_name: str) -> dict[str, Any]:
+    sbom = make_cyclonedx_base(_TOOL, _TOOL_VERSION)
+    components: list[dict[str, Any]] = []
+    for ref, comp in graph.components.items():
+        scope = graph.scopes.get(ref)
+        if scope is not None:
+            comp = {**comp, "properties": [*comp.get("properties", ()), {"name": "sca:scope", "value": scope}]}
+        components.append(comp)
+
+    # top-level component (application)
+    app: dict[str, Any] = {"type": "application", "name": project_name, "version": "unknown"}
+    if root is not None and root.artifact:
+        app = {"type": "application", "group": root.group, "name": root.artifact, "version": root.version or "unknown"}
+    sbom["metadata"]["component"] = app
+    sbom["components"] = components
+
+    deps_graph: list[dict[str, Any]] = []
+    for ref, on in graph.edges.items():
+        entry: dict[str, Any] = {"ref": ref}
+        if on:
+            entry["dependsOn"] = list(on)
+        deps_graph.append(entry)
+    if deps_graph:
+        sbom["dependencies"] = deps_graph
+    return sbom
+
+
+def _inputs_key(
+    build_key: str,
+    project: dict[str, bytes | None],
+    repo_files: dict[str, tuple[int, int] | None],
+    repo_dirs: dict[str, tuple[int, int] | None],
+) -> str:
+    """SBOM cache key over everything a resolution consulted: project POM bytes and repository stamps."""
+
+    def _stamp(v: tuple[int, int] | None) -> bytes:
+        return f"{v[0]}:{v[1]}".encode("ascii") if v is not None else b"missing"
+
+    inputs = [("build", build_key.encode("ascii"))]
+    inputs += [(f"pom:{rel}", data if data is not None else b"\0missing") for rel, data in sorted(project.items())]
+    inputs += [(f"repo:{path}", _stamp(v)) for path, v in sorted(repo_files.items())]
+    inputs += [(f"dir:{path}", _stamp(v)) for path, v in sorted(repo_dirs.items())]
+    return cache_key(_TOOL, _TOOL_VERSION, inputs)
+
+
+def scan_java_maven(*, input_path: Path, results_dir: Path, context: ScanContext | None = None) -> ScanArtifacts:
+    input_path = input_path.resolve()
+    results_dir = results_dir.resolve()
+    repo = local_repository()
+    repo_dir = repo if repo.is_dir() else None
+    project_name = input_name(input_path)
+
+    with ensure_scan_context(input_path, results_dir, context) as ctx:
+        pom_rel = ctx.find("pom.xml")
+        if pom_rel is None:
+            if ctx.fs.is_archive:
+                raise FileNotFoundError("zip 内未找到 pom.xml")
+            raise FileNotFoundError("未找到 pom.xml")
+        pom_path = ctx.display_path(pom_rel)
+        cache = ctx.cache
+        sbom_format = ctx.sbom_format
+        vulndb = ctx.vulndb
+
+        def _read(rel: str) -> bytes | None:
+            if not ctx.fs.is_file(rel):
+                return None
+            return ctx.read_bytes(rel)
+
+        # 解析（父 POM 链、BOM、依赖 POM 遍历本地仓库）才是开销所在：上次解析用到的文件记录在
+        # 以根 POM 为键的条目中，命中时只需重读项目 POM、stat 这些仓库文件即可算出 SBOM 的缓存键
+        root_bytes = _read(pom_rel) or b""
+        build_key = cache_key(
+            _TOOL,
+            _TOOL_VERSION,
+            [
+                ("root", pom_rel.encode("utf-8")),
+                ("pom", root_bytes),
+                ("repository", str(repo_dir).encode("utf-8")),
+                ("project", project_name.encode("utf-8")),
+            ],
+        )
+        hit: tuple[dict[str, Any], dict[str, Any]] | None = None
+        if cache is not None:
+            with span("probe_cache") as sp:
+                record = cache.get(build_key)
+                if record is not None:
+                    consulted = record[1]
+                    key = _inputs_key(
+                        build_key,
+                        {rel: _read(rel) for rel in consulted["projectPoms"]},
+                        {path: _stat_stamp(path) for path in consulted["repoFiles"]},
+                        {path: _stat_stamp(path) for path in consulted["repoDirs"]},
+                    )
+                    hit = cache.get(key)
+                if sp is not None:
+                    sp.set(cache="hit" if hit is not None else "miss")
+        if hit is None:
+            with span("resolve_poms"):
+                resolver, graph, modules = resolve_build(pom_rel, _read, repo=repo_dir)
+
+    out_dir = unique_output_dir(results_dir / "java" / slug(input_name(input_path)) / ts_compact())
+    sbom_path = out_dir / sbom_file_name(sbom_format)
+    vuln_report_path = out_dir / "vuln_report.json"
+    details_path = out_dir / "scan_details.json"
+
+    if hit is not None:
+        sbom, cached_details = restamp_sbom(hit[0]), hit[1]
+        repo_parsed = 0
+        status = cache_status(cache, True)
+    else:
+        root_model = resolver.project_model(pom_rel)
+
+        def _build() -> tuple[dict[str, Any], dict[str, Any]]:
+            built = _build_sbom_from_maven(graph, root_model, project_name)
+            missing = list(resolver.missing)
+            return built, {
+                "modules": [graph.module_label(m) for m in modules],
+                "projectPoms": len(resolver.project_bytes),
+                "repositoryPoms": sum(1 for s in resolver.repo_files.values() if s is not None),
+                "missingPoms": len(missing),
+                "missingPomSamples": missing[:_MISSING_SAMPLES],
+                "unresolvedVersions": graph.unresolved,
+                "components": len(built.get("components", [])),
+            }
+
+        # 仓库中的 POM 以路径 + mtime + 大小计入，本地仓库内容变化后不会命中旧结果
+        project = {rel: resolver.project_bytes.get(rel) for rel in resolver.project_poms}
+        key = _inputs_key(build_key, project, resolver.repo_files, resolver.repo_dirs)
+        sbom, cached_details, was_hit = cached_build(cache, key, _build)
+        if cache is not None:
+            consulted = {
+                "projectPoms": sorted(project),
+                "repoFiles": sorted(resolver.repo_files),
+                "repoDirs": sorted(resolver.repo_dirs),
+            }
+            cache.put(build_key, {}, consulted, replace=True)
+        repo_parsed = resolver.repo_parsed
+        status = cache_status(cache, was_hit)
+    write_json(sbom_path, sbom, fmt=sbom_format)
+
+    write_json(vuln_report_path, build_vuln_report(sbom, tool=_TOOL, index=vulndb))
+
+    write_json(
+        details_path,
+        {
+            "inputPath": str(input_path),
+            "pomFile": str(pom_path),
+            "localRepository": str(repo_dir) if repo_dir is not None else None,
+            **cached_details,
+            # 本次扫描新解析的仓库 POM 数（其余来自进程内 POM 缓存；缓存命中时不解析）
+            "repositoryPomsParsed": repo_parsed,
+            "cache": status,
+        },
+    )
+
+    return ScanArtifacts(out_dir, sbom_path, vuln_report_path, details_path)
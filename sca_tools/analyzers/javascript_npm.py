@@ -1,13 +1,24 @@
 from __future__ import annotations
 
+import hashlib
 import json
 from pathlib import Path
-from typing import Any
+from typing import Any, BinaryIO, Iterable, Iterator
 
-from unified_sca.zip_utils import safe_extract_zip, cleanup_work_dir
+from ..base import ScanArtifacts, ScanContext
+from ..cache import cache_status, cached_build
+from ..cache import cache_key_from_digests, sha256_stream
+from ..context import ensure_scan_context
+from ..jsonstream import JsonStream
+from ..utils import input_name, make_cyclonedx_base, slug, ts_compact, sbom_file_name, unique_output_dir, write_json
+from ..vulndb import build_vuln_report
 
-from ..base import ScanArtifacts
-from ..utils import make_cyclonedx_base, slug, ts_compact, write_json
+
+_TOOL = "sca-js-npm"
+_TOOL_VERSION = "0.2.0"
+
+# lock 超过该大小时改用流式解析，避免整棵 JSON 树常驻内存
+STREAMING_THRESHOLD_BYTES = 32 * 1024 * 1024
 
 
 def _encode_npm_name(name: str) -> str:
@@ -15,169 +26,206 @@ def _encode_npm_name(name: str) -> str:
     return name.replace(" ", "%20")
 
 
-def _build_sbom_from_package_lock(lock: dict[str, Any]) -> dict[str, Any]:
-    sbom = make_cyclonedx_base("sca-js-npm")
-    components: list[dict[str, Any]] = []
-    seen: set[str] = set()
-    purl_by_name_version: dict[tuple[str, str], str] = {}
-    purl_by_name: dict[str, str] = {}
-
+def _name_from_path(pkg_path: str) -> str | None:
+    # npm lock v2 sometimes omits "name" for nested nodes; derive from path.
+    # The package name is whatever follows the innermost node_modules/.
+    if pkg_path.startswith("node_modules/") or "/node_modules/" in pkg_path:
+        return pkg_path.rsplit("node_modules/", 1)[1]
+    return None
+
+
+def _resolve_dependency(
+    from_path: str, dep_name: str, purl_by_path: dict[str, str], link_targets: dict[str, str]
+) -> str | None:
+    """Resolve ``dep_name`` as required from ``from_path`` using npm's lookup rules.
+
+    Walks up the directory chain of ``from_path`` and checks
+    ``<dir>/node_modules/<dep_name>`` at each level, so the cost is O(depth)
+    dict lookups regardless of how many copies of the package exist.
+    Workspace ``link`` entries are followed to their target.
+    """
+    parts = from_path.split("/") if from_path else []
+    while True:
+        # node_modules/ 与 @scope/ 这两级本身不是包目录，跳过
+        if not parts or (parts[-1] != "node_modules" and not parts[-1].startswith("@")):
+            prefix = "/".join(parts)
+            cand = f"{prefix}/node_modules/{dep_name}" if prefix else f"node_modules/{dep_name}"
+            purl = purl_by_path.get(cand)
+            if purl is not None:
+                return purl
+            target = link_targets.get(cand)
+            if target is not None:
+                return purl_by_path.get(target)
+        if not parts:
+            return None
+        parts.pop()
+
+
+def _iter_lock_events(lock: dict[str, Any]) -> Iterator[tuple[str, str, Any]]:
+    """Adapt an already-parsed lock to the event stream the builder consumes."""
     packages = lock.get("packages")
     if isinstance(packages, dict):
+        yield ("packages", "", None)
         for pkg_path, info in packages.items():
-            if pkg_path == "":
-                continue
-            if not isinstance(info, dict):
-                continue
-            name = info.get("name")
+            yield ("package", pkg_path, info)
+        return
+    # fallback: old lockfileVersion may only have "dependencies"
+    deps = lock.get("dependencies")
+    if isinstance(deps, dict):
+        for name, info in deps.items():
+            yield ("dependency", name, info)
+
+
+def _iter_lock_events_stream(fp: BinaryIO) -> Iterator[tuple[str, str, Any]]:
+    """Same events as ``_iter_lock_events``, read incrementally from ``fp``.
+
+    Only one ``packages`` entry is decoded at a time; every other top-level
+    value (including the legacy ``dependencies`` tree once ``packages`` has
+    been seen) is skipped without being built.
+    """
+    js = JsonStream(fp)
+    seen_packages = False
+    for key in js.iter_object():
+        if key == "packages" and js.peek() == "{":
+            seen_packages = True
+            yield ("packages", "", None)
+            for pkg_path in js.iter_object():
+                yield ("package", pkg_path, js.read_value())
+        elif key == "dependencies" and not seen_packages and js.peek() == "{":
+            for name in js.iter_object():
+                yield ("dependency", name, js.read_value())
+        else:
+            js.skip_value()
+
+
+def _build_sbom_from_lock_events(events: Iterable[tuple[str, str, Any]]) -> dict[str, Any]:
+    """Build components and the dependency graph in a single pass."""
+    sbom = make_cyclonedx_base(_TOOL, _TOOL_VERSION)
+    components: list[dict[str, Any]] = []
+    seen: set[str] = set()
+    purl_by_name: dict[str, str] = {}
+    purl_by_path: dict[str, str] = {}
+    link_targets: dict[str, str] = {}
+    has_packages = False
+    # (ref, path, dependency names) per packages entry; resolved once every path is known
+    pending: list[tuple[str, str, list[str]]] = []
+    # legacy "dependencies" entries, only used when there is no "packages" section
+    legacy: list[tuple[str, str]] = []
+
+    for kind, key, info in events:
+        if kind == "packages":
+            has_packages = True
+            continue
+        if not isinstance(info, dict):
+            continue
+        if kind == "dependency":
             version = info.get("version")
-            if not name or not version:
-                # npm lock v2 sometimes omits "name" for nested nodes;
-                # try derive from path.
-                if isinstance(pkg_path, str) and pkg_path.startswith("node_modules/"):
-                    name = pkg_path[len("node_modules/") :]
-            if not name or not version:
-                continue
+            if version:
+                legacy.append((key, version))
+            continue
+        if key == "":
+            continue
+        if info.get("link") and isinstance(info.get("resolved"), str):
+            link_targets[key] = info["resolved"]
+        name = info.get("name")
+        version = info.get("version")
+        if not name or not version:
+            name = _name_from_path(key) or name
+        if not name or not version:
+            continue
+        purl = f"pkg:npm/{_encode_npm_name(name)}@{version}"
+        purl_by_path[key] = purl
+        if purl not in seen:
+            seen.add(purl)
+            # fallback only, for locks whose node_modules layout is incomplete
+            purl_by_name.setdefault(name, purl)
+            components.append({"type": "library", "name": name, "version": version, "purl": purl, "bom-ref": purl})
+        deps = info.get("dependencies")
+        pending.append((purl, key, [dn for dn in deps if isinstance(dn, str)] if isinstance(deps, dict) else []))
+
+    if not has_packages:
+        for name, version in legacy:
             purl = f"pkg:npm/{_encode_npm_name(name)}@{version}"
             if purl in seen:
                 continue
             seen.add(purl)
-            purl_by_name_version[(name, version)] = purl
-            # best-effort: keep first purl per name
-            purl_by_name.setdefault(name, purl)
-            components.append(
-                {
-                    "type": "library",
-                    "name": name,
-                    "version": version,
-                    "purl": purl,
-                    "bom-ref": purl,
-                }
-            )
-    else:
-        # fallback: old lockfileVersion may only have "dependencies"
-        deps = lock.get("dependencies")
-        if isinstance(deps, dict):
-            for name, info in deps.items():
-                if not isinstance(info, dict):
-                    continue
-                version = info.get("version")
-                if not version:
-                    continue
-                purl = f"pkg:npm/{_encode_npm_name(name)}@{version}"
-                if purl in seen:
-                    continue
-                seen.add(purl)
-                purl_by_name_version[(name, version)] = purl
-                purl_by_name.setdefault(name, purl)
-                components.append(
-                    {
-                        "type": "library",
-                        "name": name,
-                        "version": version,
-                        "purl": purl,
-                        "bom-ref": purl,
-                    }
-                )
+            components.append({"type": "library", "name": name, "version": version, "purl": purl, "bom-ref": purl})
 
     sbom["components"] = components
 
     # dependencies graph (best-effort)
     deps_graph: list[dict[str, Any]] = []
-    if isinstance(packages, dict):
-        for pkg_path, info in packages.items():
-            if pkg_path == "" or not isinstance(info, dict):
-                continue
-            name = info.get("name")
-            version = info.get("version")
-            if not name or not version:
-                if isinstance(pkg_path, str) and pkg_path.startswith("node_modules/"):
-                    name = pkg_path[len("node_modules/") :]
-            if not name or not version:
-                continue
-            ref = purl_by_name_version.get((name, version))
-            if not ref:
-                continue
-            depends_on: list[str] = []
-            deps = info.get("dependencies")
-            if isinstance(deps, dict):
-                for dn in deps.keys():
-                    if not isinstance(dn, str):
-                        continue
-                    # resolve by name only (lock can contain multiple versions)
-                    dp = purl_by_name.get(dn)
-                    if dp:
-                        depends_on.append(dp)
-            entry: dict[str, Any] = {"ref": ref}
-            if depends_on:
-                entry["dependsOn"] = depends_on
-            deps_graph.append(entry)
+    for ref, path, dep_names in pending:
+        depends_on: list[str] = []
+        for dn in dep_names:
+            dp = _resolve_dependency(path, dn, purl_by_path, link_targets) or purl_by_name.get(dn)
+            if dp:
+                depends_on.append(dp)
+        entry: dict[str, Any] = {"ref": ref}
+        if depends_on:
+            entry["dependsOn"] = depends_on
+        deps_graph.append(entry)
     if deps_graph:
         sbom["dependencies"] = deps_graph
     return sbom
 
 
-def scan_javascript_npm(*, input_path: Path, results_dir: Path) -> ScanArtifacts:
+def _build_sbom_from_package_lock(lock: dict[str, Any]) -> dict[str, Any]:
+    return _build_sbom_from_lock_events(_iter_lock_events(lock))
+
+
+def scan_javascript_npm(
+    *, input_path: Path, results_dir: Path, context: ScanContext | None = None
+) -> ScanArtifacts:
     input_path = input_path.resolve()
     results_dir = results_dir.resolve()
 
-    out_dir = results_dir / "javascript" / slug(input_path.stem if input_path.is_file() else input_path.name) / ts_compact()
-    sbom_path = out_dir / "sbom.json"
+    with ensure_scan_context(input_path, results_dir, context) as ctx:
+        lock_rel = ctx.find("package-lock.json")
+        if lock_rel is None:
+            if ctx.fs.is_archive:
+                raise FileNotFoundError("zip 内未找到 package-lock.json")
+            raise FileNotFoundError("未找到 package-lock.json")
+        lock_path = ctx.display_path(lock_rel)
+        cache = ctx.cache
+        sbom_format = ctx.sbom_format
+        vulndb = ctx.vulndb
+        streaming = ctx.file_size(lock_rel) >= STREAMING_THRESHOLD_BYTES
+        lock_bytes = b""
+        if streaming:
+            with ctx.open_binary(lock_rel) as fp:
+                lock_digest = sha256_stream(fp)
+        else:
+            lock_bytes = ctx.read_bytes(lock_rel)
+            lock_digest = hashlib.sha256(lock_bytes).hexdigest()
+
+        def _build() -> tuple[dict[str, Any], dict[str, Any]]:
+            if streaming:
+                with ctx.open_binary(lock_rel) as fp:
+                    built = _build_sbom_from_lock_events(_iter_lock_events_stream(fp))
+            else:
+                built = _build_sbom_from_package_lock(json.loads(lock_bytes.decode("utf-8")))
+            return built, {"components": len(built.get("components", [])), "streamingParse": streaming}
+
+        key = cache_key_from_digests(_TOOL, _TOOL_VERSION, [("package-lock.json", lock_digest)])
+        sbom, cached_details, hit = cached_build(cache, key, _build)
+
+    out_dir = unique_output_dir(results_dir / "javascript" / slug(input_name(input_path)) / ts_compact())
+    sbom_path = out_dir / sbom_file_name(sbom_format)
     vuln_report_path = out_dir / "vuln_report.json"
     details_path = out_dir / "scan_details.json"
+    write_json(sbom_path, sbom, fmt=sbom_format)
 
-    lock_path: Path | None = None
-    tmp_dir: Path | None = None
-    try:
-        if input_path.is_dir():
-            cand = input_path / "package-lock.json"
-            if cand.exists():
-                lock_path = cand
-            else:
-                raise FileNotFoundError("未找到 package-lock.json")
-        elif input_path.is_file() and input_path.suffix.lower() == ".zip":
-            tmp_dir = results_dir / "javascript" / ".work" / f"extract_{slug(input_path.stem)}_{ts_compact()}"
-            res = safe_extract_zip(input_path, tmp_dir)
-            cand = res.extracted_root / "package-lock.json"
-            if not cand.exists():
-                # search
-                hits = list(res.extracted_root.rglob("package-lock.json"))
-                if hits:
-                    cand = hits[0]
-            if not cand.exists():
-                raise FileNotFoundError("zip 内未找到 package-lock.json")
-            lock_path = cand
-        else:
-            raise FileNotFoundError("输入必须是目录或zip")
-
-        lock = json.loads(lock_path.read_text(encoding="utf-8"))
-        sbom = _build_sbom_from_package_lock(lock)
-        write_json(sbom_path, sbom)
-
-        # vulnerabilities: placeholder (productization hook)
-        write_json(
-            vuln_report_path,
-            {
-                "generated_at": sbom["metadata"]["timestamp"],
-                "tool": "sca-js-npm",
-                "note": "vulnerability scanning not implemented in pure-python refactor yet",
-                "vulnerabilities_found": 0,
-                "vulnerabilities": [],
-            },
-        )
-
-        write_json(
-            details_path,
-            {
-                "inputPath": str(input_path),
-                "lockFile": str(lock_path),
-                "components": len(sbom.get("components", [])),
-            },
-        )
-
-        return ScanArtifacts(out_dir, sbom_path, vuln_report_path, details_path)
-    finally:
-        if tmp_dir:
-            cleanup_work_dir(tmp_dir)
+    write_json(vuln_report_path, build_vuln_report(sbom, tool=_TOOL, index=vulndb))
 
+    write_json(
+        details_path,
+        {
+            "inputPath": str(input_path),
+            "lockFile": str(lock_path),
+            **cached_details,
+            "cache": cache_status(cache, hit),
+        },
+    )
 
+    return ScanArtifacts(out_dir, sbom_path, vuln_report_path, details_path)
@@ -4,22 +4,16 @@ import re
 from pathlib import Path
 from typing import Any
 
-from unified_sca.zip_utils import safe_extract_zip, cleanup_work_dir
+from ..base import ScanArtifacts, ScanContext
+from ..cache import cache_key, cache_status, cached_build
+from ..context import ensure_scan_context
+from ..tomllock import load_lock, load_toml
+from ..utils import input_name, make_cyclonedx_base, slug, ts_compact, sbom_file_name, unique_output_dir, write_json
+from ..vulndb import build_vuln_report
 
-from ..base import ScanArtifacts
-from ..utils import make_cyclonedx_base, slug, ts_compact, write_json
 
-
-def _load_toml(path: Path) -> dict[str, Any]:
-    data = path.read_bytes()
-    try:
-        import tomllib  # py3.11+
-
-        return tomllib.loads(data.decode("utf-8"))
-    except Exception:
-        import tomli  # type: ignore
-
-        return tomli.loads(data.decode("utf-8"))
+_TOOL = "sca-python-pyproject"
+_TOOL_VERSION = "0.1.0"
 
 
 _DEP_RE = re.compile(r"^\s*([A-Za-z0-9_.-]+)\s*(.*)$")
@@ -41,7 +35,7 @@ def _parse_dep(dep: str) -> tuple[str, str | None]:
 
 
 def _build_sbom(project: dict[str, Any], packages: list[tuple[str, str]]) -> dict[str, Any]:
-    sbom = make_cyclonedx_base("sca-python-pyproject")
+    sbom = make_cyclonedx_base(_TOOL, _TOOL_VERSION)
     name = (project.get("name") or "python-project").strip()
     version = (project.get("version") or "unknown").strip()
     sbom["metadata"]["component"] = {"type": "application", "name": name, "version": version}
@@ -66,9 +60,9 @@ def _build_sbom(project: dict[str, Any], packages: list[tuple[str, str]]) -> dic
     return sbom
 
 
-def _parse_requirements_lock(path: Path) -> list[tuple[str, str]]:
+def _parse_requirements_lock(text: str) -> list[tuple[str, str]]:
     out: list[tuple[str, str]] = []
-    for line in path.read_text(encoding="utf-8").splitlines():
+    for line in text.splitlines():
         s = line.strip()
         if not s or s.startswith("#"):
             continue
@@ -107,88 +101,55 @@ def _extract_packages_from_toml_lock(lock: dict[str, Any]) -> list[tuple[str, st
     return []
 
 
-def scan_python_pyproject(*, input_path: Path, results_dir: Path) -> ScanArtifacts:
+def scan_python_pyproject(
+    *, input_path: Path, results_dir: Path, context: ScanContext | None = None
+) -> ScanArtifacts:
     input_path = input_path.resolve()
     results_dir = results_dir.resolve()
 
-    out_dir = results_dir / "python" / slug(input_path.stem if input_path.is_file() else input_path.name) / ts_compact()
-    sbom_path = out_dir / "sbom.json"
-    vuln_report_path = out_dir / "vuln_report.json"
-    details_path = out_dir / "scan_details.json"
-
     pyproject_path: Path | None = None
-    lock_source: str = "pyproject-direct"
-    packages: list[tuple[str, str]] = []
-    tmp_dir: Path | None = None
-    try:
-        if input_path.is_dir():
-            # prefer lock files for transitive dependencies
-            req_lock = input_path / "requirements.lock"
-            uv_lock = input_path / "uv.lock"
-            poetry_lock = input_path / "poetry.lock"
-            req_txt = input_path / "requirements.txt"
-
-            if req_lock.exists():
-                packages = _parse_requirements_lock(req_lock)
-                lock_source = "requirements.lock"
-            elif uv_lock.exists():
-                packages = _extract_packages_from_toml_lock(_load_toml(uv_lock))
-                lock_source = "uv.lock"
-            elif poetry_lock.exists():
-                packages = _extract_packages_from_toml_lock(_load_toml(poetry_lock))
-                lock_source = "poetry.lock"
-            elif req_txt.exists():
-                packages = _parse_requirements_lock(req_txt)
-                lock_source = "requirements.txt"
-
-            cand = input_path / "pyproject.toml"
-            if cand.exists():
-                pyproject_path = cand
-            else:
-                # allow lock-only input
-                if not packages:
-                    raise FileNotFoundError("未找到 pyproject.toml（也未找到可用 lock 文件）")
-        elif input_path.is_file() and input_path.suffix.lower() == ".zip":
-            tmp_dir = results_dir / "python" / ".work" / f"extract_{slug(input_path.stem)}_{ts_compact()}"
-            res = safe_extract_zip(input_path, tmp_dir)
-            root = res.extracted_root
-            # lock preference
-            for rel, src in (
-                ("requirements.lock", "requirements.lock"),
-                ("uv.lock", "uv.lock"),
-                ("poetry.lock", "poetry.lock"),
-                ("requirements.txt", "requirements.txt"),
-            ):
-                p = root / rel
-                if not p.exists():
-                    hits = list(root.rglob(rel))
-                    if hits:
-                        p = hits[0]
-                if p.exists():
-                    if src in ("requirements.lock", "requirements.txt"):
-                        packages = _parse_requirements_lock(p)
-                    else:
-                        packages = _extract_packages_from_toml_lock(_load_toml(p))
-                    lock_source = src
-                    break
-
-            cand = root / "pyproject.toml"
-            if not cand.exists():
-                hits = list(root.rglob("pyproject.toml"))
-                if hits:
-                    cand = hits[0]
-            if cand.exists():
-                pyproject_path = cand
-            else:
-                if not packages:
-                    raise FileNotFoundError("zip 内未找到 pyproject.toml（也未找到可用 lock 文件）")
-        else:
-            raise FileNotFoundError("输入必须是目录或zip")
+    pyproject_bytes: bytes | None = None
+    lock_name: str | None = None
+    lock_bytes = b""
+    with ensure_scan_context(input_path, results_dir, context) as ctx:
+        # prefer lock files for transitive dependencies
+        for name in ("requirements.lock", "uv.lock", "poetry.lock", "requirements.txt"):
+            rel = ctx.find(name)
+            if rel is None:
+                continue
+            lock_name = name
+            lock_bytes = ctx.read_bytes(rel)
+            break
+
+        rel = ctx.find("pyproject.toml")
+        if rel is not None:
+            pyproject_path = ctx.display_path(rel)
+            pyproject_bytes = ctx.read_bytes(rel)
+        cache = ctx.cache
+        sbom_format = ctx.sbom_format
+        vulndb = ctx.vulndb
+        is_archive = ctx.fs.is_archive
+
+    def _build() -> tuple[dict[str, Any], dict[str, Any]]:
+        lock_source = "pyproject-direct"
+        packages: list[tuple[str, str]] = []
+        if lock_name in ("requirements.lock", "requirements.txt"):
+            packages = _parse_requirements_lock(lock_bytes.decode("utf-8"))
+            lock_source = lock_name
+        elif lock_name is not None:
+            packages = _extract_packages_from_toml_lock(load_lock(lock_bytes))
+            lock_source = lock_name
+
+        if pyproject_bytes is None and not packages:
+            # allow lock-only input
+            if is_archive:
+                raise FileNotFoundError("zip 内未找到 pyproject.toml（也未找到可用 lock 文件）")
+            raise FileNotFoundError("未找到 pyproject.toml（也未找到可用 lock 文件）")
 
         project: dict[str, Any] = {}
         deps_direct: list[str] = []
-        if pyproject_path is not None:
-            cfg = _load_toml(pyproject_path)
+        if pyproject_bytes is not None:
+            cfg = load_toml(pyproject_bytes)
             project = cfg.get("project") if isinstance(cfg.get("project"), dict) else {}
             deps_direct = project.get("dependencies") if isinstance(project.get("dependencies"), list) else []
             deps_direct = [d for d in deps_direct if isinstance(d, str)]
@@ -200,35 +161,33 @@ def scan_python_pyproject(*, input_path: Path, results_dir: Path) -> ScanArtifac
                 n, v = _parse_dep(d)
                 packages.append((n, v or "unknown"))
 
-        sbom = _build_sbom(project, packages)
-        write_json(sbom_path, sbom)
-
-        write_json(
-            vuln_report_path,
-            {
-                "generated_at": sbom["metadata"]["timestamp"],
-                "tool": "sca-python-pyproject",
-                "note": "vulnerability scanning not implemented in pure-python refactor yet",
-                "vulnerabilities_found": 0,
-                "vulnerabilities": [],
-            },
-        )
-
-        write_json(
-            details_path,
-            {
-                "inputPath": str(input_path),
-                "pyproject": str(pyproject_path) if pyproject_path else None,
-                "dependencySource": lock_source,
-                "directDependencies": len(deps_direct),
-                "packagesInSbom": len(packages),
-                "components": len(sbom.get("components", [])),
-            },
-        )
-
-        return ScanArtifacts(out_dir, sbom_path, vuln_report_path, details_path)
-    finally:
-        if tmp_dir:
-            cleanup_work_dir(tmp_dir)
+        built = _build_sbom(project, packages)
+        return built, {
+            "dependencySource": lock_source,
+            "directDependencies": len(deps_direct),
+            "packagesInSbom": len(packages),
+            "components": len(built.get("components", [])),
+        }
+
+    inputs = [(lock_name or "", lock_bytes), ("pyproject.toml", pyproject_bytes or b"")]
+    sbom, cached_details, hit = cached_build(cache, cache_key(_TOOL, _TOOL_VERSION, inputs), _build)
+
+    out_dir = unique_output_dir(results_dir / "python" / slug(input_name(input_path)) / ts_compact())
+    sbom_path = out_dir / sbom_file_name(sbom_format)
+    vuln_report_path = out_dir / "vuln_report.json"
+    details_path = out_dir / "scan_details.json"
+    write_json(sbom_path, sbom, fmt=sbom_format)
+
+    write_json(vuln_report_path, build_vuln_report(sbom, tool=_TOOL, index=vulndb))
 
+    write_json(
+        details_path,
+        {
+            "inputPath": str(input_path),
+            "pyproject": str(pyproject_path) if pyproject_path else None,
+            **cached_details,
+            "cache": cache_status(cache, hit),
+        },
+    )
 
+    return ScanArtifacts(out_dir, sbom_path, vuln_report_path, details_path)
@@ -3,26 +3,20 @@ from __future__ import annotations
 from pathlib import Path
 from typing import Any
 
-from unified_sca.zip_utils import safe_extract_zip, cleanup_work_dir
+from ..base import ScanArtifacts, ScanContext
+from ..cache import cache_key, cache_status, cached_build
+from ..context import ensure_scan_context
+from ..tomllock import load_lock
+from ..utils import input_name, make_cyclonedx_base, slug, ts_compact, sbom_file_name, unique_output_dir, write_json
+from ..vulndb import build_vuln_report
 
-from ..base import ScanArtifacts
-from ..utils import make_cyclonedx_base, slug, ts_compact, write_json
 
-
-def _load_toml(path: Path) -> dict[str, Any]:
-    data = path.read_bytes()
-    try:
-        import tomllib  # py3.11+
-
-        return tomllib.loads(data.decode("utf-8"))
-    except Exception:
-        import tomli  # type: ignore
-
-        return tomli.loads(data.decode("utf-8"))
+_TOOL = "sca-rust-cargo"
+_TOOL_VERSION = "0.1.0"
 
 
 def _build_sbom_from_cargo_lock(lock: dict[str, Any], project_name: str = "rust-project") -> dict[str, Any]:
-    sbom = make_cyclonedx_base("sca-rust-cargo")
+    sbom = make_cyclonedx_base(_TOOL, _TOOL_VERSION)
     packages = lock.get("package") or lock.get("packages")  # Cargo.lock uses "package"
     components: list[dict[str, Any]] = []
     seen: set[str] = set()
@@ -96,66 +90,50 @@ def _build_sbom_from_cargo_lock(lock: dict[str, Any], project_name: str = "rust-
     return sbom
 
 
-def scan_rust_cargo(*, input_path: Path, results_dir: Path) -> ScanArtifacts:
+def scan_rust_cargo(
+    *, input_path: Path, results_dir: Path, context: ScanContext | None = None
+) -> ScanArtifacts:
     input_path = input_path.resolve()
     results_dir = results_dir.resolve()
 
-    out_dir = results_dir / "rust" / slug(input_path.stem if input_path.is_file() else input_path.name) / ts_compact()
-    sbom_path = out_dir / "sbom.json"
+    with ensure_scan_context(input_path, results_dir, context) as ctx:
+        lock_rel = ctx.find("Cargo.lock")
+        if lock_rel is None:
+            if ctx.fs.is_archive:
+                raise FileNotFoundError("zip 内未找到 Cargo.lock")
+            raise FileNotFoundError("未找到 Cargo.lock（离线纯Python版本要求项目自带 lock）")
+        lock_path = ctx.display_path(lock_rel)
+        lock_bytes = ctx.read_bytes(lock_rel)
+        cache = ctx.cache
+        sbom_format = ctx.sbom_format
+        vulndb = ctx.vulndb
+
+    out_dir = unique_output_dir(results_dir / "rust" / slug(input_name(input_path)) / ts_compact())
+    sbom_path = out_dir / sbom_file_name(sbom_format)
     vuln_report_path = out_dir / "vuln_report.json"
     details_path = out_dir / "scan_details.json"
 
-    lock_path: Path | None = None
-    tmp_dir: Path | None = None
-    try:
-        if input_path.is_dir():
-            cand = input_path / "Cargo.lock"
-            if not cand.exists():
-                raise FileNotFoundError("未找到 Cargo.lock（离线纯Python版本要求项目自带 lock）")
-            lock_path = cand
-        elif input_path.is_file() and input_path.suffix.lower() == ".zip":
-            tmp_dir = results_dir / "rust" / ".work" / f"extract_{slug(input_path.stem)}_{ts_compact()}"
-            res = safe_extract_zip(input_path, tmp_dir)
-            cand = res.extracted_root / "Cargo.lock"
-            if not cand.exists():
-                hits = list(res.extracted_root.rglob("Cargo.lock"))
-                if hits:
-                    cand = hits[0]
-            if not cand.exists():
-                raise FileNotFoundError("zip 内未找到 Cargo.lock")
-            lock_path = cand
-        else:
-            raise FileNotFoundError("输入必须是目录或zip")
-
-        lock = _load_toml(lock_path)
-        sbom = _build_sbom_from_cargo_lock(lock, project_name=(input_path.stem if input_path.is_file() else input_path.name))
-        write_json(sbom_path, sbom)
-
-        # vulnerabilities: placeholder (productization hook)
-        write_json(
-            vuln_report_path,
-            {
-                "generated_at": sbom["metadata"]["timestamp"],
-                "tool": "sca-rust-cargo",
-                "note": "vulnerability scanning not implemented in pure-python refactor yet",
-                "total_packages": len(sbom.get("components", [])),
-                "vulnerabilities_found": 0,
-                "vulnerabilities": [],
-            },
-        )
-
-        write_json(
-            details_path,
-            {
-                "inputPath": str(input_path),
-                "lockFile": str(lock_path),
-                "components": len(sbom.get("components", [])),
-            },
-        )
-
-        return ScanArtifacts(out_dir, sbom_path, vuln_report_path, details_path)
-    finally:
-        if tmp_dir:
-            cleanup_work_dir(tmp_dir)
+    project_name = input_name(input_path)
+
+    def _build() -> tuple[dict[str, Any], dict[str, Any]]:
+        lock = load_lock(lock_bytes)
+        built = _build_sbom_from_cargo_lock(lock, project_name=project_name)
+        return built, {"components": len(built.get("components", []))}
+
+    key = cache_key(_TOOL, _TOOL_VERSION, [("Cargo.lock", lock_bytes), ("project", project_name.encode("utf-8"))])
+    sbom, cached_details, hit = cached_build(cache, key, _build)
+    write_json(sbom_path, sbom, fmt=sbom_format)
+
+    write_json(vuln_report_path, build_vuln_report(sbom, tool=_TOOL, index=vulndb))
 
+    write_json(
+        details_path,
+        {
+            "inputPath": str(input_path),
+            "lockFile": str(lock_path),
+            **cached_details,
+            "cache": cache_status(cache, hit),
+        },
+    )
 
+    return ScanArtifacts(out_dir, sbom_path, vuln_report_path, details_path)
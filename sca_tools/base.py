@@ -1,8 +1,18 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import posixpath
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Protocol
+from typing import TYPE_CHECKING, BinaryIO, Protocol
+
+from .tracing import active, count
+from .utils import input_name
+
+if TYPE_CHECKING:
+    from unified_sca.detect import Detection
+    from .cache import SbomCache
+    from .vulndb import VulnIndex
+    from unified_sca.vfs import ProjectFS
 
 
 @dataclass(frozen=True)
@@ -13,11 +23,64 @@ class ScanArtifacts:
     scan_details_path: Path
 
 
-class Analyzer(Protocol):
-    """Unified analyzer contract for productized extensions."""
+@dataclass
+class ScanContext:
+    """Per-scan state resolved once and shared by every analyzer.
 
-    key: str  # e.g. "rust" / "python" / "javascript"
+    ``project_rel`` is the detected project root inside ``fs``; ``manifests``
+    maps marker filenames found by detection (plus anything later looked up
+    through ``find``) to their path inside ``fs``. With ``strict_root`` (one
+    project of a monorepo) ``find`` never falls back to other directories.
+    """
+
+    input_path: Path
+    results_dir: Path
+    fs: "ProjectFS"
+    detection: "Detection"
+    project_rel: str = ""
+    manifests: dict[str, str | None] = field(default_factory=dict)
+    cache: "SbomCache | None" = None
+    sbom_format: str = "json"
+    vulndb: "VulnIndex | None" = None
+    strict_root: bool = False
+
+    @property
+    def project_name(self) -> str:
+        return input_name(self.input_path)
+
+    def find(self, name: str) -> str | None:
+        """Locate ``name`` at the project root, falling back to ``fs.find``."""
+        if name in self.manifests:
+            return self.manifests[name]
+        direct = posixpath.join(self.project_rel, name) if self.project_rel else name
+        if self.fs.is_file(direct):
+            rel: str | None = direct
+        else:
+            rel = None if self.strict_root else self.fs.find(name)
+        self.manifests[name] = rel
+        return rel
 
-    def scan(self, *, input_path: Path, results_dir: Path) -> ScanArtifacts: ...
+    def read_bytes(self, rel: str) -> bytes:
+        data = self.fs.read_bytes(rel)
+        count(bytesRead=len(data))
+        return data
 
+    def open_binary(self, rel: str) -> BinaryIO:
+        if active() is not None:
+            # 流式读取的调用方会读完整个成员，按其大小计入
+            count(bytesRead=self.fs.file_size(rel))
+        return self.fs.open_binary(rel)
+
+    def file_size(self, rel: str) -> int:
+        return self.fs.file_size(rel)
+
+    def display_path(self, rel: str) -> Path:
+        return self.fs.display_path(rel)
+
+
+class Analyzer(Protocol):
+    """Unified analyzer contract; ``AnalyzerSpec.loader`` names one (or a plain scan function)."""
+
+    key: str  # e.g. "rust" / "python" / "javascript"
 
+    def scan(self, *, input_path: Path, results_dir: Path, context: ScanContext | None = None) -> ScanArtifacts: ...
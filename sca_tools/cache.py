@@ -0,0 +1,308 @@
+"""Content-addressed SBOM cache.
+
+Entries are keyed by analyzer name/version plus the SHA-256 of every input
+the analyzer read (lock/manifest bytes), so an unchanged lock file maps to
+the same entry no matter where or when it is scanned. Layout::
+
+    <root>/<key[:2]>/<key>/sbom.json
+    <root>/<key[:2]>/<key>/details.json
+    <root>/usage.json          (estimated entry count and size)
+
+Entry mtime is refreshed on every hit and eviction drops the least recently
+used entries first until both the size and the entry-count limits hold. A
+store only bumps the estimate in ``usage.json``; the cache directory is
+walked (and the estimate made exact again) once it crosses a limit.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Iterable
+
+from .tracing import span
+from .utils import utc_now_iso, write_json
+
+# 缓存内容格式变化时递增，使旧条目自然失效
+CACHE_FORMAT = "1"
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_MEMORY_ENTRIES = 256
+_USAGE_NAME = "usage.json"
+# 写入时超限则淘汰到上限的该比例，之后的若干次写入无需再遍历缓存目录
+_PRUNE_TO = 0.9
+
+
+def default_cache_dir(results_dir: Path) -> Path:
+    return results_dir / ".cache" / "sbom"
+
+
+def sha256_stream(fp: BinaryIO, *, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    while True:
+        chunk = fp.read(chunk_size)
+        if not chunk:
+            return h.hexdigest()
+        h.update(chunk)
+
+
+def cache_key_from_digests(tool: str, tool_version: str, digests: Iterable[tuple[str, str]]) -> str:
+    h = hashlib.sha256()
+    h.update(f"{CACHE_FORMAT}\0{tool}\0{tool_version}\0".encode("utf-8"))
+    for name, digest in digests:
+        h.update(f"{name}\0{digest}\0".encode("utf-8"))
+    return h.hexdigest()
+
+
+def cache_key(tool: str, tool_version: str, inputs: Iterable[tuple[str, bytes]]) -> str:
+    return cache_key_from_digests(tool, tool_version, ((n, hashlib.sha256(d).hexdigest()) for n, d in inputs))
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    root: Path
+    entries: int
+    total_bytes: int
+
+
+@dataclass(frozen=True)
+class _Entry:
+    path: Path
+    mtime: float
+    size: int
+
+
+class SbomCache:
+    def __init__(
+        self, root: Path, *, max_bytes: int = DEFAULT_MAX_BYTES, max_entries: int = DEFAULT_MAX_ENTRIES
+    ) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+
+    def _entry_dir(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def get(self, key: str) -> tuple[dict[str, Any], dict[str, Any]] | None:
+        d = self._entry_dir(key)
+        try:
+            sbom = json.loads((d / "sbom.json").read_text(encoding="utf-8"))
+            details = json.loads((d / "details.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(d / "details.json")
+        except OSError:
+            pass
+        return sbom, details
+
+    def put(self, key: str, sbom: dict[str, Any], details: dict[str, Any], *, replace: bool = False) -> None:
+        """Store an entry; an existing one is kept unless ``replace`` (for entries keyed by name, not content)."""
+        d = self._entry_dir(key)
+        existed = d.exists()
+        if existed and not replace:
+            return
+        # 先写临时目录再 rename，避免并发扫描读到半截条目
+        tmp = d.parent / f".tmp-{key}-{uuid.uuid4().hex}"
+        try:
+            write_json(tmp / "sbom.json", sbom, fmt="json-compact")
+            write_json(tmp / "details.json", details, fmt="json-compact")
+            size = sum(f.stat().st_size for f in tmp.iterdir())
+            if replace:
+                shutil.rmtree(d, ignore_errors=True)
+            os.replace(tmp, d)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+        # 只累加估算值，超出上限（或估算缺失）时才遍历整个缓存目录
+        usage = self._bump_usage(0 if existed else 1, size)
+        if usage is None or usage[0] > self.max_entries or usage[1] > self.max_bytes:
+            self.prune(max_bytes=int(self.max_bytes * _PRUNE_TO), max_entries=int(self.max_entries * _PRUNE_TO))
+
+    def _read_usage(self) -> tuple[int, int] | None:
+        try:
+            doc = json.loads((self.root / _USAGE_NAME).read_text(encoding="utf-8"))
+            return int(doc["entries"]), int(doc["bytes"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _write_usage(self, entries: int, total: int) -> None:
+        path = self.root / _USAGE_NAME
+        tmp = path.with_name(f".tmp-{_USAGE_NAME}-{uuid.uuid4().hex}")
+        try:
+            tmp.write_text(json.dumps({"entries": entries, "bytes": total}), encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
+
+    def _bump_usage(self, entries: int, size: int) -> tuple[int, int] | None:
+        """Add to the estimate; None when there is none yet (the caller prunes, which writes it).
+
+        Concurrent writers may lose an update; the estimate only decides when to
+        walk the cache, and every prune replaces it with the exact figures.
+        """
+        usage = self._read_usage()
+        if usage is None:
+            return None
+        usage = (usage[0] + entries, usage[1] + size)
+        self._write_usage(*usage)
+        return usage
+
+    def _entries(self) -> list[_Entry]:
+        out: list[_Entry] = []
+        if not self.root.is_dir():
+            return out
+        with os.scandir(self.root) as shards:
+            for shard in shards:
+                if not shard.is_dir(follow_symlinks=False):
+                    continue
+                with os.scandir(shard.path) as it:
+                    for entry in it:
+                        if entry.name.startswith(".tmp-") or not entry.is_dir(follow_symlinks=False):
+                            continue
+                        size = 0
+                        mtime = 0.0
+                        try:
+                            with os.scandir(entry.path) as files:
+                                for f in files:
+                                    st = f.stat(follow_symlinks=False)
+                                    size += st.st_size
+                                    if f.name == "details.json":
+                                        mtime = st.st_mtime
+                        except OSError:
+                            # 并发清理中被删除的条目
+                            continue
+                        out.append(_Entry(Path(entry.path), mtime, size))
+        return out
+
+    def stats(self) -> CacheStats:
+        entries = self._entries()
+        return CacheStats(root=self.root, entries=len(entries), total_bytes=sum(e.size for e in entries))
+
+    def prune(self, *, max_bytes: int | None = None, max_entries: int | None = None) -> int:
+        """Evict least recently used entries until within limits; returns count removed."""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        max_entries = self.max_entries if max_entries is None else max_entries
+        entries = self._entries()
+        total = sum(e.size for e in entries)
+        removed = 0
+        remaining = len(entries)
+        if total > max_bytes or remaining > max_entries:
+            entries.sort(key=lambda e: e.mtime)
+            for e in entries:
+                if total <= max_bytes and remaining <= max_entries:
+                    break
+                shutil.rmtree(e.path, ignore_errors=True)
+                total -= e.size
+                remaining -= 1
+                removed += 1
+        if self.root.is_dir():
+            self._write_usage(remaining, total)
+        return removed
+
+    def clear(self) -> int:
+        n = len(self._entries())
+        shutil.rmtree(self.root, ignore_errors=True)
+        return n
+
+
+class WarmSbomCache(SbomCache):
+    """``SbomCache`` with an in-process LRU in front of the disk entries.
+
+    Used by long-lived processes (``sca serve``) so repeated scans of an
+    unchanged lock skip both parsing and re-reading the cached JSON. Returned
+    objects are shared between jobs and must be treated as read-only.
+    """
+
+    def __init__(self, root: Path, *, memory_entries: int = DEFAULT_MEMORY_ENTRIES, **kwargs: Any) -> None:
+        super().__init__(root, **kwargs)
+        self.memory_entries = memory_entries
+        self._memory: OrderedDict[str, tuple[dict[str, Any], dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, key: str, value: tuple[dict[str, Any], dict[str, Any]]) -> None:
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key: str) -> tuple[dict[str, Any], dict[str, Any]] | None:
+        with self._lock:
+            hit = self._memory.get(key)
+            if hit is not None:
+                self._memory.move_to_end(key)
+                return hit
+        hit = super().get(key)
+        if hit is not None:
+            self._remember(key, hit)
+        return hit
+
+    def put(self, key: str, sbom: dict[str, Any], details: dict[str, Any], *, replace: bool = False) -> None:
+        super().put(key, sbom, details, replace=replace)
+        self._remember(key, (sbom, details))
+
+    def forget(self) -> None:
+        """Drop the in-memory layer only."""
+        with self._lock:
+            self._memory.clear()
+
+    def clear(self) -> int:
+        self.forget()
+        return super().clear()
+
+    @property
+    def memory_size(self) -> int:
+        return len(self._memory)
+
+
+def restamp_sbom(sbom: dict[str, Any]) -> dict[str, Any]:
+    """Copy of a cached ``sbom`` stamped as generated now: ``metadata.timestamp`` and, if set, ``serialNumber``.
+
+    The cached object itself is left untouched (the warm cache hands out the same dict).
+    """
+    out = dict(sbom)
+    out["metadata"] = {**(sbom.get("metadata") or {}), "timestamp": utc_now_iso()}
+    if "serialNumber" in out:
+        out["serialNumber"] = f"urn:uuid:{uuid.uuid4()}"
+    return out
+
+
+def cached_build(
+    cache: SbomCache | None, key: str, build: Callable[[], tuple[dict[str, Any], dict[str, Any]]]
+) -> tuple[dict[str, Any], dict[str, Any], bool]:
+    """Return (sbom, details, hit). ``details`` must not contain per-run paths.
+
+    A hit is returned through ``restamp_sbom``, so its timestamp (and the
+    vulnerability report's ``generated_at``) reflect this run.
+    """
+    with span("build_sbom") as sp:
+        if cache is not None:
+            hit = cache.get(key)
+            if hit is not None:
+                if sp is not None:
+                    sp.set(cache="hit")
+                return restamp_sbom(hit[0]), hit[1], True
+        sbom, details = build()
+        if cache is not None:
+            cache.put(key, sbom, details)
+        if sp is not None:
+            sp.set(cache="miss" if cache is not None else "disabled")
+        return sbom, details, False
+
+
+def cache_status(cache: SbomCache | None, hit: bool) -> str:
+    if cache is None:
+        return "off"
+    return "hit" if hit else "miss"
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import posixpath
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from unified_sca.detect import Detection, detect_fs
+from unified_sca.vfs import ProjectFS, open_project_fs
+
+from .base import ScanContext
+from .cache import SbomCache
+from .tracing import span
+from .vulndb import VulnIndex
+
+
+def _project_rel(ctx_root: Path, project_root: Path) -> str:
+    try:
+        rel = project_root.relative_to(ctx_root).as_posix()
+    except ValueError:
+        return ""
+    return "" if rel == "." else rel
+
+
+@contextmanager
+def open_scan_context(
+    input_path: Path,
+    results_dir: Path,
+    *,
+    cache: SbomCache | None = None,
+    sbom_format: str = "json",
+    vulndb: VulnIndex | None = None,
+    fs: ProjectFS | None = None,
+    detection: Detection | None = None,
+    strict_root: bool = False,
+) -> Iterator[ScanContext]:
+    """Open the input once, run detection once, and yield the shared context.
+
+    Long-lived callers may pass an already opened ``fs`` (left open) and a
+    still valid ``detection`` to skip both steps.
+    """
+    input_path = input_path.resolve()
+    results_dir = results_dir.resolve()
+    with ExitStack() as stack:
+        if fs is None:
+            with span("open_input", archive=not input_path.is_dir()):
+                fs = stack.enter_context(open_project_fs(input_path))
+        if detection is not None:
+            det = detection
+        else:
+            with span("detect"):
+                det = detect_fs(fs)
+        rel = _project_rel(fs.location, det.project_root)
+        manifests: dict[str, str | None] = {}
+        for hits in det.evidence.values():
+            for name in hits:
+                manifests[name] = posixpath.join(rel, name) if rel else name
+        yield ScanContext(
+            input_path=input_path,
+            results_dir=results_dir,
+            fs=fs,
+            detection=det,
+            project_rel=rel,
+            manifests=manifests,
+            cache=cache,
+            sbom_format=sbom_format,
+            vulndb=vulndb,
+            strict_root=strict_root,
+        )
+
+
+@contextmanager
+def ensure_scan_context(
+    input_path: Path, results_dir: Path, context: ScanContext | None
+) -> Iterator[ScanContext]:
+    """Reuse the caller's context, or open a private one for direct calls."""
+    if context is not None:
+        yield context
+        return
+    with open_scan_context(input_path, results_dir) as ctx:
+        yield ctx
@@ -0,0 +1,134 @@
+"""Incremental JSON reading for very large documents.
+
+Only what the caller asks for is materialised: ``JsonStream`` walks the
+outer structure token by token and decodes one value at a time with the
+standard library decoder. Memory stays proportional to the largest single
+value that is decoded, not to the document.
+"""
+
+from __future__ import annotations
+
+import codecs
+import json
+from typing import Any, BinaryIO, Iterator
+
+_WS = " \t\n\r"
+
+
+class JsonStream:
+    def __init__(self, fp: BinaryIO, *, chunk_size: int = 1 << 20) -> None:
+        self._fp = fp
+        self._chunk_size = chunk_size
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self._started = False
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        chunk = self._fp.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            self._buf = self._buf[self._pos :] + self._decoder.decode(b"", final=True)
+            self._pos = 0
+            return False
+        text = self._decoder.decode(chunk)
+        if not self._started:
+            self._started = True
+            text = text.lstrip("\ufeff")
+        # 丢弃已消费部分，缓冲区只保留尚未解析的尾部
+        self._buf = self._buf[self._pos :] + text
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character (without consuming it); "" at EOF."""
+        while True:
+            buf = self._buf
+            n = len(buf)
+            pos = self._pos
+            while pos < n and buf[pos] in _WS:
+                pos += 1
+            self._pos = pos
+            if pos < n:
+                return buf[pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, ch: str) -> None:
+        got = self.peek()
+        if got != ch:
+            raise ValueError(f"JSON 格式错误：期望 {ch!r}，实际 {got!r}")
+        self._pos += 1
+
+    def accept(self, ch: str) -> bool:
+        if self.peek() == ch:
+            self._pos += 1
+            return True
+        return False
+
+    def read_value(self) -> Any:
+        """Decode the next complete value (object/array/scalar)."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # 数字/字面量可能恰好被切在缓冲区末尾，需要看到后续分隔符才算完整
+            if end >= len(self._buf) and not self._eof and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def read_key(self) -> str:
+        key = self.read_value()
+        if not isinstance(key, str):
+            raise ValueError("JSON 格式错误：对象键必须是字符串")
+        self.expect(":")
+        return key
+
+    def skip_value(self) -> None:
+        """Skip the next value, decoding at most one child at a time.
+
+        Containers are walked one level deep and each child is decoded by the
+        C decoder and dropped, which is much faster than scanning characters
+        in Python while keeping memory bounded by the largest child.
+        """
+        ch = self.peek()
+        if ch == "{":
+            for _key in self.iter_object():
+                self.read_value()
+        elif ch == "[":
+            self._pos += 1
+            if self.accept("]"):
+                return
+            while True:
+                self.read_value()
+                if self.accept(","):
+                    continue
+                self.expect("]")
+                return
+        else:
+            self.read_value()
+
+    def iter_object(self) -> Iterator[str]:
+        """Iterate the keys of the object at the cursor.
+
+        After each key the caller must consume the value (``read_value`` or
+        ``skip_value`` or a nested ``iter_object``) before advancing.
+        """
+        self.expect("{")
+        if self.accept("}"):
+            return
+        while True:
+            yield self.read_key()
+            if self.accept(","):
+                continue
+            self.expect("}")
+            return
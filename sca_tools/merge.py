@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Iterable
+
+from .utils import make_cyclonedx_base
+
+
+def merge_cyclonedx(sboms: Iterable[dict[str, Any]], project_name: str) -> dict[str, Any]:
+    """Merge per-ecosystem CycloneDX documents into one.
+
+    Components are de-duplicated by ``bom-ref`` (first one wins) and the
+    dependency graph keeps the union of ``dependsOn`` per ref.
+    """
+    merged = make_cyclonedx_base("sca-merged")
+    merged["metadata"]["component"] = {"type": "application", "name": project_name, "version": "unknown"}
+
+    tools: list[dict[str, Any]] = []
+    seen_tools: set[tuple[str, str]] = set()
+    components: list[dict[str, Any]] = []
+    seen_refs: set[str] = set()
+    depends: dict[str, list[str]] = {}
+    depends_seen: dict[str, set[str]] = {}
+
+    for sbom in sboms:
+        for tool in (sbom.get("metadata") or {}).get("tools") or []:
+            key = (str(tool.get("name")), str(tool.get("version")))
+            if key not in seen_tools:
+                seen_tools.add(key)
+                tools.append(tool)
+        for comp in sbom.get("components") or []:
+            ref = comp.get("bom-ref") or comp.get("purl")
+            if ref:
+                if ref in seen_refs:
+                    continue
+                seen_refs.add(ref)
+            components.append(comp)
+        for dep in sbom.get("dependencies") or []:
+            ref = dep.get("ref")
+            if not ref:
+                continue
+            if ref not in depends:
+                depends[ref] = []
+                depends_seen[ref] = set()
+            for d in dep.get("dependsOn") or []:
+                if d not in depends_seen[ref]:
+                    depends_seen[ref].add(d)
+                    depends[ref].append(d)
+
+    if tools:
+        merged["metadata"]["tools"] = tools
+    merged["components"] = components
+    if depends:
+        merged["dependencies"] = [{"ref": r, "dependsOn": d} if d else {"ref": r} for r, d in depends.items()]
+    return merged
+
+
+@dataclass(frozen=True)
+class ProjectNode:
+    """One project of a monorepo for ``nest_cyclonedx``."""
+
+    ref: str
+    name: str
+    parent: str | None
+    sbom: dict[str, Any] | None
+    properties: list[dict[str, str]] = field(default_factory=list)
+
+
+def nest_cyclonedx(nodes: Iterable[ProjectNode], project_name: str) -> dict[str, Any]:
+    """Hierarchical document: one ``application`` component per project.
+
+    Each project's libraries become its nested ``components``, projects nest
+    under their ``parent``. ``bom-ref`` must be unique document-wide, so a
+    library's ref is scoped as ``<project ref>|<ref>`` and the project's
+    dependency graph is rewritten accordingly; the project itself depends on
+    its libraries that nothing else in the project depends on.
+    """
+    merged = make_cyclonedx_base("sca-workspace")
+    merged["metadata"]["component"] = {"type": "application", "name": project_name, "version": "unknown"}
+
+    tools: list[dict[str, Any]] = []
+    seen_tools: set[tuple[str, str]] = set()
+    apps: dict[str, dict[str, Any]] = {}
+    parents: list[tuple[str, str | None]] = []
+    dependencies: list[dict[str, Any]] = []
+
+    for node in nodes:
+        app: dict[str, Any] = {"type": "application", "name": node.name, "version": "unknown", "bom-ref": node.ref}
+        if node.properties:
+            app["properties"] = node.properties
+        apps[node.ref] = app
+        parents.append((node.ref, node.parent))
+        if node.sbom is None:
+            continue
+        for tool in (node.sbom.get("metadata") or {}).get("tools") or []:
+            key = (str(tool.get("name")), str(tool.get("version")))
+            if key not in seen_tools:
+                seen_tools.add(key)
+                tools.append(tool)
+
+        scoped: dict[str, str] = {}
+        libs: list[dict[str, Any]] = []
+        for comp in node.sbom.get("components") or []:
+            ref = comp.get("bom-ref") or comp.get("purl")
+            if ref:
+                if ref in scoped:
+                    continue
+                scoped[ref] = f"{node.ref}|{ref}"
+                comp = {**comp, "bom-ref": scoped[ref]}
+            libs.append(comp)
+        depended: set[str] = set()
+        for dep in node.sbom.get("dependencies") or []:
+            ref = scoped.get(dep.get("ref"))
+            if ref is None:
+                continue
+            on = [scoped[d] for d in dep.get("dependsOn") or [] if d in scoped]
+            depended.update(on)
+            dependencies.append({"ref": ref, "dependsOn": on} if on else {"ref": ref})
+        direct = [c["bom-ref"] for c in libs if c.get("bom-ref") and c["bom-ref"] not in depended]
+        if direct:
+            dependencies.append({"ref": node.ref, "dependsOn": direct})
+        if libs:
+            app["components"] = libs
+
+    top: list[dict[str, Any]] = []
+    for ref, parent in parents:
+        if parent is not None and parent in apps:
+            apps[parent].setdefault("components", []).append(apps[ref])
+        else:
+            top.append(apps[ref])
+
+    if tools:
+        merged["metadata"]["tools"] = tools
+    merged["components"] = top
+    if dependencies:
+        merged["dependencies"] = dependencies
+    return merged
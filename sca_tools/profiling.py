@@ -0,0 +1,175 @@
+"""Opt-in CPU / memory profiling of one scan (``sca scan --profile cpu|mem``).
+
+``cpu`` runs the scan under ``cProfile``. Before Python 3.12 the threads a
+scan hands work to through ``tracing.bind`` get a profiler of their own,
+merged into one ``profile.pstats``; from 3.12 cProfile sits on
+``sys.monitoring``, which allows one active profiler per process but sees
+every thread, so a single profiler is used and the scan's pools run one task
+at a time (``tracing.serial_workers``). ``mem`` traces allocations with ``tracemalloc`` and, as
+each stage (``tracing.span``) ends, keeps a snapshot whenever more memory is
+live than at any earlier stage end. Either way a plain-text top-N summary is
+written next to it, so a slow or bloated job can be diagnosed from its
+output directory without reproducing it.
+"""
+
+from __future__ import annotations
+
+import io
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator
+
+from .tracing import Span, observe, serial_workers, worker_hook
+
+PROFILE_MODES = ("cpu", "mem")
+DEFAULT_TOP = 30
+PSTATS_NAME = "profile.pstats"
+CPU_SUMMARY_NAME = "profile_cpu.txt"
+MEM_SNAPSHOT_NAME = "profile.tracemalloc"
+MEM_SUMMARY_NAME = "profile_mem.txt"
+_SNAPSHOT_MIN_GROWTH = 1024 * 1024
+# 3.12+ 同一进程只能有一个活动的 cProfile：并发的 profile 扫描（如 shell 后台任务）依次进行
+_SINGLE_PROFILER = sys.version_info >= (3, 12)
+_PROFILER_LOCK = threading.Lock()
+
+
+class ScanProfile:
+    """Data collected by ``profiled``; ``write`` puts the reports into an output dir."""
+
+    def __init__(self, mode: str, top: int) -> None:
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"未知的 profile 模式: {mode}（可选 {', '.join(PROFILE_MODES)}）")
+        self.mode = mode
+        self.top = top
+        self.seconds = 0.0
+        self._profiles: list[Any] = []
+        self._lock = threading.Lock()
+        self._snapshot: Any = None
+        self._snapshot_stage = ""
+        self._snapshot_bytes = 0
+        self._peak = 0
+
+    @contextmanager
+    def _thread_profile(self) -> Iterator[None]:
+        import cProfile
+
+        prof = cProfile.Profile()
+        with self._lock:
+            self._profiles.append(prof)
+        prof.enable()
+        try:
+            yield
+        finally:
+            prof.disable()
+
+    def _stage_end(self, span: Span) -> None:
+        import tracemalloc
+
+        with self._lock:
+            live = tracemalloc.get_traced_memory()[0]
+            # 快照的耗时与存活对象数成正比：只在明显超过上一个快照时重拍
+            if live <= self._snapshot_bytes + max(self._snapshot_bytes // 10, _SNAPSHOT_MIN_GROWTH):
+                return
+            self._snapshot = _take_snapshot()
+            self._snapshot_stage = span.name
+            self._snapshot_bytes = live
+
+    def write(self, out_dir: Path) -> list[Path]:
+        """Write the reports of this mode into ``out_dir``; returns their paths."""
+        out_dir.mkdir(parents=True, exist_ok=True)
+        if self.mode == "cpu":
+            return self._write_cpu(out_dir)
+        return self._write_mem(out_dir)
+
+    def _write_cpu(self, out_dir: Path) -> list[Path]:
+        import pstats
+
+        stats_path = out_dir / PSTATS_NAME
+        summary_path = out_dir / CPU_SUMMARY_NAME
+        buf = io.StringIO()
+        stats = pstats.Stats(*self._profiles, stream=buf)
+        stats.dump_stats(str(stats_path))
+        buf.write(f"mode: cpu  wall: {self.seconds:.3f}s  threads: {len(self._profiles)}\n")
+        buf.write(f"# 按累计耗时排序（前 {self.top}）\n")
+        stats.sort_stats("cumulative").print_stats(self.top)
+        buf.write(f"# 按自身耗时排序（前 {self.top}）\n")
+        stats.sort_stats("tottime").print_stats(self.top)
+        summary_path.write_text(buf.getvalue(), encoding="utf-8")
+        return [stats_path, summary_path]
+
+    def _write_mem(self, out_dir: Path) -> list[Path]:
+        snapshot_path = out_dir / MEM_SNAPSHOT_NAME
+        summary_path = out_dir / MEM_SUMMARY_NAME
+        snap = _filtered(self._snapshot)
+        snap.dump(str(snapshot_path))
+        lines = [
+            f"mode: mem  wall: {self.seconds:.3f}s  peak: {_mib(self._peak)}  "
+            f"snapshot: {_mib(self._snapshot_bytes)} live at end of stage '{self._snapshot_stage or '-'}'",
+            f"# 快照中存活的分配，按代码行汇总（前 {self.top}）",
+        ]
+        for stat in snap.statistics("lineno")[: self.top]:
+            frame = stat.traceback[0]
+            lines.append(f"{_mib(stat.size):>10}  {stat.count:>8} blocks  {frame.filename}:{frame.lineno}")
+        lines.append(f"# 按文件汇总（前 {self.top}）")
+        for stat in snap.statistics("filename")[: self.top]:
+            lines.append(f"{_mib(stat.size):>10}  {stat.count:>8} blocks  {stat.traceback[0].filename}")
+        summary_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        return [snapshot_path, summary_path]
+
+
+def _take_snapshot() -> Any:
+    import tracemalloc
+
+    return tracemalloc.take_snapshot()
+
+
+def _filtered(snapshot: Any) -> Any:
+    import tracemalloc
+
+    return snapshot.filter_traces(
+        (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"))
+    )
+
+
+def _mib(n: int) -> str:
+    return f"{n / (1024 * 1024):.2f}MiB"
+
+
+@contextmanager
+def profiled(mode: str, *, top: int = DEFAULT_TOP) -> Iterator[ScanProfile]:
+    """Profile the block (and the pool work it submits through ``tracing.bind``)."""
+    prof = ScanProfile(mode, top)
+    started = time.perf_counter()
+    if mode == "cpu":
+        try:
+            if _SINGLE_PROFILER:
+                with _PROFILER_LOCK, serial_workers(), prof._thread_profile():
+                    yield prof
+            else:
+                with worker_hook(prof._thread_profile), prof._thread_profile():
+                    yield prof
+        finally:
+            prof.seconds = time.perf_counter() - started
+        return
+
+    import tracemalloc
+
+    # 已在跟踪（如 python -X tracemalloc）时不重启，只重置峰值
+    owned = not tracemalloc.is_tracing()
+    if owned:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    try:
+        with observe(prof._stage_end):
+            yield prof
+    finally:
+        prof.seconds = time.perf_counter() - started
+        prof._peak = tracemalloc.get_traced_memory()[1]
+        if prof._snapshot is None:
+            prof._snapshot = _take_snapshot()
+            prof._snapshot_bytes = tracemalloc.get_traced_memory()[0]
+        if owned:
+            tracemalloc.stop()
@@ -1,20 +1,371 @@
+"""Analyzer registry: which files mark an ecosystem and how it is scanned.
+
+Each ecosystem is an ``AnalyzerSpec``: its key, the marker files detection
+scores (strongest first), a cheap ``can_handle`` probe over the files present
+in a project directory, a relative cost and the analyzer as a
+``"module:attr"`` string. Detection (``unified_sca.detect``) is built from
+these registrations, and the analyzer module is only imported the first time
+its type is scanned.
+
+Third-party packages register more ecosystems (or replace a built-in one) in
+the ``sca_tools.analyzers`` entry point group; each entry point names an
+``AnalyzerSpec``::
+
+    [project.entry-points."sca_tools.analyzers"]
+    gradle = "sca_gradle.spec:SPEC"
+
+Entry points come from ``importlib.metadata``. Importing it alone costs more
+than a whole ``sca detect`` run, so the group's entries are cached in
+``~/.cache/sca/plugins.json`` (``$XDG_CACHE_HOME`` honoured) under a stamp of
+the ``sys.path`` entries and their mtimes; installing or removing a
+distribution changes its site directory's mtime and refreshes the cache.
+"""
+
 from __future__ import annotations
 
+import hashlib
+import importlib
+import json
+import os
+import sys
+import threading
+import uuid
+from dataclasses import dataclass
 from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Collection, Mapping
+
+from . import tracing
+
+if TYPE_CHECKING:
+    from .base import Analyzer, ScanArtifacts, ScanContext
+
+ENTRY_POINT_GROUP = "sca_tools.analyzers"
+
+
+@dataclass(frozen=True)
+class AnalyzerSpec:
+    key: str
+    # 识别用的表征文件，按强弱排序（决定 evidence 的顺序与得分）
+    markers: tuple[str, ...]
+    # "module:attr"：扫描函数或实现 Analyzer 协议的对象；None 表示只识别、暂无分析器
+    loader: str | None = None
+    # 至少存在其一，该目录才有可供分析器解析的输入（默认的 can_handle 判断）
+    requires: tuple[str, ...] = ()
+    # 分析器还会查找的文件（tar 顺序读取时一并保留，计入成本估算）
+    reads: tuple[str, ...] = ()
+    # 相对成本：每字节输入的解析耗时权重，调度时先提交成本高的任务
+    cost: float = 1.0
+    # 自定义探测：参数为目录下存在的表征文件名
+    probe: Callable[[Collection[str]], bool] | None = None
+
+    @property
+    def inputs(self) -> tuple[str, ...]:
+        return tuple(dict.fromkeys(self.requires + self.reads))
+
+    def can_handle(self, present: Collection[str]) -> bool:
+        """Cheap check on file names only: is there something this analyzer can parse?"""
+        if self.loader is None:
+            return False
+        if self.probe is not None:
+            return self.probe(present)
+        return not self.requires or any(n in present for n in self.requires)
+
+    def estimate_cost(self, size_of: Callable[[str], int | None]) -> float:
+        """``cost`` x total size of the inputs that exist (``size_of`` returns None when missing)."""
+        total = 0
+        for name in self.inputs:
+            size = size_of(name)
+            if size:
+                total += size
+        return self.cost * total
+
+
+BUILTIN_ANALYZERS: tuple[AnalyzerSpec, ...] = (
+    AnalyzerSpec(
+        key="python",
+        markers=(
+            "pyproject.toml",
+            "requirements.txt",
+            "Pipfile",
+            "setup.py",
+            "setup.cfg",
+            "poetry.lock",
+            "uv.lock",
+            "requirements.lock",
+        ),
+        loader="sca_tools.analyzers.python_pyproject:scan_python_pyproject",
+        # 没有 pyproject.toml 时分析器直接读取 lock
+        requires=("pyproject.toml", "requirements.lock", "uv.lock", "poetry.lock", "requirements.txt"),
+        cost=3.0,
+    ),
+    AnalyzerSpec(
+        key="java",
+        markers=("pom.xml", "build.gradle", "build.gradle.kts", "settings.gradle", "settings.gradle.kts", "gradlew"),
+        loader="sca_tools.analyzers.java_maven:scan_java_maven",
+        # Gradle 构建暂无分析器，只有 pom.xml 时才可扫描
+        requires=("pom.xml",),
+        cost=2.0,
+    ),
+    AnalyzerSpec(
+        key="rust",
+        markers=("Cargo.toml", "Cargo.lock"),
+        loader="sca_tools.analyzers.rust_cargo:scan_rust_cargo",
+        requires=("Cargo.lock",),
+        cost=3.0,
+    ),
+    AnalyzerSpec(
+        key="javascript",
+        markers=("package.json", "package-lock.json", "yarn.lock", "pnpm-lock.yaml", "bun.lockb"),
+        loader="sca_tools.analyzers.javascript_npm:scan_javascript_npm",
+        requires=("package-lock.json",),
+    ),
+    AnalyzerSpec(
+        key="go",
+        markers=("go.mod", "go.sum"),
+        loader="sca_tools.analyzers.go_mod:scan_go_mod",
+        requires=("go.mod", "go.sum"),
+    ),
+)
+
+
+def _plugin_cache_path() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return Path(base) / "sca" / "plugins.json"
+
+
+def _path_stamp(group: str) -> str:
+    """Digest of ``sys.path`` and the mtime of each entry (a dist-info added or removed changes it)."""
+    h = hashlib.sha256(f"{sys.version}\0{group}\0".encode("utf-8"))
+    for entry in sys.path:
+        try:
+            mtime = os.stat(entry or ".").st_mtime_ns
+        except OSError:
+            mtime = -1
+        h.update(f"{entry}\0{mtime}\0".encode("utf-8", errors="surrogateescape"))
+    return h.hexdigest()
+
+
+def _entry_points(group: str) -> list[tuple[str, str]]:
+    """(name, "module:attr") of ``group``, from the on-disk cache while ``sys.path`` is unchanged."""
+    cache_path = _plugin_cache_path()
+    stamp = _path_stamp(group)
+    try:
+        cached = json.loads(cache_path.read_text(encoding="utf-8"))
+        if cached.get("stamp") == stamp:
+            return [(name, target) for name, target in cached["entryPoints"]]
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        pass
+
+    from importlib.metadata import entry_points
+
+    try:
+        selected = entry_points(group=group)
+    except TypeError:  # Python 3.9
+        selected = entry_points().get(group, ())
+    found = [(ep.name, f"{ep.module}:{ep.attr}" if ep.attr else ep.module) for ep in selected]
+    # 缓存写不了（只读 HOME 等）时每次重新查询，不影响结果
+    tmp = cache_path.with_name(f".{cache_path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(json.dumps({"stamp": stamp, "entryPoints": found}), encoding="utf-8")
+        os.replace(tmp, cache_path)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+    return found
+
+
+def _resolve(target: str) -> Any:
+    module, _sep, attr = target.partition(":")
+    obj: Any = importlib.import_module(module.strip())
+    for part in attr.strip().split(".") if attr.strip() else ():
+        obj = getattr(obj, part)
+    return obj
+
+
+_specs: dict[str, AnalyzerSpec] | None = None
+_analyzers: dict[str, "Analyzer"] = {}
+_lock = threading.Lock()
+
+
+def analyzer_specs() -> dict[str, AnalyzerSpec]:
+    """Built-in specs followed by entry-point ones, by key (a plugin may replace a built-in)."""
+    global _specs
+    if _specs is not None:
+        return _specs
+    with _lock:
+        if _specs is None:
+            specs = {s.key: s for s in BUILTIN_ANALYZERS}
+            for name, target in _entry_points(ENTRY_POINT_GROUP):
+                try:
+                    spec = _resolve(target)
+                except Exception as e:
+                    print(f"分析器插件 {name} 加载失败({target}): {type(e).__name__}: {e}", file=sys.stderr)
+                    continue
+                if not isinstance(spec, AnalyzerSpec):
+                    print(f"分析器插件 {name} 不是 AnalyzerSpec({target})，已忽略", file=sys.stderr)
+                    continue
+                specs[spec.key] = spec
+            _specs = specs
+    return _specs
+
+
+def get_spec(key: str) -> AnalyzerSpec | None:
+    return analyzer_specs().get(key)
+
+
+def supported_types() -> tuple[str, ...]:
+    """Keys that have an analyzer (detection also knows marker-only ecosystems)."""
+    return tuple(sorted(k for k, s in analyzer_specs().items() if s.loader is not None))
+
+
+def scannable_types(evidence: Mapping[str, Collection[str]]) -> tuple[str, ...]:
+    """Detected types (keys of ``evidence``) whose analyzer can read the files found (``AnalyzerSpec.can_handle``)."""
+    return tuple(t for t in sorted(evidence) if (spec := get_spec(t)) is not None and spec.can_handle(evidence[t]))
+
+
+@dataclass(frozen=True)
+class _FunctionAnalyzer:
+    """Adapts a plain ``scan_xxx(*, input_path, results_dir, context)`` function to ``Analyzer``."""
+
+    key: str
+    func: Callable[..., "ScanArtifacts"]
+
+    def scan(self, *, input_path: Path, results_dir: Path, context: ScanContext | None = None) -> ScanArtifacts:
+        return self.func(input_path=input_path, results_dir=results_dir, context=context)
+
+
+def load_analyzer(key: str) -> "Analyzer":
+    """Import the analyzer for ``key`` on first use."""
+    analyzer = _analyzers.get(key)
+    if analyzer is not None:
+        return analyzer
+    spec = get_spec(key)
+    if spec is None or spec.loader is None:
+        raise ValueError(f"未支持的类型: {key}")
+    target = _resolve(spec.loader)
+    analyzer = target if hasattr(target, "scan") else _FunctionAnalyzer(key, target)
+    _analyzers[key] = analyzer
+    return analyzer
+
+
+def scan_by_type(
+    *, detected_type: str, input_path: Path, results_dir: Path, context: ScanContext | None = None
+) -> ScanArtifacts:
+    with tracing.span("analyze", type=detected_type) as sp:
+        artifacts = load_analyzer(detected_type).scan(input_path=input_path, results_dir=results_dir, context=context)
+        if sp is not None:
+            # 扫描结束后由调用方把该类型自己的阶段写进它的 scan_details.json
+            sp.set(details=str(artifacts.scan_details_path))
+        return artifacts
+
+
+def _context_cost(key: str, context: ScanContext | None) -> float:
+    spec = get_spec(key)
+    if spec is None or context is None:
+        return 0.0
+
+    def _size(name: str) -> int | None:
+        rel = context.find(name)
+        if rel is None:
+            return None
+        try:
+            return context.file_size(rel)
+        except OSError:
+            return None
+
+    return spec.estimate_cost(_size)
+
+
+def scan_types(
+    *,
+    detected_types: tuple[str, ...],
+    input_path: Path,
+    results_dir: Path,
+    context: ScanContext | None = None,
+) -> tuple[dict[str, ScanArtifacts], dict[str, str]]:
+    """Run every supported analyzer among ``detected_types`` concurrently.
+
+    Callers pass ``scannable_types(evidence)``, so no analyzer is started on
+    a directory without files it can read.
+
+    Returns (artifacts per type, error message per failed type). All
+    analyzers share ``context``, so the input is opened and detected once;
+    the most expensive one (by ``AnalyzerSpec.estimate_cost``) starts first.
+    """
+    supported = supported_types()
+    types = [t for t in detected_types if t in supported]
+    results: dict[str, ScanArtifacts] = {}
+    errors: dict[str, str] = {}
+    if len(types) <= 1:
+        for t in types:
+            results[t] = scan_by_type(detected_type=t, input_path=input_path, results_dir=results_dir, context=context)
+        return results, errors
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    types.sort(key=lambda t: -_context_cost(t, context))
+    scan = tracing.bind(scan_by_type)
+    with ThreadPoolExecutor(max_workers=tracing.pool_size(len(types))) as pool:
+        futures = {
+            t: pool.submit(scan, detected_type=t, input_path=input_path, results_dir=results_dir, context=context)
+            for t in types
+        }
+        for t, fut in futures.items():
+            try:
+                results[t] = fut.result()
+            except Exception as e:
+                errors[t] = f"{type(e).__name__}: {e}"
+    return results, errors
 
-from .base import ScanArtifacts
-from .analyzers.rust_cargo import scan_rust_cargo
-from .analyzers.javascript_npm import scan_javascript_npm
-from .analyzers.python_pyproject import scan_python_pyproject
 
+@tracing.traced("merge")
+def write_merged(
+    *,
+    per_type: dict[str, ScanArtifacts],
+    errors: dict[str, str],
+    input_path: Path,
+    results_dir: Path,
+    project_name: str,
+    sbom_format: str = "json",
+) -> ScanArtifacts:
+    """Merge per-type outputs into ``<results>/merged/<project>/<ts>/``."""
+    from .base import ScanArtifacts
+    from .merge import merge_cyclonedx
+    from .utils import read_json, sbom_file_name, slug, ts_compact, unique_output_dir, write_json
 
-def scan_by_type(*, detected_type: str, input_path: Path, results_dir: Path) -> ScanArtifacts:
-    if detected_type == "rust":
-        return scan_rust_cargo(input_path=input_path, results_dir=results_dir)
-    if detected_type == "javascript":
-        return scan_javascript_npm(input_path=input_path, results_dir=results_dir)
-    if detected_type == "python":
-        return scan_python_pyproject(input_path=input_path, results_dir=results_dir)
-    raise ValueError(f"未支持的类型: {detected_type}")
+    sboms = [read_json(a.sbom_path) for a in per_type.values()]
+    merged = merge_cyclonedx(sboms, project_name)
 
+    vulns: list[dict] = []
+    for a in per_type.values():
+        try:
+            report = read_json(a.vuln_report_path)
+        except (OSError, ValueError):
+            continue
+        vulns.extend(report.get("vulnerabilities") or [])
 
+    out_dir = unique_output_dir(results_dir / "merged" / slug(project_name) / ts_compact())
+    sbom_path = out_dir / sbom_file_name(sbom_format)
+    vuln_report_path = out_dir / "vuln_report.json"
+    details_path = out_dir / "scan_details.json"
+    write_json(sbom_path, merged, fmt=sbom_format)
+    write_json(
+        vuln_report_path,
+        {
+            "generated_at": merged["metadata"]["timestamp"],
+            "tool": "sca-merged",
+            "vulnerabilities_found": len(vulns),
+            "vulnerabilities": vulns,
+        },
+    )
+    write_json(
+        details_path,
+        {
+            "inputPath": str(input_path),
+            "scannedTypes": sorted(per_type),
+            "perType": {t: str(a.output_dir) for t, a in sorted(per_type.items())},
+            "errors": errors,
+            "components": len(merged["components"]),
+        },
+    )
+    return ScanArtifacts(out_dir, sbom_path, vuln_report_path, details_path)
@@ -0,0 +1,228 @@
+"""Fast reading of the ``[[package]]`` tables of TOML lock files.
+
+Cargo.lock, uv.lock and poetry.lock are machine-written: one ``key = value``
+per line, with plain strings or arrays/inline tables of them as values. The
+analyzers only use a few keys of each package (``LOCK_PACKAGE_KEYS``), so
+``load_lock`` scans the file line by line, decodes just those values and steps
+over everything else (checksums, sdist/wheel tables, ``[package.metadata]``,
+``[metadata]``) without building it. A construct the line scanner does not
+handle (escapes, multi-line strings, dotted or quoted keys, floats/dates in a
+value it decodes) sends the whole file through ``tomllib`` instead, so for a
+valid file the result is what ``tomllib`` gives for those keys.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Collection, Iterator, Union
+
+LOCK_PACKAGE_KEYS: frozenset[str] = frozenset({"name", "version", "source", "dependencies"})
+# 作为 [[...]] 数组表读取的表名（poetry/uv/Cargo 为 package，少数工具写作 packages）
+_PACKAGE_TABLES = ("package", "packages")
+
+_HEADER_RE = re.compile(r"(\[\[?)\s*([A-Za-z0-9_-]+(?:\s*\.\s*[A-Za-z0-9_-]+)*)\s*(\]\]?)\s*(?:#.*)?")
+# 行首的键；带引号的键只出现在不读取的表里（如旧版 Cargo.lock 的 [metadata]）
+_KEY_RE = re.compile(r'([A-Za-z0-9_-]+|"[^"\\\n]*")\s*=\s*')
+_BARE_KEY_RE = re.compile(r"[A-Za-z0-9_-]+")
+# 单行字符串（用于计算括号深度前去掉字符串内容）
+_STRING_RE = re.compile(r'"[^"\\\n]*(?:\\.[^"\\\n]*)*"|\'[^\'\n]*\'')
+_TOKEN_RE = re.compile(r'\s*(?:#[^\n]*\s*)*(?:("[^"\\\n]*")|(\'[^\'\n]*\')|([\[\]{},=])|([A-Za-z0-9_+.:-]+))')
+# 常见形态的快速路径：纯字符串数组（Cargo.lock）、字符串值的内联表及其数组（uv.lock）
+_STR = r'"[^"\\\n]*"'
+_INLINE = rf"\{{\s*(?:[A-Za-z0-9_-]+\s*=\s*{_STR}\s*,\s*)*[A-Za-z0-9_-]+\s*=\s*{_STR}\s*\}}"
+_STR_ARRAY_RE = re.compile(rf"\[\s*(?:{_STR}\s*,\s*)*(?:{_STR}\s*)?\]")
+_STR_ITEM_RE = re.compile(r'"([^"\\\n]*)"')
+_INLINE_RE = re.compile(_INLINE)
+_INLINE_ARRAY_RE = re.compile(rf"\[\s*(?:{_INLINE}\s*,\s*)*(?:{_INLINE}\s*)?\]")
+_INLINE_ITEM_RE = re.compile(r"\{[^{}]*\}")
+_INLINE_KV_RE = re.compile(r'([A-Za-z0-9_-]+)\s*=\s*"([^"\\\n]*)"')
+_INT_RE = re.compile(r"[+-]?[0-9](?:_?[0-9])*")
+
+
+def load_toml(data: Union[bytes, str]) -> dict[str, Any]:
+    """Full parse with ``tomllib`` (``tomli`` before Python 3.11)."""
+    try:
+        import tomllib  # py3.11+
+    except ModuleNotFoundError:  # pragma: no cover
+        import tomli as tomllib  # type: ignore
+    return tomllib.loads(data.decode("utf-8") if isinstance(data, bytes) else data)
+
+
+class _Unusual(Exception):
+    """Something the line scanner does not handle; the file is parsed with tomllib."""
+
+
+def _depth(line: str) -> int:
+    """Bracket balance of ``line``, ignoring strings and a trailing comment."""
+    if "[" not in line and "]" not in line and "{" not in line and "}" not in line:
+        return 0
+    if '"""' in line or "'''" in line:
+        raise _Unusual("multi-line string")
+    if '"' in line or "'" in line:
+        line = _STRING_RE.sub("", line)
+    if "#" in line:
+        line = line[: line.index("#")]
+    return line.count("[") + line.count("{") - line.count("]") - line.count("}")
+
+
+def _tokens(text: str) -> Iterator[str]:
+    pos, end = 0, len(text)
+    while True:
+        m = _TOKEN_RE.match(text, pos)
+        if m is None:
+            if text[pos:].strip() and not text[pos:].lstrip().startswith("#"):
+                raise _Unusual(f"token at {text[pos:pos + 20]!r}")
+            return
+        pos = m.end()
+        yield m.group(m.lastindex or 0)
+        if pos >= end:
+            return
+
+
+def _parse(tokens: Iterator[str], tok: str) -> Any:
+    if tok[0] in "\"'":
+        return tok[1:-1]
+    if tok == "[":
+        items: list[Any] = []
+        tok = next(tokens)
+        while tok != "]":
+            items.append(_parse(tokens, tok))
+            tok = next(tokens)
+            if tok == ",":
+                tok = next(tokens)
+            elif tok != "]":
+                raise _Unusual("array")
+        return items
+    if tok == "{":
+        table: dict[str, Any] = {}
+        tok = next(tokens)
+        while tok != "}":
+            if tok[0] in "\"'":
+                key = tok[1:-1]
+            elif _BARE_KEY_RE.fullmatch(tok):
+                key = tok
+            else:
+                raise _Unusual(f"key {tok!r}")
+            if key in table or next(tokens) != "=":
+                raise _Unusual("inline table")
+            table[key] = _parse(tokens, next(tokens))
+            tok = next(tokens)
+            if tok == ",":
+                tok = next(tokens)
+            elif tok != "}":
+                raise _Unusual("inline table")
+        return table
+    if tok == "true":
+        return True
+    if tok == "false":
+        return False
+    if _INT_RE.fullmatch(tok):
+        return int(tok.replace("_", ""))
+    raise _Unusual(f"value {tok!r}")
+
+
+def _inline(text: str) -> dict[str, str]:
+    pairs = _INLINE_KV_RE.findall(text)
+    table = dict(pairs)
+    if len(table) != len(pairs):
+        raise _Unusual("duplicate key in inline table")
+    return table
+
+
+def _value(text: str) -> Any:
+    if text[0] == '"' and text[-1] == '"' and text.count('"') == 2 and "\\" not in text:
+        return text[1:-1]
+    if text[0] == "[":
+        if _STR_ARRAY_RE.fullmatch(text):
+            return _STR_ITEM_RE.findall(text)
+        if _INLINE_ARRAY_RE.fullmatch(text):
+            return [_inline(item) for item in _INLINE_ITEM_RE.findall(text)]
+    elif text[0] == "{" and _INLINE_RE.fullmatch(text):
+        return _inline(text)
+    tokens = _tokens(text)
+    try:
+        value = _parse(tokens, next(tokens))
+    except StopIteration:
+        raise _Unusual("truncated value") from None
+    if next(tokens, None) is not None:
+        raise _Unusual("trailing data")
+    return value
+
+
+def _scan(text: str, keys: Collection[str]) -> dict[str, list[dict[str, Any]]]:
+    out: dict[str, list[dict[str, Any]]] = {}
+    # 当前写入的表（None：跳过）与要保留的键（None：全部保留）
+    target: dict[str, Any] | None = None
+    want: Collection[str] | None = None
+    package: dict[str, Any] | None = None
+    lines = iter(text.splitlines())
+    for raw in lines:
+        line = raw.strip()
+        if not line or line[0] == "#":
+            continue
+        if line[0] == "[":
+            m = _HEADER_RE.fullmatch(line)
+            if m is None or len(m.group(1)) != len(m.group(3)):
+                raise _Unusual(f"header {line!r}")
+            parts = [p.strip() for p in m.group(2).split(".")]
+            target = want = None
+            if len(m.group(1)) == 2:
+                package = None
+                if len(parts) == 1 and parts[0] in _PACKAGE_TABLES:
+                    package = {}
+                    out.setdefault(parts[0], []).append(package)
+                    target, want = package, keys
+                elif parts[0] in _PACKAGE_TABLES:
+                    raise _Unusual(f"header {line!r}")
+            elif parts[0] in _PACKAGE_TABLES and package is not None and len(parts) >= 2 and parts[1] in keys:
+                # 如 poetry 的 [package.dependencies]：作为该包的子表完整读取
+                if len(parts) > 2 or parts[1] in package:
+                    raise _Unusual(f"header {line!r}")
+                target = package[parts[1]] = {}
+            elif parts[0] in _PACKAGE_TABLES and package is None:
+                raise _Unusual(f"header {line!r}")
+            continue
+        m = _KEY_RE.match(line)
+        if m is None:
+            raise _Unusual(f"line {line!r}")
+        key = m.group(1)
+        if key[0] == '"':
+            if target is not None:
+                raise _Unusual(f"quoted key {key}")
+            key = key[1:-1]
+        value = line[m.end() :]
+        if not value:
+            raise _Unusual(f"line {line!r}")
+        depth = _depth(value)
+        chunk = [value]
+        while depth > 0:
+            nxt = next(lines, None)
+            if nxt is None:
+                raise _Unusual("unterminated value")
+            depth += _depth(nxt)
+            chunk.append(nxt)
+        if target is None or (want is not None and key not in want):
+            continue
+        if key in target:
+            raise _Unusual(f"duplicate key {key!r}")
+        target[key] = _value(value if len(chunk) == 1 else "\n".join(chunk))
+    return out
+
+
+def load_lock(data: bytes, *, keys: Collection[str] = LOCK_PACKAGE_KEYS) -> dict[str, list[dict[str, Any]]]:
+    """``{"package": [...]}`` with only ``keys`` of each ``[[package]]`` table.
+
+    The shape matches a ``tomllib`` parse of the file restricted to those keys,
+    so callers written against the full dict keep working.
+    """
+    text = data.decode("utf-8")
+    try:
+        return _scan(text, keys)
+    except _Unusual:
+        pass
+    doc = load_toml(text)
+    return {
+        t: [{k: v for k, v in p.items() if k in keys} for p in doc[t] if isinstance(p, dict)]
+        for t in _PACKAGE_TABLES
+        if isinstance(doc.get(t), list)
+    }
@@ -0,0 +1,292 @@
+"""Lightweight stage spans for ``scan_details.json`` and Chrome trace output.
+
+``span(name)`` times a block (wall time, CPU time of the running thread, peak
+RSS so far) when a ``Tracer`` is active in the current context, and costs a
+context-variable lookup otherwise. ``count(...)`` adds bytes read/written or
+extracted files to every open span of the current context, so a stage's
+counters include those of its sub-stages. Executors do not copy context
+variables: work submitted to a pool must go through ``bind`` to be traced.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+COUNTERS = ("bytesRead", "bytesWritten", "filesExtracted")
+
+
+def max_rss_bytes() -> int | None:
+    """Peak resident set size of this process so far (None where unavailable)."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KiB 为单位，macOS 以字节为单位
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+@dataclass
+class Span:
+    name: str
+    start: float
+    parent: Optional["Span"]
+    thread: int
+    attrs: dict[str, Any] = field(default_factory=dict)
+    wall: float = 0.0
+    cpu: float = 0.0
+    peak_rss: int | None = None
+    counters: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def depth(self) -> int:
+        d, p = 0, self.parent
+        while p is not None:
+            d, p = d + 1, p.parent
+        return d
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+
+class Tracer:
+    """Finished spans of one scan (or one CLI invocation), in completion order."""
+
+    def __init__(self) -> None:
+        self.origin = time.perf_counter()
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    def _finish(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def _count(self, span: Optional[Span], values: dict[str, int]) -> None:
+        with self._lock:
+            while span is not None:
+                for k, v in values.items():
+                    span.counters[k] = span.counters.get(k, 0) + v
+                span = span.parent
+
+    def spans_under(self, root: Span, name: str) -> list[Span]:
+        """Finished spans called ``name`` among ``root``'s descendants."""
+        with self._lock:
+            spans = list(self.spans)
+        return [s for s in spans if s is not root and s.name == name and _within(s, root)]
+
+    def stages(self, root: Span | None = None) -> list[dict[str, Any]]:
+        """JSON-ready stage tree: top-level stages by start time, sub-stages under ``stages``.
+
+        With ``root``, only that span and its descendants, with start times
+        relative to it (one scan inside a longer trace).
+        """
+        origin = root.start if root is not None else self.origin
+        records: dict[int, dict[str, Any]] = {}
+        top: list[dict[str, Any]] = []
+        # 父阶段不晚于子阶段开始，按（开始时间, 深度）排序后父记录总已存在
+        for s in sorted(self.spans, key=lambda s: (s.start, s.depth)):
+            if root is not None and not _within(s, root):
+                continue
+            rec: dict[str, Any] = {
+                "name": s.name,
+                "startSeconds": round(s.start - origin, 6),
+                "wallSeconds": round(s.wall, 6),
+                "cpuSeconds": round(s.cpu, 6),
+                "peakRssBytes": s.peak_rss,
+            }
+            rec.update({k: s.counters.get(k, 0) for k in COUNTERS})
+            if s.attrs:
+                rec["attrs"] = s.attrs
+            records[id(s)] = rec
+            parent = records.get(id(s.parent)) if s is not root and s.parent is not None else None
+            if parent is None:
+                top.append(rec)
+            else:
+                parent.setdefault("stages", []).append(rec)
+        return top
+
+    def chrome_trace(self) -> dict[str, Any]:
+        """Trace Event Format (chrome://tracing, Perfetto, speedscope): one complete event per span."""
+        pid = os.getpid()
+        events: list[dict[str, Any]] = []
+        for s in sorted(self.spans, key=lambda s: s.start):
+            args: dict[str, Any] = {"cpuMs": round(s.cpu * 1000, 3), **s.counters, **s.attrs}
+            if s.peak_rss is not None:
+                args["peakRssBytes"] = s.peak_rss
+            events.append(
+                {
+                    "name": s.name,
+                    "cat": "sca",
+                    "ph": "X",
+                    "ts": round((s.start - self.origin) * 1e6, 1),
+                    "dur": round(s.wall * 1e6, 1),
+                    "pid": pid,
+                    "tid": s.thread,
+                    "args": args,
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as fp:
+            json.dump(self.chrome_trace(), fp, ensure_ascii=False)
+
+
+def _within(span: Span | None, root: Span) -> bool:
+    while span is not None:
+        if span is root:
+            return True
+        span = span.parent
+    return False
+
+
+_tracer: contextvars.ContextVar[Optional[Tracer]] = contextvars.ContextVar("sca_tracer", default=None)
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("sca_span", default=None)
+
+
+def active() -> Tracer | None:
+    return _tracer.get()
+
+
+@contextmanager
+def tracing(tracer: Tracer | None = None) -> Iterator[Tracer]:
+    """Make ``tracer`` (a new one by default) the active tracer of this context."""
+    tracer = tracer or Tracer()
+    token = _tracer.set(tracer)
+    span_token = _current.set(None)
+    try:
+        yield tracer
+    finally:
+        _current.reset(span_token)
+        _tracer.reset(token)
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Span | None]:
+    tracer = _tracer.get()
+    if tracer is None:
+        yield None
+        return
+    s = Span(name, time.perf_counter(), _current.get(), threading.get_ident(), dict(attrs))
+    token = _current.set(s)
+    cpu0 = time.thread_time()
+    try:
+        yield s
+    finally:
+        s.wall = time.perf_counter() - s.start
+        s.cpu = time.thread_time() - cpu0
+        s.peak_rss = max_rss_bytes()
+        for observer in _observers.get():
+            observer(s)
+        _current.reset(token)
+        tracer._finish(s)
+
+
+def traced(name: str) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """Decorator form of ``span(name)`` for a whole function."""
+
+    def deco(fn: Callable[..., T]) -> Callable[..., T]:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> T:
+            with span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return deco
+
+
+def count(**values: int) -> None:
+    """Add to the counters (``bytesRead``, ``bytesWritten``, ``filesExtracted``) of the open spans."""
+    tracer = _tracer.get()
+    if tracer is not None:
+        tracer._count(_current.get(), values)
+
+
+def bind(fn: Callable[..., T]) -> Callable[..., T]:
+    """``fn`` running in a copy of the caller's context (for thread pools).
+
+    Each call gets its own copy, so the result can be mapped over a pool.
+    Hooks registered with ``worker_hook`` by the caller are entered around it.
+    """
+    ctx = contextvars.copy_context()
+    return lambda *args, **kwargs: ctx.copy().run(_call_hooked, fn, args, kwargs)
+
+
+def _call_hooked(fn: Callable[..., T], args: tuple[Any, ...], kwargs: dict[str, Any]) -> T:
+    hooks = _worker_hooks.get()
+    if not hooks:
+        return fn(*args, **kwargs)
+    with ExitStack() as stack:
+        for hook in hooks:
+            stack.enter_context(hook())
+        return fn(*args, **kwargs)
+
+
+_observers: contextvars.ContextVar[tuple[Callable[[Span], None], ...]] = contextvars.ContextVar(
+    "sca_span_observers", default=()
+)
+
+
+@contextmanager
+def observe(observer: Callable[[Span], None]) -> Iterator[None]:
+    """Call ``observer(span)`` as each span of this context ends (in the span's thread)."""
+    token = _observers.set(_observers.get() + (observer,))
+    try:
+        yield
+    finally:
+        _observers.reset(token)
+
+
+_serial: contextvars.ContextVar[bool] = contextvars.ContextVar("sca_serial_workers", default=False)
+
+
+@contextmanager
+def serial_workers() -> Iterator[None]:
+    """Size the pools this context starts to one worker (see ``pool_size``).
+
+    For instrumentation that can only follow one thread at a time: the
+    scan's pool work then runs one task after another.
+    """
+    token = _serial.set(True)
+    try:
+        yield
+    finally:
+        _serial.reset(token)
+
+
+def pool_size(workers: int) -> int:
+    """``workers``, or 1 inside ``serial_workers``."""
+    return 1 if _serial.get() else workers
+
+
+_worker_hooks: contextvars.ContextVar[tuple[Callable[[], ContextManager[Any]], ...]] = contextvars.ContextVar(
+    "sca_worker_hooks", default=()
+)
+
+
+@contextmanager
+def worker_hook(hook: Callable[[], ContextManager[Any]]) -> Iterator[None]:
+    """Enter ``hook()`` around every ``bind``-ed call made from this context.
+
+    For per-thread instrumentation (``cProfile`` only sees the thread that
+    enabled it) of the work a scan hands to its pools.
+    """
+    token = _worker_hooks.set(_worker_hooks.get() + (hook,))
+    try:
+        yield
+    finally:
+        _worker_hooks.reset(token)
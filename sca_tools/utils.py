@@ -3,16 +3,82 @@ from __future__ import annotations
 import json
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, TextIO
+
+from .tracing import count
 
 
 def utc_now_iso() -> str:
     return datetime.now(timezone.utc).replace(microsecond=0).isoformat()
 
 
-def write_json(path: Path, payload: Any) -> None:
+SBOM_FORMATS = ("json", "json-compact", "json.gz")
+
+
+def _write_json_stream(fp: TextIO, payload: Any, *, pretty: bool) -> None:
+    """Write ``payload`` without ever holding the whole document as one string.
+
+    Pretty output streams the encoder's chunks in batches (byte-identical to
+    ``json.dumps(payload, indent=2)``). Compact output writes top-level lists
+    such as CycloneDX ``components``/``dependencies`` item by item, each item
+    going through the fast one-shot C encoder.
+    """
+    if pretty:
+        batch: list[str] = []
+        for chunk in json.JSONEncoder(ensure_ascii=False, indent=2).iterencode(payload):
+            batch.append(chunk)
+            if len(batch) >= 8192:
+                fp.write("".join(batch))
+                batch.clear()
+        fp.write("".join(batch))
+        return
+
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    if not isinstance(payload, dict):
+        fp.write(encode(payload))
+        return
+    fp.write("{")
+    for i, (key, value) in enumerate(payload.items()):
+        fp.write(("," if i else "") + encode(str(key)) + ":")
+        if isinstance(value, list):
+            fp.write("[")
+            for j, item in enumerate(value):
+                fp.write(("," if j else "") + encode(item))
+            fp.write("]")
+        else:
+            fp.write(encode(value))
+    fp.write("}")
+
+
+def write_json(path: Path, payload: Any, *, fmt: str = "json") -> None:
+    """Write JSON as ``json`` (indent=2), ``json-compact`` or ``json.gz`` (compact, gzip)."""
     path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(payload, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    if fmt == "json.gz":
+        import gzip
+
+        with gzip.open(path, "wt", encoding="utf-8", compresslevel=6) as fp:
+            _write_json_stream(fp, payload, pretty=False)
+            fp.write("\n")
+    elif fmt in ("json", "json-compact"):
+        with open(path, "w", encoding="utf-8") as fp:
+            _write_json_stream(fp, payload, pretty=(fmt == "json"))
+            fp.write("\n")
+    else:
+        raise ValueError(f"未知的输出格式: {fmt}")
+    count(bytesWritten=path.stat().st_size)
+
+
+def read_json(path: Path) -> Any:
+    if path.suffix == ".gz":
+        import gzip
+
+        with gzip.open(path, "rt", encoding="utf-8") as fp:
+            return json.load(fp)
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def sbom_file_name(fmt: str) -> str:
+    return "sbom.json.gz" if fmt == "json.gz" else "sbom.json"
 
 
 def slug(s: str) -> str:
@@ -26,10 +92,43 @@ def slug(s: str) -> str:
     return "".join(out) or "project"
 
 
+# 多段后缀的压缩包，名称取去掉整个后缀的部分（foo.tar.gz -> foo）
+_COMPOUND_SUFFIXES = (".tar.gz", ".tar.bz2", ".tar.xz", ".tar.zst", ".tar.zstd")
+
+
+def input_name(p: Path) -> str:
+    """Project name of an input: directory name, or archive name without its suffix."""
+    if not p.is_file():
+        return p.name
+    lower = p.name.lower()
+    for suffix in _COMPOUND_SUFFIXES:
+        if lower.endswith(suffix):
+            return p.name[: -len(suffix)]
+    return p.stem
+
+
 def ts_compact() -> str:
     return datetime.now().strftime("%Y%m%d_%H%M%S")
 
 
+def unique_output_dir(base: Path) -> Path:
+    """Create and return ``base`` (or ``base_2``, ``base_3``...) atomically.
+
+    Parallel scans of e.g. ``foo/`` and ``foo.zip`` in the same second would
+    otherwise share one timestamped output directory.
+    """
+    base.parent.mkdir(parents=True, exist_ok=True)
+    cand = base
+    n = 1
+    while True:
+        try:
+            cand.mkdir()
+            return cand
+        except FileExistsError:
+            n += 1
+            cand = base.with_name(f"{base.name}_{n}")
+
+
 def make_cyclonedx_base(tool_name: str, tool_version: str = "0.1.0") -> dict[str, Any]:
     return {
         "bomFormat": "CycloneDX",
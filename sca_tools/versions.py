@@ -0,0 +1,354 @@
+"""Order-preserving version keys and version ranges for advisory matching.
+
+Versions are turned into byte strings whose lexicographic order equals the
+ecosystem's version order (SemVer for cargo/npm/Go, PEP 440 for PyPI, Maven's
+``ComparableVersion`` rules for Maven). Keys are
+stored hex-encoded, which keeps that order, so matching a version against a
+range is a plain string comparison and ranges can be pre-parsed once into the
+advisory index.
+
+A range is ``(lo, lo_inclusive, hi, hi_inclusive)``; ``None`` bounds are
+unbounded.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Iterable
+
+Range = tuple["str | None", bool, "str | None", bool]
+
+_SEMVER_RE = re.compile(
+    r"^\s*[v=]?\s*(\d+)(?:\.(\d+))?(?:\.(\d+))?(?:-([0-9A-Za-z.-]+))?(?:\+[0-9A-Za-z.-]+)?\s*$"
+)
+
+_PEP440_RE = re.compile(
+    r"""
+    ^\s*v?
+    (?:(?P<epoch>\d+)!)?
+    (?P<release>\d+(?:\.\d+)*)
+    (?:[-_.]?(?P<pre_l>alpha|beta|preview|pre|rc|a|b|c)[-_.]?(?P<pre_n>\d+)?)?
+    (?:-(?P<post_n1>\d+)|[-_.]?(?P<post_l>post|rev|r)[-_.]?(?P<post_n2>\d+)?)?
+    (?:[-_.]?(?P<dev_l>dev)[-_.]?(?P<dev_n>\d+)?)?
+    (?:\+[a-z0-9]+(?:[-_.][a-z0-9]+)*)?
+    \s*$
+    """,
+    re.VERBOSE | re.IGNORECASE,
+)
+
+_PRE_RANK = {"a": 1, "alpha": 1, "b": 2, "beta": 2, "c": 3, "rc": 3, "pre": 3, "preview": 3}
+
+_MAVEN_TOKEN_RE = re.compile(r"(\d+)|([^\d.-]+)|([.-])")
+# Maven 限定词：排在正式版之前的预发布限定词及其顺序；ga/final/release 等同正式版
+_MAVEN_PRE_RANK = {"alpha": 1, "beta": 2, "milestone": 3, "rc": 4, "snapshot": 5}
+_MAVEN_ALIASES = {"a": "alpha", "b": "beta", "m": "milestone", "cr": "rc", "ga": "", "final": "", "release": ""}
+
+# cargo 版本约束：">= 1.2.3"、"^0.9"、"~1.2"、"=1.0.0"、"< 2"
+_REQ_RE = re.compile(r"^\s*(>=|<=|>|<|=|\^|~)?\s*v?(\d+)(?:\.(\d+))?(?:\.(\d+))?(-[0-9A-Za-z.-]+)?\s*$")
+
+
+def _int(n: int) -> bytes:
+    raw = n.to_bytes((n.bit_length() + 7) // 8, "big")
+    return bytes([len(raw)]) + raw
+
+
+def semver_key(version: str) -> str | None:
+    """Key for a SemVer version (missing minor/patch count as 0); None if unparsable."""
+    m = _SEMVER_RE.match(version)
+    if m is None:
+        return None
+    out = bytearray()
+    for part in m.group(1, 2, 3):
+        out += _int(int(part or 0))
+    pre = m.group(4)
+    if pre is None:
+        # 正式版排在所有预发布版本之后
+        out.append(0xFF)
+    else:
+        out.append(0x01)
+        for ident in pre.split("."):
+            if ident.isdigit():
+                out.append(0x01)
+                out += _int(int(ident))
+            else:
+                out.append(0x02)
+                out += ident.encode("ascii", "replace") + b"\x00"
+        out.append(0x00)
+    return out.hex()
+
+
+def pep440_key(version: str) -> str | None:
+    """Key for a PEP 440 version (local labels ignored); None if unparsable."""
+    m = _PEP440_RE.match(version)
+    if m is None:
+        return None
+    out = bytearray(_int(int(m.group("epoch") or 0)))
+    release = [int(x) for x in m.group("release").split(".")]
+    while len(release) > 1 and release[-1] == 0:
+        release.pop()
+    for n in release:
+        out.append(0x01)
+        out += _int(n)
+    out.append(0x00)
+
+    post_n = m.group("post_n1") or m.group("post_n2")
+    has_post = m.group("post_n1") is not None or m.group("post_l") is not None
+    has_dev = m.group("dev_l") is not None
+    if m.group("pre_l"):
+        out.append(0x02)
+        out.append(_PRE_RANK[m.group("pre_l").lower()])
+        out += _int(int(m.group("pre_n") or 0))
+    elif has_dev and not has_post:
+        # 1.0.dev1 < 1.0a1 < 1.0 < 1.0.post1
+        out.append(0x01)
+    else:
+        out.append(0x03)
+    if has_post:
+        out.append(0x01)
+        out += _int(int(post_n or 0))
+    else:
+        out.append(0x00)
+    if has_dev:
+        out.append(0x01)
+        out += _int(int(m.group("dev_n") or 0))
+    else:
+        out.append(0xFF)
+    return out.hex()
+
+
+def _maven_null(text: str) -> bool:
+    return text == "" or (text.isdigit() and int(text) == 0)
+
+
+def maven_key(version: str) -> str | None:
+    """Key for a Maven version, following ``ComparableVersion``; None if empty.
+
+    Items are split at ``.``, ``-`` and digit/letter transitions (the latter
+    two open a sub-list in Maven); trailing zeros and release qualifiers are
+    dropped before each sub-list and at the end, so ``1.0.0.RELEASE == 1``.
+    Sub-lists are flattened: an item after ``-`` sorts below the same item
+    after ``.``, which keeps ``1 < 1-1 < 1.1`` and ``1-rc1 < 1 < 1-sp``.
+    """
+    # (文本, 是否开启子列表, 是否与前一项直接相连)
+    items: list[tuple[str, bool, bool]] = []
+    sep = ""
+    for num, word, mark in _MAVEN_TOKEN_RE.findall(version.strip().lower()):
+        if mark:
+            sep = mark
+            continue
+        joined = bool(items) and not sep
+        # 数字与字母直接相连时视同 "-"
+        items.append((num or word, sep == "-" or joined, joined))
+        sep = ""
+    if not items:
+        return None
+
+    normalized: list[tuple[str, bool]] = []
+    for i, (text, sub, _joined) in enumerate(items):
+        if not text.isdigit() and text in _MAVEN_ALIASES:
+            # "a1" / "b1" / "m1" 仅在紧跟数字时是 alpha/beta/milestone 的缩写
+            if len(text) > 1 or (i + 1 < len(items) and items[i + 1][2] and items[i + 1][0].isdigit()):
+                text = _MAVEN_ALIASES[text]
+        if sub:
+            while normalized and _maven_null(normalized[-1][0]):
+                normalized.pop()
+        normalized.append((text, sub))
+    while normalized and _maven_null(normalized[-1][0]):
+        normalized.pop()
+
+    out = bytearray()
+    for text, sub in normalized:
+        if text.isdigit():
+            out.append(0x06 if sub else 0x07)
+            out += _int(int(text))
+        elif text in _MAVEN_PRE_RANK:
+            out.append(0x01)
+            out.append(_MAVEN_PRE_RANK[text])
+        elif text == "":
+            # 列表中间的正式版限定词（如 1.0-ga-1）与结束标记同级
+            out.append(0x03)
+        elif text == "sp":
+            out.append(0x04)
+        else:
+            out.append(0x05)
+            out += text.encode("ascii", "replace") + b"\x00"
+    # 结束标记：低于 sp/未知限定词与数字，高于预发布限定词
+    out.append(0x03)
+    return out.hex()
+
+
+def version_key(scheme: str, version: str) -> str | None:
+    if scheme == "pep440":
+        return pep440_key(version)
+    if scheme == "maven":
+        return maven_key(version)
+    return semver_key(version)
+
+
+def in_range(key: str, r: Range) -> bool:
+    lo, lo_incl, hi, hi_incl = r
+    if lo is not None and (key < lo or (key == lo and not lo_incl)):
+        return False
+    if hi is not None and (key > hi or (key == hi and not hi_incl)):
+        return False
+    return True
+
+
+def ranges_from_events(scheme: str, events: Iterable[dict[str, str]]) -> list[Range] | None:
+    """Affected ranges from OSV ``introduced``/``fixed``/``last_affected`` events.
+
+    Returns None when an event version cannot be parsed, so the caller can
+    skip the range instead of guessing.
+    """
+    order = {"introduced": 0, "fixed": 1, "last_affected": 1}
+    parsed: list[tuple[str, int, str]] = []
+    for ev in events:
+        for kind, ver in ev.items():
+            if kind not in order or not isinstance(ver, str):
+                continue
+            if kind == "introduced" and ver == "0":
+                parsed.append(("", 0, kind))
+                continue
+            key = version_key(scheme, ver)
+            if key is None:
+                return None
+            parsed.append((key, order[kind], kind))
+    parsed.sort()
+
+    out: list[Range] = []
+    start: str | None = None
+    open_ = False
+    for key, _, kind in parsed:
+        if kind == "introduced":
+            if not open_:
+                start, open_ = (key or None), True
+        elif open_:
+            out.append((start, True, key, kind == "last_affected"))
+            open_ = False
+    if open_:
+        out.append((start, True, None, False))
+    return out
+
+
+def _upper_bound(parts: list[int], given: int, op: str) -> list[int]:
+    major, minor, patch = parts
+    if op == "^":
+        if major > 0 or given == 1:
+            return [major + 1, 0, 0]
+        if minor > 0 or given == 2:
+            return [0, minor + 1, 0]
+        return [0, 0, patch + 1]
+    # "~" 以及部分版本的 "="
+    if given == 1:
+        return [major + 1, 0, 0]
+    return [major, minor + 1, 0]
+
+
+def _comparator_range(text: str) -> Range | None:
+    m = _REQ_RE.match(text)
+    if m is None:
+        return None
+    op = m.group(1) or "^"
+    nums = [g for g in m.group(2, 3, 4) if g is not None]
+    given = len(nums)
+    parts = [int(x) for x in nums] + [0] * (3 - given)
+    pre = m.group(5) or ""
+    base = semver_key("{}.{}.{}{}".format(*parts, pre))
+    if op == ">=":
+        return (base, True, None, False)
+    if op == ">":
+        if given < 3:
+            return (semver_key("{}.{}.{}".format(*_upper_bound(parts, given, "~"))), True, None, False)
+        return (base, False, None, False)
+    if op == "<":
+        return (None, False, base, False)
+    if op == "<=":
+        if given < 3:
+            return (None, False, semver_key("{}.{}.{}".format(*_upper_bound(parts, given, "~"))), False)
+        return (None, False, base, True)
+    if op == "=" and given == 3:
+        return (base, True, base, True)
+    upper = semver_key("{}.{}.{}".format(*_upper_bound(parts, given, "~" if op == "=" else op)))
+    return (base, True, upper, False)
+
+
+def _max_lower(a: Range, b: Range) -> tuple[str | None, bool]:
+    if a[0] is None:
+        return b[0], b[1]
+    if b[0] is None or a[0] > b[0]:
+        return a[0], a[1]
+    if b[0] > a[0]:
+        return b[0], b[1]
+    return a[0], a[1] and b[1]
+
+
+def _min_upper(a: Range, b: Range) -> tuple[str | None, bool]:
+    if a[2] is None:
+        return b[2], b[3]
+    if b[2] is None or a[2] < b[2]:
+        return a[2], a[3]
+    if b[2] < a[2]:
+        return b[2], b[3]
+    return a[2], a[3] and b[3]
+
+
+def _is_empty(r: Range) -> bool:
+    lo, lo_incl, hi, hi_incl = r
+    if lo is None or hi is None:
+        return False
+    return lo > hi or (lo == hi and not (lo_incl and hi_incl))
+
+
+def cargo_req_range(req: str) -> Range | None:
+    """Range for a cargo requirement such as ``">= 1.2.3, < 1.3"`` (None if unparsable)."""
+    current: Range = (None, False, None, False)
+    for part in req.split(","):
+        if not part.strip():
+            continue
+        r = _comparator_range(part)
+        if r is None:
+            return None
+        current = (*_max_lower(current, r), *_min_upper(current, r))
+    return current
+
+
+def maven_ranges(spec: str) -> list[Range] | None:
+    """Ranges of a Maven version range such as ``"[1.0,2.0),[3.0,)"`` (None if not a range)."""
+    spec = spec.strip()
+    if not spec.startswith(("[", "(")):
+        return None
+    out: list[Range] = []
+    for m in re.finditer(r"([\[(])([^\[\]()]*)([\])])", spec):
+        lo_incl, body, hi_incl = m.group(1) == "[", m.group(2), m.group(3) == "]"
+        if "," not in body:
+            key = maven_key(body)
+            if key is None or not (lo_incl and hi_incl):
+                return None
+            out.append((key, True, key, True))
+            continue
+        lo_text, _, hi_text = body.partition(",")
+        lo = maven_key(lo_text) if lo_text.strip() else None
+        hi = maven_key(hi_text) if hi_text.strip() else None
+        out.append((lo, lo_incl and lo is not None, hi, hi_incl and hi is not None))
+    return out or None
+
+
+def complement(ranges: Iterable[Range]) -> list[Range]:
+    """Versions covered by none of ``ranges`` (e.g. RustSec "not patched nor unaffected")."""
+    items = sorted(
+        (r for r in ranges if not _is_empty(r)),
+        key=lambda r: ("" if r[0] is None else r[0], 0 if r[0] is None or r[1] else 1),
+    )
+    out: list[Range] = []
+    cur_lo: str | None = None
+    cur_incl = True
+    for lo, lo_incl, hi, hi_incl in items:
+        gap: Range = (cur_lo, cur_incl, lo, not lo_incl)
+        if lo is not None and not _is_empty(gap) and (cur_lo is None or lo >= cur_lo):
+            out.append(gap)
+        if hi is None:
+            return out
+        if cur_lo is None or hi > cur_lo or (hi == cur_lo and hi_incl):
+            cur_lo, cur_incl = hi, not hi_incl
+    out.append((cur_lo, cur_incl, None, False))
+    return out
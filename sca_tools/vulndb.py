@@ -0,0 +1,598 @@
+"""Offline advisory database: build a compact index once, mmap it per scan.
+
+Sources are OSV JSON (a directory tree or a zip such as osv.dev's
+``all.zip``) and RustSec ``advisory-db`` checkouts/zips (markdown files with
+a TOML front matter). Only crates.io / npm / PyPI / Go / Maven advisories
+are kept.
+
+Index layout (one file, little header + three sections)::
+
+    header   magic, format, byte order, counts, section offsets
+    hashes   sorted uint64 hash of "<ecosystem>\\0<name>", one per package
+    slots    (offset, length) of each package record, same order as hashes
+    records  compact JSON per package: advisory refs + pre-parsed ranges
+    advs     (offset, length) table + compact JSON per advisory
+
+A lookup is a ``bisect`` over the memory-mapped hash array followed by
+decoding one small record, so matching cost grows with the number of
+components, not with the number of advisories.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import uuid
+import zipfile
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+from urllib.parse import unquote
+
+from .tomllock import load_toml
+from .tracing import traced
+from .utils import utc_now_iso
+from .versions import Range, cargo_req_range, complement, in_range, ranges_from_events, version_key
+
+_MAGIC = b"SCAVDB\x00\x01"
+INDEX_FORMAT = 1
+# magic, format, byteorder(0=little,1=big), n_pkgs, n_advs, meta_len, hashes_off, slots_off, advs_off, meta_off
+_HEADER = struct.Struct("<8sIIIIIQQQQ4x")
+_SLOT = struct.Struct("<QI")
+
+# OSV ecosystem -> (purl type, version scheme)
+_ECOSYSTEMS = {
+    "crates.io": ("cargo", "semver"),
+    "npm": ("npm", "semver"),
+    "PyPI": ("pypi", "pep440"),
+    # Go 模块版本带 "v" 前缀（v1.2.3、v2.0.0+incompatible），按 SemVer 比较
+    "Go": ("golang", "semver"),
+    # OSV 中 Maven 包名为 "groupId:artifactId"，版本按 Maven ComparableVersion 规则比较
+    "Maven": ("maven", "maven"),
+}
+_SCHEME_BY_PURL = {purl: scheme for purl, scheme in _ECOSYSTEMS.values()}
+
+
+def default_index_path(results_dir: Path) -> Path:
+    return results_dir / ".cache" / "vulndb" / "advisories.idx"
+
+
+def normalize_name(purl_type: str, name: str) -> str:
+    if purl_type == "pypi":
+        return re.sub(r"[-_.]+", "-", name).lower()
+    if purl_type == "maven":
+        # purl 中为 "groupId/artifactId"
+        return name.replace("/", ":", 1)
+    return name
+
+
+def _pkg_hash(purl_type: str, name: str) -> int:
+    digest = hashlib.blake2b(f"{purl_type}\0{name}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+# ---------------------------------------------------------------- sources
+
+
+@dataclass
+class _Affected:
+    purl_type: str
+    name: str
+    ranges: list[Range]
+    versions: list[str]
+    fixed: list[str]
+
+
+def _advisory_summary(doc: dict[str, Any]) -> dict[str, Any]:
+    db_specific = doc.get("database_specific")
+    severity = db_specific.get("severity") if isinstance(db_specific, dict) else None
+    refs = [r.get("url") for r in doc.get("references") or [] if isinstance(r, dict) and r.get("url")]
+    out: dict[str, Any] = {
+        "id": doc["id"],
+        "aliases": [a for a in doc.get("aliases") or [] if isinstance(a, str)],
+        "summary": doc.get("summary") or (doc.get("details") or "").strip().split("\n", 1)[0][:200],
+        "published": doc.get("published"),
+        "modified": doc.get("modified"),
+        "references": refs[:5],
+    }
+    cvss = [s.get("score") for s in doc.get("severity") or [] if isinstance(s, dict) and s.get("score")]
+    if severity:
+        out["severity"] = severity
+    if cvss:
+        out["cvss"] = cvss
+    if doc.get("informational"):
+        out["informational"] = doc["informational"]
+    return out
+
+
+def _osv_affected(doc: dict[str, Any]) -> list[_Affected]:
+    out: list[_Affected] = []
+    for aff in doc.get("affected") or []:
+        if not isinstance(aff, dict):
+            continue
+        pkg = aff.get("package") or {}
+        eco = _ECOSYSTEMS.get(pkg.get("ecosystem", ""))
+        name = pkg.get("name")
+        if eco is None or not isinstance(name, str):
+            continue
+        purl_type, scheme = eco
+        ranges: list[Range] = []
+        fixed: list[str] = []
+        for r in aff.get("ranges") or []:
+            if not isinstance(r, dict) or r.get("type") not in ("SEMVER", "ECOSYSTEM"):
+                continue
+            events = [e for e in r.get("events") or [] if isinstance(e, dict)]
+            parsed = ranges_from_events(scheme, events)
+            if parsed is None:
+                continue
+            ranges.extend(parsed)
+            fixed.extend(e["fixed"] for e in events if isinstance(e.get("fixed"), str))
+        versions = [v for v in aff.get("versions") or [] if isinstance(v, str)]
+        if ranges or versions:
+            out.append(_Affected(purl_type, normalize_name(purl_type, name), ranges, versions, fixed))
+    return out
+
+
+def _rustsec_to_osv(text: str) -> dict[str, Any] | None:
+    """Convert a RustSec advisory (```toml front matter + markdown) to OSV shape."""
+    if not text.startswith("```toml"):
+        return None
+    end = text.find("\n```", 7)
+    if end < 0:
+        return None
+    meta = load_toml(text[7:end])
+    adv = meta.get("advisory") or {}
+    if not adv.get("id") or not adv.get("package"):
+        return None
+    body = text[end + 4 :].strip()
+    title = body.split("\n", 1)[0].lstrip("#").strip() if body.startswith("#") else ""
+    versions = meta.get("versions") or {}
+    safe: list[Range] = []
+    for req in list(versions.get("patched") or []) + list(versions.get("unaffected") or []):
+        r = cargo_req_range(req) if isinstance(req, str) else None
+        if r is None:
+            return None
+        safe.append(r)
+    doc: dict[str, Any] = {
+        "id": adv["id"],
+        "aliases": adv.get("aliases") or [],
+        "summary": title,
+        "published": adv.get("date"),
+        "references": [{"url": adv["url"]}] if adv.get("url") else [],
+        "_rustsec": {
+            "package": adv["package"],
+            "ranges": complement(safe),
+            "fixed": [p for p in versions.get("patched") or [] if isinstance(p, str)],
+        },
+    }
+    if adv.get("cvss"):
+        doc["severity"] = [{"type": "CVSS_V3", "score": adv["cvss"]}]
+    if adv.get("informational"):
+        doc["informational"] = adv["informational"]
+    if adv.get("withdrawn"):
+        doc["withdrawn"] = adv["withdrawn"]
+    return doc
+
+
+def _parse_source_file(name: str, data: bytes) -> dict[str, Any] | None:
+    try:
+        if name.endswith(".json"):
+            doc = json.loads(data)
+        elif name.endswith(".md"):
+            doc = _rustsec_to_osv(data.decode("utf-8"))
+        else:
+            return None
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if not isinstance(doc, dict) or not isinstance(doc.get("id"), str):
+        return None
+    return doc
+
+
+def iter_advisories(source: Path) -> Iterator[dict[str, Any]]:
+    """Yield OSV-shaped advisories from a directory tree, a zip or a single file."""
+    if source.is_dir():
+        for dirpath, dirnames, filenames in os.walk(source):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+            for fn in sorted(filenames):
+                if fn.endswith((".json", ".md")):
+                    doc = _parse_source_file(fn, Path(dirpath, fn).read_bytes())
+                    if doc is not None:
+                        yield doc
+        return
+    if source.suffix.lower() == ".zip":
+        with zipfile.ZipFile(source) as zf:
+            for info in zf.infolist():
+                if info.is_dir() or not info.filename.endswith((".json", ".md")):
+                    continue
+                doc = _parse_source_file(info.filename, zf.read(info))
+                if doc is not None:
+                    yield doc
+        return
+    doc = _parse_source_file(source.name, source.read_bytes())
+    if doc is not None:
+        yield doc
+
+
+# ---------------------------------------------------------------- build
+
+
+@dataclass(frozen=True)
+class BuildStats:
+    index_path: Path
+    advisories: int
+    packages: int
+    size_bytes: int
+
+
+def build_index(sources: Iterable[Path], out_path: Path) -> BuildStats:
+    """Parse ``sources`` and write the index atomically to ``out_path``."""
+    sources = [s.resolve() for s in sources]
+    adv_ids: dict[str, int] = {}
+    adv_blobs: list[bytes] = []
+    packages: dict[tuple[str, str], list[list[Any]]] = {}
+
+    for source in sources:
+        if not source.exists():
+            raise FileNotFoundError(f"漏洞库来源不存在: {source}")
+        for doc in iter_advisories(source):
+            if doc.get("withdrawn") or doc["id"] in adv_ids:
+                continue
+            rustsec = doc.pop("_rustsec", None)
+            if rustsec is not None:
+                affected = [
+                    _Affected("cargo", rustsec["package"], rustsec["ranges"], [], rustsec["fixed"])
+                ]
+            else:
+                affected = _osv_affected(doc)
+            if not affected:
+                continue
+            idx = len(adv_blobs)
+            adv_ids[doc["id"]] = idx
+            adv_blobs.append(json.dumps(_advisory_summary(doc), ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+            for a in affected:
+                packages.setdefault((a.purl_type, a.name), []).append(
+                    [idx, [list(r) for r in a.ranges], a.versions, a.fixed]
+                )
+
+    entries = sorted(((_pkg_hash(t, n), t, n, refs) for (t, n), refs in packages.items()), key=lambda e: e[0])
+    meta = json.dumps(
+        {
+            "builtAt": utc_now_iso(),
+            "sources": [str(s) for s in sources],
+            "advisories": len(adv_blobs),
+            "packages": len(entries),
+        },
+        ensure_ascii=False,
+    ).encode("utf-8")
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out_path.with_name(f".{out_path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        with open(tmp, "wb") as fp:
+            fp.write(b"\0" * _HEADER.size)
+            hashes_off = fp.tell()
+            fp.write(array("Q", (e[0] for e in entries)).tobytes())
+            slots_off = fp.tell()
+            fp.write(b"\0" * (_SLOT.size * len(entries)))
+            slots: list[tuple[int, int]] = []
+            for _h, t, n, refs in entries:
+                blob = json.dumps({"t": t, "n": n, "a": refs}, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                slots.append((fp.tell(), len(blob)))
+                fp.write(blob)
+            advs_off = fp.tell()
+            fp.write(b"\0" * (_SLOT.size * len(adv_blobs)))
+            adv_slots: list[tuple[int, int]] = []
+            for blob in adv_blobs:
+                adv_slots.append((fp.tell(), len(blob)))
+                fp.write(blob)
+            meta_off = fp.tell()
+            fp.write(meta)
+
+            fp.seek(slots_off)
+            fp.write(b"".join(_SLOT.pack(*s) for s in slots))
+            fp.seek(advs_off)
+            fp.write(b"".join(_SLOT.pack(*s) for s in adv_slots))
+            fp.seek(0)
+            fp.write(
+                _HEADER.pack(
+                    _MAGIC,
+                    INDEX_FORMAT,
+                    0 if sys.byteorder == "little" else 1,
+                    len(entries),
+                    len(adv_blobs),
+                    len(meta),
+                    hashes_off,
+                    slots_off,
+                    advs_off,
+                    meta_off,
+                )
+            )
+        os.replace(tmp, out_path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return BuildStats(out_path, len(adv_blobs), len(entries), out_path.stat().st_size)
+
+
+def is_index_file(path: Path) -> bool:
+    try:
+        with open(path, "rb") as fp:
+            return fp.read(len(_MAGIC)) == _MAGIC
+    except OSError:
+        return False
+
+
+def _source_key(source: Path) -> str:
+    # 按来源路径命名；支持的生态变化时，由漏洞源自动构建的索引随之重建
+    h = hashlib.sha256(f"{INDEX_FORMAT}\0{','.join(sorted(_ECOSYSTEMS))}\0{source}".encode("utf-8"))
+    return h.hexdigest()[:32]
+
+
+def _source_stamp(source: Path) -> list[int]:
+    """Size/mtime of the source itself: one ``stat`` (for a directory, only its top level)."""
+    st = source.stat()
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _source_fingerprint(source: Path) -> str:
+    """Size/mtime of every file of the source; walks the whole tree, so only on build/refresh."""
+    h = hashlib.sha256()
+    files = [source] if source.is_file() else sorted(p for p in source.rglob("*") if p.is_file())
+    for p in files:
+        st = p.stat()
+        h.update(f"{p}\0{st.st_size}\0{st.st_mtime_ns}\0".encode("utf-8"))
+    return h.hexdigest()
+
+
+def _read_manifest(path: Path) -> dict[str, Any] | None:
+    try:
+        doc = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return doc if isinstance(doc, dict) else None
+
+
+def _write_manifest(path: Path, source: Path, fingerprint: str) -> None:
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    doc = {"source": str(source), "stamp": _source_stamp(source), "fingerprint": fingerprint, "checkedAt": utc_now_iso()}
+    try:
+        tmp.write_text(json.dumps(doc, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+
+
+def _build_source_index(source: Path, out: Path) -> None:
+    # 先取指纹再构建：构建期间来源又有变化时，下次 refresh 会再重建
+    fingerprint = _source_fingerprint(source)
+    build_index([source], out)
+    _write_manifest(out.with_suffix(".json"), source, fingerprint)
+
+
+def resolve_index(results_dir: Path, advisory_db: Path | None) -> Path | None:
+    """Index file to use for a scan.
+
+    ``advisory_db`` may be a built index or an advisory source; sources are
+    built once into ``results/.cache/vulndb/`` (``<key>.idx`` plus a
+    ``<key>.json`` manifest) and reused. A scan only compares the source's
+    own size/mtime with the manifest; changes deeper inside a source
+    directory are picked up by ``refresh_source_indexes``
+    (``sca vulndb refresh``). Without ``advisory_db``, the default index from
+    ``sca vulndb build`` is used if present.
+    """
+    if advisory_db is None:
+        default = default_index_path(results_dir)
+        return default if default.is_file() else None
+    advisory_db = advisory_db.resolve()
+    if not advisory_db.exists():
+        raise FileNotFoundError(f"漏洞库不存在: {advisory_db}")
+    if advisory_db.is_file() and is_index_file(advisory_db):
+        return advisory_db
+    out = default_index_path(results_dir).parent / f"{_source_key(advisory_db)}.idx"
+    manifest_path = out.with_suffix(".json")
+    manifest = _read_manifest(manifest_path) if out.is_file() else None
+    if manifest is not None:
+        if manifest.get("stamp") == _source_stamp(advisory_db):
+            return out
+        # 来源本身的 size/mtime 变了（zip 被替换、目录顶层增删）：完整比对一次，内容未变则只更新清单
+        fingerprint = _source_fingerprint(advisory_db)
+        if manifest.get("fingerprint") == fingerprint:
+            _write_manifest(manifest_path, advisory_db, fingerprint)
+            return out
+    _build_source_index(advisory_db, out)
+    return out
+
+
+@dataclass(frozen=True)
+class RefreshResult:
+    source: Path
+    index_path: Path
+    # rebuilt / unchanged / missing（来源已不存在，索引保留）
+    status: str
+
+
+def refresh_source_indexes(results_dir: Path) -> list[RefreshResult]:
+    """Re-fingerprint every source index under ``results/.cache/vulndb/`` and rebuild the stale ones."""
+    out: list[RefreshResult] = []
+    vulndb_dir = default_index_path(results_dir).parent
+    for manifest_path in sorted(vulndb_dir.glob("*.json")):
+        manifest = _read_manifest(manifest_path)
+        index_path = manifest_path.with_suffix(".idx")
+        if manifest is None or not isinstance(manifest.get("source"), str) or not index_path.is_file():
+            continue
+        source = Path(manifest["source"])
+        if not source.exists():
+            out.append(RefreshResult(source, index_path, "missing"))
+            continue
+        fingerprint = _source_fingerprint(source)
+        if manifest.get("fingerprint") == fingerprint:
+            _write_manifest(manifest_path, source, fingerprint)
+            out.append(RefreshResult(source, index_path, "unchanged"))
+            continue
+        _build_source_index(source, index_path)
+        out.append(RefreshResult(source, index_path, "rebuilt"))
+    return out
+
+
+# ---------------------------------------------------------------- lookup
+
+
+class VulnIndex:
+    """Read-only, memory-mapped view of an index built by ``build_index``.
+
+    Safe to share between threads; every worker process maps the same file,
+    so the pages are shared through the OS page cache.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        with open(path, "rb") as fp:
+            self._mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            (magic, fmt, order, self._n_pkgs, self._n_advs, meta_len, hashes_off, self._slots_off, self._advs_off,
+             meta_off) = _HEADER.unpack_from(self._mm, 0)
+            if magic != _MAGIC or fmt != INDEX_FORMAT:
+                raise ValueError(f"不是可识别的漏洞库索引(或版本过旧，请重新构建): {path}")
+            if order != (0 if sys.byteorder == "little" else 1):
+                raise ValueError(f"漏洞库索引字节序与本机不一致，请在本机重新构建: {path}")
+            self._hashes = memoryview(self._mm)[hashes_off : hashes_off + 8 * self._n_pkgs].cast("Q")
+            self.meta: dict[str, Any] = json.loads(self._mm[meta_off : meta_off + meta_len])
+        except BaseException:
+            self.close()
+            raise
+        self._adv_cache: dict[int, dict[str, Any]] = {}
+
+    def close(self) -> None:
+        hashes = getattr(self, "_hashes", None)
+        if hashes is not None:
+            hashes.release()
+            self._hashes = None
+        self._mm.close()
+
+    def __enter__(self) -> "VulnIndex":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def _advisory(self, idx: int) -> dict[str, Any]:
+        adv = self._adv_cache.get(idx)
+        if adv is None:
+            off, length = _SLOT.unpack_from(self._mm, self._advs_off + idx * _SLOT.size)
+            adv = json.loads(self._mm[off : off + length])
+            self._adv_cache[idx] = adv
+        return adv
+
+    def records(self, purl_type: str, name: str) -> list[list[Any]]:
+        """Advisory refs ``[adv_idx, ranges, versions, fixed]`` for one package."""
+        name = normalize_name(purl_type, name)
+        h = _pkg_hash(purl_type, name)
+        i = bisect_left(self._hashes, h)
+        out: list[list[Any]] = []
+        while i < self._n_pkgs and self._hashes[i] == h:
+            off, length = _SLOT.unpack_from(self._mm, self._slots_off + i * _SLOT.size)
+            rec = json.loads(self._mm[off : off + length])
+            if rec["t"] == purl_type and rec["n"] == name:
+                out.extend(rec["a"])
+            i += 1
+        return out
+
+    def match(self, purl_type: str, name: str, version: str) -> list[dict[str, Any]]:
+        refs = self.records(purl_type, name)
+        if not refs:
+            return []
+        key = version_key(_SCHEME_BY_PURL.get(purl_type, "semver"), version)
+        hits: list[dict[str, Any]] = []
+        seen: set[str] = set()
+        for adv_idx, ranges, versions, fixed in refs:
+            affected = version in versions
+            if not affected and key is not None:
+                affected = any(in_range(key, tuple(r)) for r in ranges) or any(
+                    version_key(_SCHEME_BY_PURL.get(purl_type, "semver"), v) == key for v in versions
+                )
+            if not affected:
+                continue
+            adv = self._advisory(adv_idx)
+            # 同一漏洞可能同时以 GHSA/RUSTSEC/PYSEC 编号收录，按别名去重
+            ids = {adv["id"], *adv.get("aliases", [])}
+            if ids & seen:
+                continue
+            seen |= ids
+            hits.append({**adv, "fixedVersions": fixed})
+        return hits
+
+
+def _split_purl(purl: str) -> tuple[str, str, str] | None:
+    if not purl.startswith("pkg:"):
+        return None
+    purl_type, _, rest = purl[4:].partition("/")
+    rest = rest.split("?", 1)[0].split("#", 1)[0]
+    name, sep, version = rest.rpartition("@")
+    if not sep or not name:
+        return None
+    return purl_type.lower(), unquote(name), unquote(version)
+
+
+def _library_components(sbom: dict[str, Any]) -> list[dict[str, Any]]:
+    """Every non-application component, nested ones included, once per purl."""
+    out: list[dict[str, Any]] = []
+    seen: set[str] = set()
+    stack = list(reversed(sbom.get("components") or []))
+    while stack:
+        c = stack.pop()
+        stack.extend(reversed(c.get("components") or []))
+        if c.get("type") == "application":
+            continue
+        purl = c.get("purl")
+        if purl:
+            if purl in seen:
+                continue
+            seen.add(purl)
+        out.append(c)
+    return out
+
+
+@traced("vuln_match")
+def build_vuln_report(sbom: dict[str, Any], *, tool: str, index: VulnIndex | None) -> dict[str, Any]:
+    """``vuln_report.json`` payload for every cargo/npm/pypi/golang component of ``sbom``."""
+    components = _library_components(sbom)
+    report: dict[str, Any] = {
+        "generated_at": sbom["metadata"]["timestamp"],
+        "tool": tool,
+    }
+    if index is None:
+        report.update(
+            {
+                "note": "no advisory database configured; run `sca vulndb build <source>` or pass --advisory-db",
+                "total_packages": len(components),
+                "vulnerabilities_found": 0,
+                "vulnerabilities": [],
+            }
+        )
+        return report
+
+    vulns: list[dict[str, Any]] = []
+    for c in components:
+        parsed = _split_purl(c.get("purl") or "")
+        if parsed is None or parsed[0] not in _SCHEME_BY_PURL:
+            continue
+        purl_type, name, version = parsed
+        for adv in index.match(purl_type, name, version):
+            vulns.append({"purl": c["purl"], "name": name, "version": version, **adv})
+    report.update(
+        {
+            "advisoryDb": {"path": str(index.path), **index.meta},
+            "total_packages": len(components),
+            "vulnerabilities_found": len(vulns),
+            "vulnerabilities": vulns,
+        }
+    )
+    return report
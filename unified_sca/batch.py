@@ -0,0 +1,199 @@
+"""Batch scanning of a container directory (one entry per child dir/archive).
+
+Each entry is detected and scanned in its own worker process; failures are
+isolated per entry like ``detect_first_level``. One JSON line is printed per
+finished entry and a combined index is written when the batch completes.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable
+
+from sca_tools.utils import slug, ts_compact, utc_now_iso, write_json
+from sca_tools.vulndb import resolve_index
+
+from .nested import DEFAULT_NESTED_LIMITS, NestedLimits
+
+if TYPE_CHECKING:
+    from .cli import ScanOutcome
+
+
+@dataclass(frozen=True)
+class BatchSummary:
+    index_path: Path
+    total: int
+    succeeded: int
+    failed: int
+
+
+def outcome_record(outcome: "ScanOutcome") -> dict[str, Any]:
+    """JSON-ready summary of a finished scan (shared with ``sca serve``)."""
+    det, res = outcome.detection, outcome.artifacts
+    record: dict[str, Any] = {
+        "status": "ok",
+        "projectRoot": str(det.project_root),
+        "detectedTypes": list(det.detected_types),
+        "scannedTypes": list(outcome.scanned_types),
+        "outputDir": str(res.output_dir),
+        "sbom": str(res.sbom_path),
+        "vulnReport": str(res.vuln_report_path),
+        "details": str(res.scan_details_path),
+    }
+    if outcome.projects:
+        record["projects"] = list(outcome.projects)
+    if outcome.errors:
+        record["typeErrors"] = outcome.errors
+    return record
+
+
+def _scan_entry(
+    entry_path: str,
+    results_dir: str,
+    use_cache: bool = True,
+    sbom_format: str = "json",
+    advisory_index: str | None = None,
+    nested: NestedLimits | None = DEFAULT_NESTED_LIMITS,
+    profile: str | None = None,
+    profile_top: int | None = None,
+) -> dict[str, Any]:
+    """Worker: never raises, so one bad upload cannot break the batch."""
+    from .cli import scan_one
+
+    entry = Path(entry_path)
+    started = time.perf_counter()
+    record: dict[str, Any] = {"entry": entry.name, "path": entry_path}
+    try:
+        outcome = scan_one(
+            entry,
+            Path(results_dir),
+            use_cache=use_cache,
+            sbom_format=sbom_format,
+            advisory_db=Path(advisory_index) if advisory_index else None,
+            nested=nested,
+            profile=profile,
+            profile_top=profile_top,
+        )
+        record.update(outcome_record(outcome))
+    except Exception as e:
+        record.update({"status": "error", "error": f"{type(e).__name__}: {e}"})
+    record["elapsedSeconds"] = round(time.perf_counter() - started, 3)
+    return record
+
+
+def _error_record(entry: Path, exc: BaseException) -> dict[str, Any]:
+    return {"entry": entry.name, "path": str(entry), "status": "error", "error": f"{type(exc).__name__}: {exc}"}
+
+
+def _scan_isolated(entry: Path, args: tuple[Any, ...]) -> dict[str, Any]:
+    """Run ``_scan_entry`` in a pool of its own, so a worker crash is charged to ``entry`` alone."""
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        try:
+            return pool.submit(_scan_entry, str(entry), *args).result()
+        except Exception as e:
+            return _error_record(entry, e)
+
+
+def _iter_entries(container_dir: Path) -> list[Path]:
+    from .cli import _is_candidate_entry
+
+    return [e for e in sorted(container_dir.iterdir(), key=lambda x: x.name.lower()) if _is_candidate_entry(e)]
+
+
+def scan_first_level(
+    container_dir: Path,
+    results_dir: Path,
+    *,
+    jobs: int | None = None,
+    use_cache: bool = True,
+    sbom_format: str = "json",
+    advisory_db: Path | None = None,
+    on_result: Callable[[dict[str, Any]], None] | None = None,
+    nested: NestedLimits | None = DEFAULT_NESTED_LIMITS,
+    profile: str | None = None,
+    profile_top: int | None = None,
+) -> BatchSummary:
+    """Scan every first-level entry of ``container_dir`` on a process pool.
+
+    A worker that dies (e.g. killed for OOM) breaks the whole pool and fails
+    every unfinished entry with it; those entries are rerun one per process,
+    so only the entry that crashed again is reported as failed. With
+    ``profile`` each entry is profiled on its own (see ``scan_one``).
+    """
+    container_dir = container_dir.resolve()
+    results_dir = results_dir.resolve()
+    # 漏洞库索引在父进程里解析/构建一次，子进程各自 mmap 同一个文件
+    index_path = resolve_index(results_dir, advisory_db)
+    advisory_index = str(index_path) if index_path is not None else None
+    entries = _iter_entries(container_dir)
+    jobs = max(1, jobs or os.cpu_count() or 1)
+
+    def _emit(record: dict[str, Any]) -> None:
+        if on_result is not None:
+            on_result(record)
+            return
+        sys.stdout.write(json.dumps(record, ensure_ascii=False) + "\n")
+        sys.stdout.flush()
+
+    started_at = utc_now_iso()
+    records: list[dict[str, Any]] = []
+    if jobs == 1 or len(entries) <= 1:
+        for entry in entries:
+            rec = _scan_entry(
+                str(entry), str(results_dir), use_cache, sbom_format, advisory_index, nested, profile, profile_top
+            )
+            records.append(rec)
+            _emit(rec)
+    else:
+        args = (str(results_dir), use_cache, sbom_format, advisory_index, nested, profile, profile_top)
+        crashed: list[Path] = []
+        with ProcessPoolExecutor(max_workers=min(jobs, len(entries))) as pool:
+            futures: dict[Future[dict[str, Any]], Path] = {
+                pool.submit(_scan_entry, str(entry), *args): entry for entry in entries
+            }
+            for fut in as_completed(futures):
+                entry = futures[fut]
+                try:
+                    rec = fut.result()
+                except BrokenProcessPool:
+                    # 任一子进程异常退出（如 OOM 被杀）会让池中所有未完成的任务一起失败，
+                    # 无法判断是哪个条目导致的；先收集起来，稍后逐个隔离重跑
+                    crashed.append(entry)
+                    continue
+                except Exception as e:
+                    rec = _error_record(entry, e)
+                records.append(rec)
+                _emit(rec)
+        if crashed:
+            # 每个条目单独一个进程池：再次崩溃只记到该条目上，其余条目正常完成
+            with ThreadPoolExecutor(max_workers=min(jobs, len(crashed))) as threads:
+                retries = [threads.submit(_scan_isolated, entry, args) for entry in crashed]
+                for fut in as_completed(retries):
+                    rec = fut.result()
+                    records.append(rec)
+                    _emit(rec)
+
+    records.sort(key=lambda r: str(r.get("entry", "")).lower())
+    succeeded = sum(1 for r in records if r.get("status") == "ok")
+    index_path = results_dir / "batch" / slug(container_dir.name) / ts_compact() / "index.json"
+    write_json(
+        index_path,
+        {
+            "container": str(container_dir),
+            "startedAt": started_at,
+            "finishedAt": utc_now_iso(),
+            "jobs": jobs,
+            "total": len(records),
+            "succeeded": succeeded,
+            "failed": len(records) - succeeded,
+            "entries": records,
+        },
+    )
+    return BatchSummary(index_path=index_path, total=len(records), succeeded=succeeded, failed=len(records) - succeeded)
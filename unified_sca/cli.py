@@ -1,14 +1,38 @@
+"""Command line entry point.
+
+Startup matters (``sca detect`` runs as a pre-commit hook), so only what
+argument parsing and detection need is imported here; analyzers, the SBOM
+cache, the advisory index, archive extraction and the server are imported
+inside the subcommand that uses them. ``sca --profile-startup <cmd> ...``
+reports where the import time goes.
+"""
+
 from __future__ import annotations
 
 import argparse
+import json
 import re
 import sys
-from datetime import datetime
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from dataclasses import dataclass
 from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator
+
+from .detect import Detection, detect_fs, dir_has_markers
+from .nested import DEFAULT_NESTED_LIMITS, NESTED_SEP, NestedLimits, NestedScan, find_nested_archives
+from .tar_utils import is_tar_path
+from .vfs import ProjectFS, is_archive_path, open_project_fs
+from .workspace import PROJECT_MODES, ProjectRoot, discover_projects, project_label
+from sca_tools import tracing
+from sca_tools.utils import SBOM_FORMATS, input_name, utc_now_iso
 
-from .detect import Detection, detect_project_types
-from .zip_utils import cleanup_work_dir, safe_extract_zip
-from sca_tools.registry import scan_by_type
+if TYPE_CHECKING:
+    from .incremental import IncrementalResult
+    from sca_tools.base import ScanArtifacts
+    from sca_tools.cache import SbomCache
+    from sca_tools.vulndb import VulnIndex
 
 
 def _slug(s: str) -> str:
@@ -19,73 +43,292 @@ def _slug(s: str) -> str:
 
 
 def _timestamp_compact() -> str:
-    return datetime.now().strftime("%Y%m%d_%H%M%S")
+    return time.strftime("%Y%m%d_%H%M%S")
 
 
 def _resolve_input_path(p: str) -> Path:
     return Path(p).expanduser().resolve()
 
 
+def _extract_filters(args: argparse.Namespace) -> dict[str, list[str] | None]:
+    """--extract-include/--extract-exclude (逗号分隔) -> detect_one 的关键字参数。"""
+
+    def _split(v: str | None) -> list[str] | None:
+        return [x.strip() for x in v.split(",") if x.strip()] if v else None
+
+    return {"extract_include": _split(args.extract_include), "extract_exclude": _split(args.extract_exclude)}
+
+
+def _nested_limits(args: argparse.Namespace) -> NestedLimits | None:
+    """--nested-depth/--nested-max-mb/--nested-max-members -> scan 的 nested 参数（深度 0 表示关闭）。"""
+    if args.nested_depth <= 0:
+        return None
+    return NestedLimits(
+        max_depth=args.nested_depth,
+        max_total_bytes=args.nested_max_mb * 1024 * 1024,
+        max_members=args.nested_max_members,
+    )
+
+
 def _work_base_default() -> Path:
     # 临时工作目录：默认放在当前目录 results/.work（更适合部署到任意目录）
     return (Path.cwd() / "results" / ".work").resolve()
 
 
-def _dir_has_manifest_markers(d: Path) -> bool:
-    """仅检查该目录本层是否存在明显表征文件（不下钻）。"""
-    markers = [
-        # python
-        "pyproject.toml",
-        "requirements.txt",
-        "Pipfile",
-        "setup.py",
-        "setup.cfg",
-        "poetry.lock",
-        "uv.lock",
-        # java
-        "pom.xml",
-        "build.gradle",
-        "build.gradle.kts",
-        "settings.gradle",
-        "settings.gradle.kts",
-        "gradlew",
-        # rust
-        "Cargo.toml",
-        "Cargo.lock",
-        # javascript
-        "package.json",
-        "package-lock.json",
-        "yarn.lock",
-        "pnpm-lock.yaml",
-        "bun.lockb",
-        # go
-        "go.mod",
-        "go.sum",
-    ]
-    return any((d / m).exists() for m in markers)
-
-
-def detect_one(input_path: Path, *, keep_workdir: bool = False, work_base: Path | None = None) -> Detection:
-    work_base = (work_base or _work_base_default()).resolve()
-    work_base.mkdir(parents=True, exist_ok=True)
-
-    work_dir: Path | None = None
-    project_root = input_path
-
-    try:
-        if input_path.is_file() and input_path.suffix.lower() == ".zip":
-            work_dir = work_base / f"{_slug(input_path.stem)}_{_timestamp_compact()}"
-            extract_res = safe_extract_zip(input_path, work_dir)
-            project_root = extract_res.extracted_root
-        elif input_path.is_dir():
-            project_root = input_path
+@tracing.traced("detect_one")
+def detect_one(
+    input_path: Path,
+    *,
+    keep_workdir: bool = False,
+    work_base: Path | None = None,
+    prune_dirs: Iterable[str] | None = None,
+    extract_include: Iterable[str] | None = None,
+    extract_exclude: Iterable[str] | None = None,
+) -> Detection:
+    if not (input_path.is_dir() or is_archive_path(input_path)):
+        raise FileNotFoundError(f"输入路径必须是目录或压缩包: {input_path}")
+    if keep_workdir and input_path.is_file():
+        # 压缩包直接按成员表/单次顺序读取识别，不落盘；--keep-workdir 时额外解压一份便于排查
+        work_base = (work_base or _work_base_default()).resolve()
+        work_base.mkdir(parents=True, exist_ok=True)
+        if is_tar_path(input_path):
+            from .tar_utils import safe_extract_tar as extract
         else:
-            raise FileNotFoundError(f"输入路径必须是目录或zip文件: {input_path}")
+            from .zip_utils import safe_extract_zip as extract
+        extract(
+            input_path,
+            work_base / f"{_slug(input_name(input_path))}_{_timestamp_compact()}",
+            include=extract_include,
+            exclude=extract_exclude,
+        )
+    with open_project_fs(input_path) as fs, tracing.span("detect", input=input_path.name):
+        return detect_fs(fs, prune_dirs=prune_dirs)
+
+
+class UnsupportedProjectError(ValueError):
+    """识别结果没有可用的分析器。"""
+
+
+@dataclass(frozen=True)
+class ScanOutcome:
+    detection: Detection
+    scanned_types: tuple[str, ...]
+    # 多生态时为合并结果，否则即该类型自身的输出
+    artifacts: ScanArtifacts
+    per_type: dict[str, ScanArtifacts]
+    errors: dict[str, str]
+    # monorepo 多项目扫描时各项目的相对路径（per_type/errors 的键为 "<项目>:<类型>"）
+    projects: tuple[str, ...] = ()
+
+
+def scan_one(
+    in_path: Path,
+    results_dir: Path,
+    *,
+    use_cache: bool = True,
+    sbom_format: str = "json",
+    advisory_db: Path | None = None,
+    projects: str = "auto",
+    jobs: int | None = None,
+    nested: NestedLimits | None = DEFAULT_NESTED_LIMITS,
+    profile: str | None = None,
+    profile_top: int | None = None,
+) -> ScanOutcome:
+    """识别并扫描单个目录/压缩包：所有已接入的识别类型并行扫描，多于一种时合并 SBOM。
+
+    ``advisory_db`` 为离线漏洞库（已构建的索引或 OSV/RustSec 源），缺省时使用
+    ``sca vulndb build`` 生成的默认索引（若存在）。``projects`` 见
+    ``workspace.select_project_roots``：monorepo 中的多个项目根并行扫描，输出层级 SBOM。
+    ``nested`` 为内嵌压缩包（vendor/*.zip 等）在内存中展开的层数/大小/成员数上限，None 表示不展开。
+    各阶段的耗时、CPU、读写字节数与峰值 RSS 记录在输出的 scan_details.json 的 ``stages`` 中。
+    ``profile`` 为 ``cpu`` / ``mem`` 时在 cProfile / tracemalloc 下执行扫描（识别到各分析器），
+    报告写在输出目录中 sbom.json 旁（见 ``sca_tools.profiling``），``profile_top`` 为摘要条数。
+    """
+    if not (in_path.is_dir() or is_archive_path(in_path)):
+        raise FileNotFoundError(f"输入路径必须是目录或压缩包: {in_path}")
+    from sca_tools.cache import SbomCache, default_cache_dir
+    from sca_tools.vulndb import VulnIndex, resolve_index
+
+    with _recorded(in_path, profile=profile, profile_top=profile_top) as rec:
+        cache = SbomCache(default_cache_dir(results_dir)) if use_cache else None
+        with tracing.span("open_vulndb"):
+            index_path = resolve_index(results_dir, advisory_db)
+            vulndb = VulnIndex(index_path) if index_path is not None else None
+        try:
+            outcome = rec.outcome = scan_with_state(
+                in_path,
+                results_dir,
+                cache=cache,
+                sbom_format=sbom_format,
+                vulndb=vulndb,
+                projects=projects,
+                jobs=jobs,
+                nested=nested,
+            )
+        finally:
+            if vulndb is not None:
+                vulndb.close()
+    return outcome
+
+
+@dataclass
+class _Recording:
+    outcome: ScanOutcome | None = None
+
+
+# 外层已在记录（scan_one 内调用 scan_with_state）时内层不再重复计时/写入
+_recording: ContextVar[bool] = ContextVar("sca_recording", default=False)
 
-        return detect_project_types(project_root)
+
+@contextmanager
+def _recorded(in_path: Path, *, profile: str | None = None, profile_top: int | None = None) -> Iterator[_Recording]:
+    """Time (and with ``profile``, profile) one scan; the body stores its outcome in the yielded record.
+
+    Afterwards ``stages`` go into every scan_details.json the scan wrote: the
+    whole tree into the outcome's, each analyzer's own ``analyze`` stage into
+    its per-type file. Joins the active tracer (``--trace``) when there is one.
+    """
+    rec = _Recording()
+    if _recording.get():
+        yield rec
+        return
+    if profile is not None:
+        from sca_tools.profiling import DEFAULT_TOP, profiled
+
+        profiling = profiled(profile, top=profile_top or DEFAULT_TOP)
+    else:
+        profiling = nullcontext()
+    token = _recording.set(True)
+    try:
+        tracer = tracing.active()
+        with nullcontext(tracer) if tracer is not None else tracing.tracing() as tracer:
+            with tracing.span("scan", input=in_path.name) as root, profiling as prof:
+                yield rec
     finally:
-        if work_dir and (not keep_workdir):
-            cleanup_work_dir(work_dir)
+        _recording.reset(token)
+    outcome = rec.outcome
+    if outcome is None or root is None:
+        return
+    main_details = outcome.artifacts.scan_details_path
+    extra: dict[str, Any] = {"stages": tracer.stages(root)}
+    if prof is not None:
+        files = prof.write(outcome.artifacts.output_dir)
+        extra["profile"] = {"mode": prof.mode, "seconds": round(prof.seconds, 3), "files": [p.name for p in files]}
+    _update_details(main_details, extra)
+    for sp in tracer.spans_under(root, "analyze"):
+        details = sp.attrs.get("details")
+        if details and details != str(main_details):
+            _update_details(Path(details), {"stages": tracer.stages(sp)})
+
+
+def _update_details(details_path: Path, extra: dict[str, Any]) -> None:
+    from sca_tools.utils import read_json, write_json
+
+    try:
+        details = read_json(details_path)
+    except (OSError, ValueError):
+        return
+    details.update(extra)
+    write_json(details_path, details)
+
+
+def scan_with_state(
+    in_path: Path,
+    results_dir: Path,
+    *,
+    cache: SbomCache | None,
+    sbom_format: str,
+    vulndb: VulnIndex | None,
+    fs: ProjectFS | None = None,
+    detection: Detection | None = None,
+    projects: str = "auto",
+    jobs: int | None = None,
+    nested: NestedLimits | None = DEFAULT_NESTED_LIMITS,
+    profile: str | None = None,
+    profile_top: int | None = None,
+) -> ScanOutcome:
+    """同 ``scan_one``，但缓存、漏洞库（以及可选的已打开输入/识别结果）由调用方提供，
+    供 ``sca serve`` / ``sca shell`` 等常驻会话复用。各阶段同样写入输出的 scan_details.json，
+    ``profile`` / ``profile_top`` 同 ``scan_one``。"""
+    with _recorded(in_path, profile=profile, profile_top=profile_top) as rec:
+        outcome = rec.outcome = _scan_with_state(
+            in_path,
+            results_dir,
+            cache=cache,
+            sbom_format=sbom_format,
+            vulndb=vulndb,
+            fs=fs,
+            detection=detection,
+            projects=projects,
+            jobs=jobs,
+            nested=nested,
+        )
+    return outcome
+
+
+def _scan_with_state(
+    in_path: Path,
+    results_dir: Path,
+    *,
+    cache: SbomCache | None,
+    sbom_format: str,
+    vulndb: VulnIndex | None,
+    fs: ProjectFS | None,
+    detection: Detection | None,
+    projects: str,
+    jobs: int | None,
+    nested: NestedLimits | None,
+) -> ScanOutcome:
+    from sca_tools.context import open_scan_context
+    from sca_tools.registry import scan_types, scannable_types, supported_types, write_merged
+
+    from .workspace import scan_projects, select_project_roots
+
+    if not (in_path.is_dir() or is_archive_path(in_path)):
+        raise FileNotFoundError(f"输入路径必须是目录或压缩包: {in_path}")
+    # 打开输入、识别、定位 lock 只做一次，分析器直接复用该上下文
+    with open_scan_context(
+        in_path, results_dir, cache=cache, sbom_format=sbom_format, vulndb=vulndb, fs=fs, detection=detection
+    ) as ctx:
+        det = ctx.detection
+        with tracing.span("discover_projects"):
+            roots = select_project_roots(ctx.fs, det, projects)
+        found = None
+        if nested is not None and nested.max_depth > 0:
+            with tracing.span("nested_archives"):
+                found = find_nested_archives(ctx.fs, nested)
+        if found is not None and found.archives:
+            # 存在内嵌压缩包：各内嵌项目作为组件挂到所在项目下，统一走层级 SBOM
+            with found:
+                if roots is None:
+                    roots = [ProjectRoot(rel=ctx.project_rel, evidence=dict(det.evidence))] if det.evidence else []
+                return scan_projects(ctx, roots, jobs=jobs, nested=found)
+        if roots is not None:
+            return scan_projects(ctx, roots, jobs=jobs)
+        # 与多项目扫描（ProjectRoot.scan_types）一致：只交给能读取现有文件的分析器，
+        # 如只有 build.gradle 时不调用 Maven 分析器
+        types = scannable_types(det.evidence)
+        if not types:
+            if any(t in supported_types() for t in det.detected_types):
+                raise UnsupportedProjectError(
+                    f"未找到分析器可读取的文件：识别结果={det.detected_types}，表征文件={det.evidence}"
+                )
+            raise UnsupportedProjectError(f"暂未接入该类型的分析：识别结果={det.detected_types}")
+
+        per_type, errors = scan_types(detected_types=types, input_path=in_path, results_dir=results_dir, context=ctx)
+        if not per_type:
+            raise RuntimeError("; ".join(f"{t}: {msg}" for t, msg in errors.items()))
+        if len(types) == 1:
+            return ScanOutcome(det, types, per_type[types[0]], per_type, errors)
+        merged = write_merged(
+            per_type=per_type,
+            errors=errors,
+            input_path=in_path,
+            results_dir=results_dir,
+            project_name=ctx.project_name,
+            sbom_format=sbom_format,
+        )
+    return ScanOutcome(det, tuple(sorted(per_type)), merged, per_type, errors)
 
 
 def _is_candidate_entry(p: Path) -> bool:
@@ -94,13 +337,17 @@ def _is_candidate_entry(p: Path) -> bool:
         return False
     if p.is_dir():
         return True
-    if p.is_file() and p.suffix.lower() == ".zip":
+    if is_archive_path(p):
         return True
     return False
 
 
 def detect_first_level(
-    container_dir: Path, *, keep_workdir: bool = False, work_base: Path | None = None
+    container_dir: Path,
+    *,
+    keep_workdir: bool = False,
+    work_base: Path | None = None,
+    prune_dirs: Iterable[str] | None = None,
 ) -> list[tuple[str, Detection]]:
     """对目录第一层的每个子目录/zip分别进行类型识别。"""
     detections: list[tuple[str, Detection]] = []
@@ -108,7 +355,8 @@ def detect_first_level(
         if not _is_candidate_entry(entry):
             continue
         try:
-            detections.append((entry.name, detect_one(entry, keep_workdir=keep_workdir, work_base=work_base)))
+            det = detect_one(entry, keep_workdir=keep_workdir, work_base=work_base, prune_dirs=prune_dirs)
+            detections.append((entry.name, det))
         except Exception as e:
             detections.append(
                 (
@@ -128,82 +376,492 @@ def build_parser() -> argparse.ArgumentParser:
         prog="unified_sca",
         description="统一SCA外部包装器：自动识别项目类型并输出到终端(后续再接入真实SCA工具)。",
     )
+    p.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="在 python -X importtime 下执行其后的命令，并在 stderr 汇总启动耗时与各模块导入耗时（如 sca --profile-startup detect .）",
+    )
     sub = p.add_subparsers(dest="cmd", required=False)
 
-    detect = sub.add_parser("detect", help="识别一个目录或zip项目的类型，并打印结果")
-    detect.add_argument("path", help="待检测项目路径(目录或.zip)")
-    detect.add_argument("--keep-workdir", action="store_true", help="保留zip解压临时目录(用于调试)")
+    detect = sub.add_parser("detect", help="识别一个目录或压缩包项目的类型，并打印结果")
+    detect.add_argument("path", help="待检测项目路径(目录或压缩包：.zip/.tar/.tar.gz/.tar.zst 等)")
+    detect.add_argument("--keep-workdir", action="store_true", help="额外解压一份压缩包到临时目录并保留(用于调试)")
     detect.add_argument(
         "--work-base",
         default=str(_work_base_default()),
-        help="zip解压临时目录基路径，默认 results/.work",
+        help="压缩包解压临时目录基路径，默认 results/.work",
     )
     detect.add_argument(
         "--first-level",
         action="store_true",
         help="对输入目录的第一层子目录/zip分别识别并汇总输出（适合传入 test_project/ 这种容器目录）",
     )
+    detect.add_argument(
+        "--prune",
+        default=None,
+        help="下钻识别时跳过的目录名（逗号分隔），覆盖默认列表 node_modules,target,.venv 等",
+    )
+    detect.add_argument(
+        "--extract-exclude",
+        default=None,
+        help="--keep-workdir 解压时跳过的成员（逗号分隔的 glob，如 node_modules/**,target/**,*.png）",
+    )
+    detect.add_argument(
+        "--extract-include",
+        default=None,
+        help="--keep-workdir 解压时只保留匹配的成员（逗号分隔的 glob）",
+    )
+    detect.add_argument(
+        "--projects",
+        action="store_true",
+        help="列出树内所有项目根（识别 npm/yarn workspaces、Cargo [workspace]、uv workspace、Maven <modules> 成员）",
+    )
 
-    scan = sub.add_parser("scan", help="根据识别到的项目类型调用对应工具进行分析（纯Python：rust/python/javascript）")
-    scan.add_argument("path", help="待检测项目路径(目录或.zip)")
+    detect.add_argument(
+        "--trace",
+        default=None,
+        metavar="OUT.json",
+        help="把各阶段的计时写成 Chrome trace（chrome://tracing、Perfetto、speedscope 可打开）",
+    )
+
+    scan = sub.add_parser("scan", help="根据识别到的项目类型调用对应工具进行分析（纯Python：rust/python/javascript/go/java）")
+    scan.add_argument("path", help="待检测项目路径(目录或压缩包：.zip/.tar/.tar.gz/.tar.zst 等)")
     scan.add_argument(
         "--results-dir",
         default=str((Path.cwd() / "results").resolve()),
         help="结果输出根目录，默认当前目录下 results/",
     )
+    scan.add_argument(
+        "--first-level",
+        "--batch",
+        dest="first_level",
+        action="store_true",
+        help="对输入目录第一层的每个子目录/zip分别识别并扫描，逐条输出结果并在 results/batch/ 下生成汇总索引",
+    )
+    scan.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="--first-level 批量扫描的并行进程数 / 多项目或 --incremental 时并行解析的项目数，默认 CPU 核数",
+    )
+    scan.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="不使用 results/.cache 下的 SBOM 缓存（lock 未变化时默认直接复用上次结果）",
+    )
+    scan.add_argument(
+        "--sbom-format",
+        choices=list(SBOM_FORMATS),
+        default="json",
+        help="SBOM 输出格式：json(缩进) / json-compact(紧凑) / json.gz(紧凑+gzip，输出 sbom.json.gz)",
+    )
+    scan.add_argument(
+        "--advisory-db",
+        default=None,
+        help="离线漏洞库：已构建的索引文件，或 OSV/RustSec 源目录/zip（首次使用时自动构建索引并缓存）；"
+        "缺省时使用 sca vulndb build 生成的默认索引",
+    )
+    scan.add_argument(
+        "--projects",
+        choices=list(PROJECT_MODES),
+        default="auto",
+        help="monorepo 多项目：auto(根目录无表征文件且发现多个项目时全部扫描，默认) / all(总是扫描所有项目根) / "
+        "best(只扫描得分最高的一个目录)；多项目时并行扫描并输出层级 SBOM",
+    )
+    scan.add_argument(
+        "--nested-depth",
+        type=int,
+        default=DEFAULT_NESTED_LIMITS.max_depth,
+        help="在内存中展开内嵌压缩包（vendor/*.zip、tar.gz 等）的最大层数，内嵌项目作为所在项目的组件输出；0 表示不展开，默认 2",
+    )
+    scan.add_argument(
+        "--nested-max-mb",
+        type=int,
+        default=DEFAULT_NESTED_LIMITS.max_total_bytes // (1024 * 1024),
+        help="内嵌压缩包展开的总大小上限(MB，含 tar 解压流)，超出的压缩包跳过并记录，默认 256",
+    )
+    scan.add_argument(
+        "--nested-max-members",
+        type=int,
+        default=DEFAULT_NESTED_LIMITS.max_members,
+        help="内嵌压缩包的成员总数上限，默认 100000",
+    )
+    scan.add_argument(
+        "--incremental",
+        action="store_true",
+        help="monorepo 增量扫描：记录各子项目 lock/清单的 size/mtime/hash，只重新解析有变化的子项目，"
+        "结果写入 results/incremental/<项目>/ 下固定路径",
+    )
+    scan.add_argument(
+        "--watch",
+        action="store_true",
+        help="配合 --incremental：监听 lock/清单变化并持续更新聚合 SBOM（Linux 用 inotify，其他平台轮询）",
+    )
+    scan.add_argument(
+        "--interval",
+        type=float,
+        default=2.0,
+        help="--watch 轮询模式下的检查间隔（秒），默认 2",
+    )
+    scan.add_argument(
+        "--trace",
+        default=None,
+        metavar="OUT.json",
+        help="把各阶段的计时写成 Chrome trace（chrome://tracing、Perfetto、speedscope 可打开）；"
+        "阶段汇总总会写入 scan_details.json",
+    )
+    scan.add_argument(
+        "--profile",
+        choices=["cpu", "mem"],
+        default=None,
+        help="在 cProfile(cpu) / tracemalloc(mem) 下执行扫描，报告（profile.pstats、profile_cpu.txt / "
+        "profile.tracemalloc、profile_mem.txt）写在 sbom.json 旁；--batch 时每个条目各自输出",
+    )
+    scan.add_argument(
+        "--profile-top",
+        type=int,
+        default=None,
+        help="--profile 文本摘要列出的条数，默认 30",
+    )
+
+    cache = sub.add_parser("cache", help="管理 SBOM 缓存（按 lock 文件内容哈希寻址）")
+    cache.add_argument("action", choices=["stats", "prune", "clear"], help="stats 查看 / prune 按 LRU 淘汰 / clear 清空")
+    cache.add_argument(
+        "--results-dir",
+        default=str((Path.cwd() / "results").resolve()),
+        help="结果输出根目录（缓存位于其下 .cache/sbom），默认当前目录下 results/",
+    )
+    cache.add_argument("--max-size-mb", type=int, default=None, help="prune：缓存总大小上限(MB)，默认 1024")
+    cache.add_argument("--max-entries", type=int, default=None, help="prune：缓存条目数上限，默认 10000")
+
+    vulndb = sub.add_parser("vulndb", help="构建/查看离线漏洞库索引（OSV JSON 目录或zip、RustSec advisory-db）")
+    vulndb.add_argument(
+        "action",
+        choices=["build", "info", "refresh"],
+        help="build 从漏洞源构建索引 / info 查看索引信息 / refresh 重新检查 --advisory-db 漏洞源，内容变化的重建索引",
+    )
+    vulndb.add_argument("sources", nargs="*", help="build：漏洞源（目录、zip 或单个 OSV json），可传多个")
+    vulndb.add_argument(
+        "--results-dir",
+        default=str((Path.cwd() / "results").resolve()),
+        help="结果输出根目录（默认索引位于其下 .cache/vulndb/advisories.idx），默认当前目录下 results/",
+    )
+    vulndb.add_argument("--out", default=None, help="索引输出/读取路径，默认 <results-dir>/.cache/vulndb/advisories.idx")
 
     sub.add_parser("shell", help="进入交互式命令行（在提示符内输入 detect/scan）")
 
+    serve = sub.add_parser("serve", help="常驻服务：在 Unix socket 或本机端口上接收 detect/scan 任务（缓存与漏洞库常驻内存）")
+    serve.add_argument("--socket", default=None, help="监听的 Unix socket 路径（指定后忽略 --host/--port）")
+    serve.add_argument("--host", default="127.0.0.1", help="监听地址，默认 127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765, help="监听端口，默认 8765")
+    serve.add_argument("--workers", type=int, default=None, help="并行执行任务的工作线程数，默认 min(4, CPU 核数)")
+    serve.add_argument(
+        "--results-dir",
+        default=str((Path.cwd() / "results").resolve()),
+        help="结果输出根目录，默认当前目录下 results/；客户端指定的 results_dir 必须位于其下",
+    )
+
+    client = sub.add_parser("client", help="向 sca serve 提交任务/查询结果")
+    client.add_argument(
+        "action", choices=["detect", "scan", "result", "jobs", "ping", "shutdown"], help="detect/scan 提交任务，result 查询任务"
+    )
+    client.add_argument("target", nargs="?", default=None, help="detect/scan：项目路径(目录或压缩包)；result：任务 id")
+    client.add_argument("--socket", default=None, help="服务端 Unix socket 路径")
+    client.add_argument("--host", default="127.0.0.1", help="服务端地址，默认 127.0.0.1")
+    client.add_argument("--port", type=int, default=8765, help="服务端端口，默认 8765")
+    client.add_argument("--no-wait", action="store_true", help="提交后立即返回任务 id，不等待完成")
+    client.add_argument(
+        "--results-dir",
+        default=None,
+        help="scan：结果输出目录，须位于服务端 --results-dir 之下，默认即服务端的结果根目录",
+    )
+    client.add_argument("--no-cache", action="store_true", help="scan：不使用 SBOM 缓存")
+    client.add_argument("--sbom-format", choices=list(SBOM_FORMATS), default="json", help="scan：SBOM 输出格式")
+    client.add_argument("--advisory-db", default=None, help="scan：离线漏洞库（索引文件或 OSV/RustSec 源）")
+
     return p
 
 
-def _print_detection(det: Detection) -> None:
-    print(f"projectRoot: {det.project_root}")
-    print(f"detectedTypes: {', '.join(det.detected_types)}")
+def _print_detection(det: Detection, out: Callable[[str], None] = print) -> None:
+    out(f"projectRoot: {det.project_root}")
+    out(f"detectedTypes: {', '.join(det.detected_types)}")
     if det.evidence:
-        print("evidence:")
+        out("evidence:")
         for k in sorted(det.evidence.keys()):
-            print(f"  - {k}: {det.evidence[k]}")
+            out(f"  - {k}: {det.evidence[k]}")
     else:
-        print("evidence: {}")
+        out("evidence: {}")
 
 
-def _print_detection_list(dets: list[tuple[str, Detection]]) -> None:
+def _print_detection_list(dets: list[tuple[str, Detection]], out: Callable[[str], None] = print) -> None:
     for i, (entry_name, d) in enumerate(dets):
         if i > 0:
-            print()
-        print(f"entry: {entry_name}")
-        _print_detection(d)
+            out("")
+        out(f"entry: {entry_name}")
+        _print_detection(d, out)
+
+
+def _print_scan_outcome(outcome: ScanOutcome, out: Callable[[str], None] = print) -> None:
+    if outcome.projects:
+        # 项目较多时每个项目只输出一行
+        for key, res in outcome.per_type.items():
+            out(f"OK: {key}: {res.sbom_path}")
+        for key, msg in outcome.errors.items():
+            out(f"FAILED: {key}: {msg}")
+        res = outcome.artifacts
+        out(f"OK: {len(outcome.projects)} 个项目的层级 SBOM 已输出到: {res.output_dir}")
+        out(f"- sbom: {res.sbom_path}")
+        out(f"- vuln_report: {res.vuln_report_path}")
+        out(f"- details: {res.scan_details_path}")
+        return
+    for detected, res in outcome.per_type.items():
+        out(f"OK: {detected} 分析结果已输出到: {res.output_dir}")
+        out(f"- sbom: {res.sbom_path}")
+        out(f"- vuln_report: {res.vuln_report_path}")
+        out(f"- details: {res.scan_details_path}")
+    for detected, msg in outcome.errors.items():
+        out(f"FAILED: {detected}: {msg}")
+    if len(outcome.per_type) > 1:
+        res = outcome.artifacts
+        out(f"OK: 合并 SBOM({', '.join(outcome.scanned_types)}) 已输出到: {res.output_dir}")
+        out(f"- sbom: {res.sbom_path}")
+
+
+def _print_projects(
+    fs: ProjectFS,
+    roots: list[ProjectRoot],
+    out: Callable[[str], None] = print,
+    *,
+    nested: NestedScan | None = None,
+) -> None:
+    views: list[tuple[ProjectFS, list[ProjectRoot], str | None]] = [(fs, roots, None)]
+    if nested is not None:
+        views.extend((a.fs, discover_projects(a.fs), a.label) for a in nested.archives)
+    out(f"projectRoot: {fs.display_path(fs.root)}")
+    out(f"projects: {sum(len(v[1]) for v in views)}")
+    for view, view_roots, archive in views:
+        for r in view_roots:
+            label = project_label(view, r.rel)
+            if archive:
+                label = archive if label == "." else f"{archive}{NESTED_SEP}{label}"
+            line = f"  - {label}: {', '.join(r.detected_types)}"
+            if r.workspaces:
+                line += f"  [workspace: {', '.join(r.workspaces)}; {len(r.members)} members]"
+            if not r.scan_types:
+                line += "  (无可解析的 lock，跳过)"
+            out(line)
+    if nested is not None:
+        for label, reason in nested.skipped.items():
+            out(f"  ! {label}: 内嵌压缩包已跳过（{reason}）")
+
+
+def _print_incremental(res: "IncrementalResult", out: Callable[[str], None] = print) -> None:
+    out(f"outputDir: {res.artifacts.output_dir}")
+    out(f"sbom: {res.artifacts.sbom_path}")
+    out(
+        f"rescanned: {len(res.changed)}  reused: {len(res.unchanged)}  removed: {len(res.removed)}  "
+        f"components: {res.components}  ({res.elapsed_seconds:.2f}s)"
+    )
+    for rel in res.changed:
+        out(f"  * {rel or '.'}")
+    for rel in res.removed:
+        out(f"  - {rel or '.'}")
+    for k, msg in res.errors.items():
+        out(f"  ! {k}: {msg}")
 
 
-def main(argv: list[str] | None = None) -> int:
-    if argv is None:
-        argv = sys.argv[1:]
-    argv = list(argv)
+def _run_incremental(args: argparse.Namespace, in_path: Path, results_dir: Path, advisory_db: Path | None) -> int:
+    from .incremental import run_incremental
+    from .session import ScanSession
+
+    session = ScanSession()
+    try:
+
+        def _update() -> "IncrementalResult":
+            return run_incremental(
+                in_path,
+                results_dir,
+                sbom_format=args.sbom_format,
+                use_cache=not args.no_cache,
+                advisory_db=advisory_db,
+                session=session,
+                jobs=args.jobs,
+            )
+
+        res = _update()
+        _print_incremental(res)
+        if not args.watch:
+            return 0 if not res.errors else 1
+
+        from .watch import open_watcher
+
+        watcher = open_watcher(in_path, interval=args.interval)
+        print(f"watching {in_path} (Ctrl+C 退出)", flush=True)
+        try:
+            while True:
+                if watcher.wait():
+                    print(f"[{utc_now_iso()}] 检测到变化，增量更新", flush=True)
+                    _print_incremental(_update())
+        except KeyboardInterrupt:
+            return 0
+        finally:
+            watcher.close()
+    finally:
+        session.close()
+
+
+def _run_client(args: argparse.Namespace) -> int:
+    from .server import ScanClient
+
+    req: dict[str, object] = {"op": args.action, "wait": not args.no_wait}
+    if args.action in ("detect", "scan"):
+        if not args.target:
+            raise SystemExit(f"client {args.action} 需要项目路径")
+        # 服务端的工作目录可能不同，路径一律以客户端视角解析成绝对路径
+        req["path"] = str(_resolve_input_path(args.target))
+        if args.action == "scan":
+            if args.results_dir:
+                req["results_dir"] = str(_resolve_input_path(args.results_dir))
+            req.update(
+                {
+                    "use_cache": not args.no_cache,
+                    "sbom_format": args.sbom_format,
+                    "advisory_db": str(_resolve_input_path(args.advisory_db)) if args.advisory_db else None,
+                }
+            )
+    elif args.action == "result":
+        if not args.target:
+            raise SystemExit("client result 需要任务 id")
+        req["id"] = args.target
+    try:
+        with ScanClient(
+            socket_path=_resolve_input_path(args.socket) if args.socket else None, host=args.host, port=args.port
+        ) as c:
+            resp = c.request(req)
+    except OSError as e:
+        raise SystemExit(f"无法连接 sca serve: {e}")
+    print(json.dumps(resp, ensure_ascii=False, indent=2))
+    job = resp.get("job")
+    if not resp.get("ok") or (isinstance(job, dict) and job.get("status") == "error"):
+        return 1
+    return 0
+
+
+def _normalize_argv(argv: list[str]) -> list[str]:
     # 兼容：允许 `unified_sca <path>`（自动等价于 `unified_sca detect <path>`）
     # 规则：第一个参数不是已知子命令，且不是以 '-' 开头的选项时，自动前置 'detect'
     if len(argv) >= 1:
-        if argv[0] not in {"detect", "scan", "shell"} and (not argv[0].startswith("-")):
-            argv = ["detect", *argv]
+        if argv[0] not in {"detect", "scan", "shell", "cache", "vulndb", "serve", "client"} and (not argv[0].startswith("-")):
+            return ["detect", *argv]
+    return list(argv)
+
+
+# -X importtime 输出行："import time: <self us> | <cumulative us> | <两空格一级缩进><模块>"
+_IMPORT_TIME = re.compile(r"import time:\s*(\d+)\s*\|\s*(\d+)\s*\| ( *)(\S+)")
+
+
+def _profile_startup(argv: list[str], *, top: int = 15) -> int:
+    """Run ``argv`` in a child interpreter under ``-X importtime`` and summarize its imports.
+
+    The child's stdout and exit code pass through; the report goes to stderr.
+    Listed are the slowest imports made at top level (by the entry point, or
+    lazily by a subcommand) and their direct imports, by cumulative time.
+    """
+    import os
+    import subprocess
+
+    env = dict(os.environ)
+    pkg_root = str(Path(__file__).resolve().parents[1])
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (pkg_root, env.get("PYTHONPATH")) if p)
+    code = "import sys; from unified_sca.cli import main; raise SystemExit(main(sys.argv[1:]))"
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code, *argv], env=env, stderr=subprocess.PIPE, text=True
+    )
+    wall = time.perf_counter() - started
+
+    modules = 0
+    total_us = 0
+    rows: list[tuple[int, str]] = []
+    for line in proc.stderr.splitlines():
+        m = _IMPORT_TIME.match(line)
+        if m is None:
+            if not line.startswith("import time:"):
+                sys.stderr.write(line + "\n")
+            continue
+        modules += 1
+        depth = len(m.group(3)) // 2
+        cumulative = int(m.group(2))
+        if depth == 0:
+            total_us += cumulative
+        if depth <= 1:
+            rows.append((cumulative, "  " * depth + m.group(4)))
+    rows.sort(key=lambda r: -r[0])
+    err = sys.stderr
+    err.write(f"startup: {wall * 1000:.1f} ms wall, {total_us / 1000:.1f} ms in imports ({modules} modules)\n")
+    for cumulative, name in rows[:top]:
+        err.write(f"  {cumulative / 1000:8.1f} ms  {name}\n")
+    return proc.returncode
+
+
+def main(argv: list[str] | None = None) -> int:
+    if argv is None:
+        argv = sys.argv[1:]
+    # 只认子命令之前的 --profile-startup，其后同名参数（如扫描路径）原样交给子命令
+    lead = 0
+    while lead < len(argv) and argv[lead].startswith("-") and argv[lead] != "--":
+        lead += 1
+    if "--profile-startup" in argv[:lead]:
+        return _profile_startup([a for a in argv[:lead] if a != "--profile-startup"] + list(argv[lead:]))
+    argv = _normalize_argv(list(argv))
 
     parser = build_parser()
     args = parser.parse_args(argv)
-
+    trace = getattr(args, "trace", None)
+    if not trace:
+        return _run(parser, args)
+    if args.cmd == "scan" and (args.first_level or args.incremental):
+        # 批量扫描在子进程中进行、增量扫描常驻，都不适合单条 trace
+        raise SystemExit("--trace 不能与 --first-level / --incremental 同时使用")
+    trace_path = _resolve_input_path(trace)
+    with tracing.tracing() as tracer:
+        with tracing.span("main", cmd=args.cmd):
+            rc = _run(parser, args)
+    tracer.write_chrome_trace(trace_path)
+    print(f"trace: {trace_path}", file=sys.stderr)
+    return rc
+
+
+def _run(parser: argparse.ArgumentParser, args: argparse.Namespace) -> int:
     if args.cmd == "detect":
         in_path = _resolve_input_path(args.path)
         work_base = _resolve_input_path(args.work_base)
+        prune_dirs = [x.strip() for x in args.prune.split(",") if x.strip()] if args.prune is not None else None
+        extract = _extract_filters(args)
+        if args.projects:
+            if not (in_path.is_dir() or is_archive_path(in_path)):
+                raise SystemExit(f"输入路径必须是目录或压缩包: {in_path}")
+            with open_project_fs(in_path) as fs, find_nested_archives(fs, prune_dirs=prune_dirs) as nested:
+                _print_projects(fs, discover_projects(fs, prune_dirs=prune_dirs), nested=nested)
+            return 0
         if bool(args.first_level):
             if not in_path.is_dir():
                 raise SystemExit("--first-level 只能用于目录路径")
-            dets = detect_first_level(in_path, keep_workdir=bool(args.keep_workdir), work_base=work_base)
+            dets = detect_first_level(
+                in_path, keep_workdir=bool(args.keep_workdir), work_base=work_base, prune_dirs=prune_dirs
+            )
             _print_detection_list(dets)
         else:
             # 智能模式：若输入是“容器目录”（本层没有表征文件），则自动按第一层汇总
-            if in_path.is_dir() and (not _dir_has_manifest_markers(in_path)):
-                dets = detect_first_level(in_path, keep_workdir=bool(args.keep_workdir), work_base=work_base)
+            if in_path.is_dir() and (not dir_has_markers(in_path)):
+                dets = detect_first_level(
+                    in_path, keep_workdir=bool(args.keep_workdir), work_base=work_base, prune_dirs=prune_dirs
+                )
                 _print_detection_list(dets)
             else:
-                det = detect_one(in_path, keep_workdir=bool(args.keep_workdir), work_base=work_base)
+                det = detect_one(
+                    in_path, keep_workdir=bool(args.keep_workdir), work_base=work_base, prune_dirs=prune_dirs, **extract
+                )
                 _print_detection(det)
         return 0
 
@@ -213,21 +871,116 @@ def main(argv: list[str] | None = None) -> int:
 
         return int(run_shell())
 
+    if args.cmd == "serve":
+        from .server import run_server
+
+        return run_server(
+            socket_path=_resolve_input_path(args.socket) if args.socket else None,
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            results_root=_resolve_input_path(args.results_dir),
+        )
+
+    if args.cmd == "client":
+        return _run_client(args)
+
     if args.cmd == "scan":
         in_path = _resolve_input_path(args.path)
         results_dir = _resolve_input_path(args.results_dir)
         results_dir.mkdir(parents=True, exist_ok=True)
+        advisory_db = _resolve_input_path(args.advisory_db) if args.advisory_db else None
+
+        if args.watch and not args.incremental:
+            raise SystemExit("--watch 需要与 --incremental 一起使用")
+        if args.incremental:
+            if args.first_level:
+                raise SystemExit("--incremental 不能与 --first-level 同时使用")
+            if args.profile:
+                raise SystemExit("--profile 不能与 --incremental 同时使用")
+            if not in_path.is_dir():
+                raise SystemExit("--incremental 只能用于目录路径")
+            return _run_incremental(args, in_path, results_dir, advisory_db)
 
-        det = detect_one(in_path, keep_workdir=False, work_base=_work_base_default())
-        detected = det.detected_types[0] if det.detected_types else "unknown"
-        if detected == "unknown":
-            raise SystemExit(f"暂未接入该类型的分析：识别结果={det.detected_types}")
+        if bool(args.first_level):
+            if not in_path.is_dir():
+                raise SystemExit("--first-level 只能用于目录路径")
+            # 延迟导入避免循环依赖
+            from .batch import scan_first_level
+
+            summary = scan_first_level(
+                in_path,
+                results_dir,
+                jobs=args.jobs,
+                use_cache=not args.no_cache,
+                sbom_format=args.sbom_format,
+                advisory_db=advisory_db,
+                nested=_nested_limits(args),
+                profile=args.profile,
+                profile_top=args.profile_top,
+            )
+            print(f"index: {summary.index_path}")
+            return 0 if summary.failed == 0 else 1
 
-        res = scan_by_type(detected_type=detected, input_path=in_path, results_dir=results_dir)
-        print(f"OK: {detected} 分析结果已输出到: {res.output_dir}")
-        print(f"- sbom: {res.sbom_path}")
-        print(f"- vuln_report: {res.vuln_report_path}")
-        print(f"- details: {res.scan_details_path}")
+        try:
+            outcome = scan_one(
+                in_path,
+                results_dir,
+                use_cache=not args.no_cache,
+                sbom_format=args.sbom_format,
+                advisory_db=advisory_db,
+                projects=args.projects,
+                jobs=args.jobs,
+                nested=_nested_limits(args),
+                profile=args.profile,
+                profile_top=args.profile_top,
+            )
+        except UnsupportedProjectError as e:
+            raise SystemExit(str(e))
+        _print_scan_outcome(outcome)
+        return 0
+
+    if args.cmd == "cache":
+        from sca_tools.cache import SbomCache, default_cache_dir
+
+        sbom_cache = SbomCache(default_cache_dir(_resolve_input_path(args.results_dir)))
+        if args.action == "stats":
+            st = sbom_cache.stats()
+            print(f"cacheDir: {st.root}")
+            print(f"entries: {st.entries}")
+            print(f"size: {st.total_bytes / (1024 * 1024):.2f} MB")
+        elif args.action == "prune":
+            max_bytes = args.max_size_mb * 1024 * 1024 if args.max_size_mb is not None else None
+            removed = sbom_cache.prune(max_bytes=max_bytes, max_entries=args.max_entries)
+            print(f"pruned: {removed}")
+        else:
+            print(f"cleared: {sbom_cache.clear()}")
+        return 0
+
+    if args.cmd == "vulndb":
+        from sca_tools.vulndb import VulnIndex, build_index, default_index_path, refresh_source_indexes
+
+        results_dir = _resolve_input_path(args.results_dir)
+        index_path = _resolve_input_path(args.out) if args.out else default_index_path(results_dir)
+        if args.action == "refresh":
+            for r in refresh_source_indexes(results_dir):
+                print(f"{r.status}: {r.source} -> {r.index_path}")
+            return 0
+        if args.action == "build":
+            if not args.sources:
+                raise SystemExit("vulndb build 需要至少一个漏洞源（目录/zip/json）")
+            st = build_index([_resolve_input_path(s) for s in args.sources], index_path)
+            print(f"index: {st.index_path}")
+            print(f"advisories: {st.advisories}")
+            print(f"packages: {st.packages}")
+            print(f"size: {st.size_bytes / (1024 * 1024):.2f} MB")
+        else:
+            if not index_path.is_file():
+                raise SystemExit(f"索引不存在: {index_path}（先执行 sca vulndb build <source>）")
+            with VulnIndex(index_path) as idx:
+                print(f"index: {idx.path}")
+                for k, v in idx.meta.items():
+                    print(f"{k}: {v}")
         return 0
 
     parser.print_help()
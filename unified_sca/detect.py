@@ -3,7 +3,12 @@ from __future__ import annotations
 from dataclasses import dataclass
 import os
 from pathlib import Path
-from typing import Iterable
+from typing import TYPE_CHECKING, Iterable, Iterator
+
+from sca_tools.registry import analyzer_specs
+
+if TYPE_CHECKING:
+    from .vfs import ProjectFS
 
 
 @dataclass(frozen=True)
@@ -13,140 +18,216 @@ class Detection:
     evidence: dict[str, list[str]]
 
 
-def _has_any(root: Path, rel_paths: Iterable[str]) -> list[str]:
-    hits: list[str] = []
-    for rel in rel_paths:
-        if (root / rel).exists():
-            hits.append(rel)
-    return hits
-
-
-def _walk_dirs_limited(root: Path, max_depth: int) -> Iterable[Path]:
-    root = root.resolve()
-    for dirpath, dirnames, _filenames in os.walk(root):
-        cur = Path(dirpath)
-        depth = len(cur.relative_to(root).parts)
-        if depth > max_depth:
-            dirnames[:] = []
-            continue
-        yield cur
-
-
-def detect_project_types(project_root: Path) -> Detection:
+# 生态 -> 表征文件（按强弱排序），来自分析器注册表（内置 + 插件）
+_CANDIDATES: dict[str, tuple[str, ...]] = {key: spec.markers for key, spec in analyzer_specs().items()}
+
+
+# marker 文件名 -> (生态, 在该生态候选列表中的序号)，一次哈希查找完成匹配
+_MARKER_INDEX: dict[str, tuple[str, int]] = {
+    name: (key, i) for key, cands in _CANDIDATES.items() for i, name in enumerate(cands)
+}
+
+# 下钻时跳过的重型/第三方目录（可通过 prune_dirs 参数覆盖）
+DEFAULT_PRUNE_DIRS: frozenset[str] = frozenset(
+    {
+        ".git",
+        ".hg",
+        ".svn",
+        "__MACOSX",
+        "node_modules",
+        "bower_components",
+        "target",
+        ".venv",
+        "venv",
+        "__pycache__",
+        ".tox",
+        ".nox",
+        ".mypy_cache",
+        ".pytest_cache",
+        ".gradle",
+        ".idea",
+        "vendor",
+    }
+)
+# 查找内嵌压缩包时跳过的目录：vendor/ 下正是 vendored 压缩包所在位置，不能跳过
+NESTED_PRUNE_DIRS: frozenset[str] = DEFAULT_PRUNE_DIRS - {"vendor"}
+
+_MAX_DEPTH = 4
+# 全量发现子项目（monorepo 增量扫描）时的下钻深度
+_DISCOVERY_MAX_DEPTH = 8
+
+
+def _evidence_in(present: Iterable[str]) -> dict[str, list[str]]:
+    found: dict[str, list[tuple[int, str]]] = {}
+    for name in present:
+        hit = _MARKER_INDEX.get(name)
+        if hit is not None:
+            found.setdefault(hit[0], []).append((hit[1], name))
+    # 生态顺序与各生态内的命中顺序均与候选列表保持一致
+    return {key: [n for _i, n in sorted(found[key])] for key in _CANDIDATES if key in found}
+
+
+def analyzer_inputs(evidence: dict[str, list[str]]) -> list[str]:
+    """Marker hits of ``evidence`` plus every other file its analyzers read (``AnalyzerSpec.inputs``)."""
+    specs = analyzer_specs()
+    names: dict[str, None] = {}
+    for key, hits in evidence.items():
+        names.update(dict.fromkeys(hits))
+        spec = specs.get(key)
+        if spec is not None:
+            names.update(dict.fromkeys(spec.inputs))
+    return list(names)
+
+
+def _scan_dir(d: str, prune: frozenset[str]) -> tuple[list[str], list[str]]:
+    """One ``os.scandir`` per directory: (entry names, sub-directories to descend)."""
+    names: list[str] = []
+    subdirs: list[str] = []
+    try:
+        with os.scandir(d) as it:
+            for entry in it:
+                names.append(entry.name)
+                if entry.name in prune:
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    subdirs.sort()
+    return names, subdirs
+
+
+def dir_has_markers(d: Path) -> bool:
+    """仅检查该目录本层是否存在明显表征文件（不下钻）。"""
+    try:
+        with os.scandir(d) as it:
+            return any(entry.name in _MARKER_INDEX for entry in it)
+    except OSError:
+        return False
+
+
+def iter_project_dirs(
+    root: Path, *, prune_dirs: Iterable[str] | None = None, max_depth: int = _DISCOVERY_MAX_DEPTH
+) -> Iterator[tuple[Path, dict[str, list[str]]]]:
+    """Every directory under ``root`` (root included) that has markers, breadth-first."""
+    prune = DEFAULT_PRUNE_DIRS if prune_dirs is None else frozenset(prune_dirs)
+    level = [str(root.resolve())]
+    depth = 0
+    while level and depth <= max_depth:
+        next_level: list[str] = []
+        for d in level:
+            names, children = _scan_dir(d, prune)
+            next_level.extend(children)
+            ev = _evidence_in(names)
+            if ev:
+                yield Path(d), ev
+        level = next_level
+        depth += 1
+
+
+def detect_project_types(project_root: Path, *, prune_dirs: Iterable[str] | None = None) -> Detection:
     """Detect project types by common manifest/lock files.
 
-    Returns potentially multiple types (e.g., mixed repos).
+    Returns potentially multiple types (e.g., mixed repos). The root is read
+    with a single ``os.scandir``; if it has no markers, directories down to
+    depth 4 are visited breadth-first (one scandir each, skipping
+    ``prune_dirs``) and the best-scoring one wins, shallower on ties.
     """
     root = project_root.resolve()
     if not root.exists():
         raise FileNotFoundError(f"路径不存在: {root}")
     if not root.is_dir():
         raise NotADirectoryError(f"不是目录: {root}")
+    prune = DEFAULT_PRUNE_DIRS if prune_dirs is None else frozenset(prune_dirs)
 
-    evidence: dict[str, list[str]] = {}
-
-    py_candidates = [
-        "pyproject.toml",
-        "requirements.txt",
-        "Pipfile",
-        "setup.py",
-        "setup.cfg",
-        "poetry.lock",
-        "uv.lock",
-    ]
-    java_candidates = [
-        "pom.xml",
-        "build.gradle",
-        "build.gradle.kts",
-        "settings.gradle",
-        "settings.gradle.kts",
-        "gradlew",
-    ]
-    rust_candidates = ["Cargo.toml", "Cargo.lock"]
-    js_candidates = [
-        "package.json",
-        "package-lock.json",
-        "yarn.lock",
-        "pnpm-lock.yaml",
-        "bun.lockb",
-    ]
-    go_candidates = ["go.mod", "go.sum"]
-
-    py_hits = _has_any(
-        root,
-        py_candidates,
-    )
-    if py_hits:
-        evidence["python"] = py_hits
-
-    java_hits = _has_any(
-        root,
-        java_candidates,
-    )
-    if java_hits:
-        evidence["java"] = java_hits
-
-    rust_hits = _has_any(root, rust_candidates)
-    if rust_hits:
-        evidence["rust"] = rust_hits
-
-    js_hits = _has_any(
-        root,
-        js_candidates,
-    )
-    if js_hits:
-        evidence["javascript"] = js_hits
-
-    go_hits = _has_any(root, go_candidates)
-    if go_hits:
-        evidence["go"] = go_hits
+    names, subdirs = _scan_dir(str(root), prune)
+    evidence = _evidence_in(names)
+    if evidence:
+        return Detection(project_root=root, detected_types=tuple(sorted(evidence)), evidence=evidence)
 
     # 如果根目录没命中，尝试向下寻找更像“项目根”的目录（常见：zip里包了一层）
-    if not evidence:
-        best_root: Path | None = None
-        best_score = 0
-        best_evidence: dict[str, list[str]] = {}
-
-        for d in _walk_dirs_limited(root, max_depth=4):
-            ev: dict[str, list[str]] = {}
-            hits = _has_any(d, py_candidates)
-            if hits:
-                ev["python"] = hits
-            hits = _has_any(d, java_candidates)
-            if hits:
-                ev["java"] = hits
-            hits = _has_any(d, rust_candidates)
-            if hits:
-                ev["rust"] = hits
-            hits = _has_any(d, js_candidates)
-            if hits:
-                ev["javascript"] = hits
-            hits = _has_any(d, go_candidates)
-            if hits:
-                ev["go"] = hits
-
+    best_root: str | None = None
+    best_score = 0
+    best_evidence: dict[str, list[str]] = {}
+    level = subdirs
+    depth = 1
+    while level and depth <= _MAX_DEPTH:
+        next_level: list[str] = []
+        for d in level:
+            names, children = _scan_dir(d, prune)
+            next_level.extend(children)
+            ev = _evidence_in(names)
             if not ev:
                 continue
-
             score = sum(len(v) for v in ev.values())
+            # 广度优先：同分时先访问到的目录更浅，无需额外比较深度
             if score > best_score:
                 best_root = d
                 best_score = score
                 best_evidence = ev
-            elif score == best_score and best_root is not None:
-                # tie-break: prefer shallower path
-                if len(d.relative_to(root).parts) < len(best_root.relative_to(root).parts):
-                    best_root = d
-                    best_evidence = ev
+        level = next_level
+        depth += 1
 
-        if best_root is None:
-            return Detection(project_root=root, detected_types=("unknown",), evidence={})
+    if best_root is None:
+        return Detection(project_root=root, detected_types=("unknown",), evidence={})
+    return Detection(
+        project_root=Path(best_root), detected_types=tuple(sorted(best_evidence)), evidence=best_evidence
+    )
 
-        detected = tuple(sorted(best_evidence.keys()))
-        return Detection(project_root=best_root.resolve(), detected_types=detected, evidence=best_evidence)
 
-    detected = tuple(sorted(evidence.keys()))
+def detect_archive_types(fs: "ProjectFS", *, prune_dirs: Iterable[str] | None = None) -> Detection:
+    """Same rules as detect_project_types, evaluated on an archive's member index.
 
-    return Detection(project_root=root, detected_types=detected, evidence=evidence)
+    Nothing is extracted: the member names are grouped by directory once and
+    scored in memory. ``project_root`` is reported as ``<archive>/<dir>``.
+    """
+    prune = DEFAULT_PRUNE_DIRS if prune_dirs is None else frozenset(prune_dirs)
+    root = fs.root
+    prefix = f"{root}/" if root else ""
+    files_by_dir: dict[str, set[str]] = {}
+    for rel in fs.iter_files():
+        d, _sep, fn = rel.rpartition("/")
+        if d != root:
+            # 只看根目录之下的成员，并跳过被裁剪的目录
+            if not d.startswith(prefix) or not prune.isdisjoint(d[len(prefix):].split("/")):
+                continue
+        files_by_dir.setdefault(d, set()).add(fn)
+
+    evidence = _evidence_in(files_by_dir.get(root, set()))
+    if evidence:
+        return Detection(project_root=fs.display_path(root), detected_types=tuple(sorted(evidence)), evidence=evidence)
+
+    best_rel: str | None = None
+    best_score = 0
+    best_evidence: dict[str, list[str]] = {}
+    # shallower first, so ties keep the shallower directory
+    for d in sorted(files_by_dir, key=lambda x: (x.count("/"), x)):
+        depth = len(d[len(prefix):].split("/")) if d != root else 0
+        if depth > _MAX_DEPTH:
+            continue
+        ev = _evidence_in(files_by_dir[d])
+        if not ev:
+            continue
+        score = sum(len(v) for v in ev.values())
+        if score > best_score:
+            best_rel = d
+            best_score = score
+            best_evidence = ev
+
+    if best_rel is None:
+        return Detection(project_root=fs.display_path(root), detected_types=("unknown",), evidence={})
+    return Detection(
+        project_root=fs.display_path(best_rel),
+        detected_types=tuple(sorted(best_evidence)),
+        evidence=best_evidence,
+    )
 
 
+def detect_fs(fs: "ProjectFS", *, prune_dirs: Iterable[str] | None = None) -> Detection:
+    """Detect on an opened project view (directory or archive)."""
+    if fs.is_archive:
+        return detect_archive_types(fs, prune_dirs=prune_dirs)
+    return detect_project_types(fs.location, prune_dirs=prune_dirs)
@@ -0,0 +1,320 @@
+"""Incremental scanning for monorepos (``sca scan --incremental``).
+
+Every project root found by ``workspace.discover_projects`` is a sub-project. A state file records
+path, size, mtime and SHA-256 of each file their analyzers read (markers and
+``AnalyzerSpec.inputs``); on the next run only
+sub-projects whose inputs changed (or appeared) are re-parsed, everything
+else is taken from the per-project SBOMs kept next to the state, and the
+aggregate SBOM is re-assembled from those parts. Layout::
+
+    <results>/incremental/<project>-<hash>/
+        state.json
+        projects/<key>.json        # last SBOM of each sub-project
+        sbom.json                  # aggregate (fixed path, replaced atomically)
+        vuln_report.json
+        scan_details.json
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable
+
+from sca_tools.base import ScanArtifacts
+from sca_tools.cache import sha256_stream
+from sca_tools.merge import merge_cyclonedx
+from sca_tools.utils import SBOM_FORMATS, read_json, sbom_file_name, slug, utc_now_iso, write_json
+from sca_tools.vulndb import build_vuln_report
+
+from .detect import Detection, analyzer_inputs
+from .session import ScanSession
+from .vfs import DirFS
+from .workspace import discover_projects
+
+STATE_FORMAT = 1
+_TOOL = "sca-incremental"
+
+
+@dataclass(frozen=True)
+class IncrementalResult:
+    artifacts: ScanArtifacts
+    state_path: Path
+    changed: tuple[str, ...]
+    unchanged: tuple[str, ...]
+    removed: tuple[str, ...]
+    errors: dict[str, str]
+    components: int
+    elapsed_seconds: float
+
+
+def incremental_dir(results_dir: Path, root: Path) -> Path:
+    digest = hashlib.sha1(str(root).encode("utf-8")).hexdigest()[:8]
+    return results_dir / "incremental" / f"{slug(root.name)}-{digest}"
+
+
+def discover_subprojects(
+    root: Path, *, prune_dirs: Iterable[str] | None = None
+) -> dict[str, tuple[tuple[str, ...], dict[str, list[str]]]]:
+    """rel dir ("" = root) -> (scannable types, evidence limited to those types).
+
+    Workspace members are covered by their root's lock and not listed; the
+    pom.xml of Maven modules is part of their root's inputs (there is no lock).
+    """
+    with DirFS(root) as fs:
+        roots = discover_projects(fs, prune_dirs=prune_dirs)
+    out: dict[str, tuple[tuple[str, ...], dict[str, list[str]]]] = {}
+    for r in roots:
+        if not r.scan_types:
+            continue
+        evidence = {t: list(r.evidence[t]) for t in r.scan_types}
+        if "maven" in r.workspaces and "java" in evidence:
+            prefix = f"{r.rel}/" if r.rel else ""
+            evidence["java"] += [f"{m[len(prefix):]}/pom.xml" for m in r.members]
+        out[r.rel] = (r.scan_types, evidence)
+    return out
+
+
+def _fingerprint(path: Path, prev: dict[str, Any] | None) -> dict[str, Any]:
+    st = path.stat()
+    if prev is not None and prev.get("size") == st.st_size and prev.get("mtime_ns") == st.st_mtime_ns:
+        return prev
+    with open(path, "rb") as fp:
+        digest = sha256_stream(fp)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+
+
+def _same_inputs(a: dict[str, dict[str, Any]], b: dict[str, dict[str, Any]]) -> bool:
+    return a.keys() == b.keys() and all(a[k]["sha256"] == b[k]["sha256"] for k in a)
+
+
+def _write_atomic(path: Path, payload: Any, *, fmt: str = "json") -> None:
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        write_json(tmp, payload, fmt=fmt)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def _load_state(state_path: Path, root: Path) -> dict[str, Any]:
+    try:
+        state = read_json(state_path)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(state, dict) or state.get("format") != STATE_FORMAT or state.get("root") != str(root):
+        return {}
+    return state
+
+
+def _scan_subproject(
+    session: ScanSession,
+    root: Path,
+    rel: str,
+    types: tuple[str, ...],
+    evidence: dict[str, list[str]],
+    *,
+    results_dir: Path,
+    staging: Path,
+    sbom_path: Path,
+    use_cache: bool,
+) -> dict[str, str]:
+    """Re-parse one sub-project into ``sbom_path``; returns per-type errors."""
+    from .cli import scan_with_state
+
+    project_dir = root / rel if rel else root
+    det = Detection(project_root=project_dir, detected_types=types, evidence=evidence)
+    # 分析器仍按统一流程输出到临时目录，只保留 SBOM，避免每次增量都堆积时间戳目录
+    work = staging / uuid.uuid4().hex
+    try:
+        outcome = scan_with_state(
+            project_dir,
+            work,
+            cache=session.cache(results_dir) if use_cache else None,
+            sbom_format="json-compact",
+            vulndb=None,
+            detection=det,
+            # 增量状态只跟踪 lock/清单，内嵌压缩包不参与
+            nested=None,
+        )
+        sbom_path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(outcome.artifacts.sbom_path, sbom_path)
+        return dict(outcome.errors)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+def run_incremental(
+    root: Path,
+    results_dir: Path,
+    *,
+    sbom_format: str = "json",
+    use_cache: bool = True,
+    advisory_db: Path | None = None,
+    prune_dirs: Iterable[str] | None = None,
+    session: ScanSession | None = None,
+    jobs: int | None = None,
+) -> IncrementalResult:
+    started = time.perf_counter()
+    root = root.resolve()
+    results_dir = results_dir.resolve()
+    if not root.is_dir():
+        raise NotADirectoryError(f"--incremental 只能用于目录: {root}")
+    own_session = session is None
+    session = session or ScanSession()
+    try:
+        return _run(root, results_dir, session, sbom_format, use_cache, advisory_db, prune_dirs, jobs, started)
+    finally:
+        if own_session:
+            session.close()
+
+
+def _run(
+    root: Path,
+    results_dir: Path,
+    session: ScanSession,
+    sbom_format: str,
+    use_cache: bool,
+    advisory_db: Path | None,
+    prune_dirs: Iterable[str] | None,
+    jobs: int | None,
+    started: float,
+) -> IncrementalResult:
+    out_dir = incremental_dir(results_dir, root)
+    state_path = out_dir / "state.json"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    prev_projects: dict[str, Any] = _load_state(state_path, root).get("projects", {})
+
+    discovered = discover_subprojects(root, prune_dirs=prune_dirs)
+    projects: dict[str, dict[str, Any]] = {}
+    to_scan: list[str] = []
+    unchanged: list[str] = []
+    for rel, (types, evidence) in sorted(discovered.items()):
+        prev = prev_projects.get(rel) or {}
+        prev_inputs = prev.get("inputs") or {}
+        project_dir = root / rel if rel else root
+        inputs: dict[str, dict[str, Any]] = {}
+        # 不只是表征文件：分析器优先读取的 requirements.lock 等也要跟踪（不存在的跳过，新出现时即视为变化）
+        for name in analyzer_inputs(evidence):
+            file_rel = f"{rel}/{name}" if rel else name
+            try:
+                inputs[file_rel] = _fingerprint(project_dir / name, prev_inputs.get(file_rel))
+            except OSError:
+                continue
+        key = hashlib.sha1(rel.encode("utf-8")).hexdigest()[:16]
+        entry = {"types": list(types), "inputs": inputs, "sbom": f"projects/{key}.json"}
+        reusable = (
+            prev.get("types") == list(types)
+            and _same_inputs(prev_inputs, inputs)
+            and (prev.get("error") is not None or (out_dir / entry["sbom"]).is_file())
+        )
+        if reusable:
+            for k in ("error", "typeErrors"):
+                if k in prev:
+                    entry[k] = prev[k]
+            unchanged.append(rel)
+        else:
+            to_scan.append(rel)
+        projects[rel] = entry
+
+    staging = out_dir / ".staging"
+
+    def _one(rel: str) -> tuple[str, dict[str, str] | None, str | None]:
+        types, evidence = discovered[rel]
+        try:
+            errs = _scan_subproject(
+                session,
+                root,
+                rel,
+                types,
+                evidence,
+                results_dir=results_dir,
+                staging=staging,
+                sbom_path=out_dir / projects[rel]["sbom"],
+                use_cache=use_cache,
+            )
+            return rel, errs, None
+        except Exception as e:
+            return rel, None, f"{type(e).__name__}: {e}"
+
+    workers = max(1, min(jobs or os.cpu_count() or 1, len(to_scan) or 1, 8))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for rel, type_errors, error in pool.map(_one, to_scan):
+            if error is not None:
+                projects[rel]["error"] = error
+                (out_dir / projects[rel]["sbom"]).unlink(missing_ok=True)
+            elif type_errors:
+                projects[rel]["typeErrors"] = type_errors
+    shutil.rmtree(staging, ignore_errors=True)
+
+    removed = sorted(set(prev_projects) - set(projects))
+    for rel in removed:
+        old = prev_projects[rel].get("sbom")
+        if old:
+            (out_dir / old).unlink(missing_ok=True)
+
+    # 用各子项目最近一次的 SBOM 重新拼装聚合结果（未变化的子项目不再解析 lock）
+    parts = []
+    errors: dict[str, str] = {}
+    for rel, entry in projects.items():
+        if "error" in entry:
+            errors[rel or "."] = entry["error"]
+            continue
+        for t, msg in (entry.get("typeErrors") or {}).items():
+            errors[f"{rel or '.'}:{t}"] = msg
+        try:
+            parts.append(read_json(out_dir / entry["sbom"]))
+        except (OSError, ValueError) as e:
+            errors[rel or "."] = f"{type(e).__name__}: {e}"
+    aggregate = merge_cyclonedx(parts, root.name)
+
+    sbom_path = out_dir / sbom_file_name(sbom_format)
+    for fmt in SBOM_FORMATS:
+        other = out_dir / sbom_file_name(fmt)
+        if other != sbom_path:
+            other.unlink(missing_ok=True)
+    _write_atomic(sbom_path, aggregate, fmt=sbom_format)
+    vuln_report_path = out_dir / "vuln_report.json"
+    _write_atomic(
+        vuln_report_path,
+        build_vuln_report(aggregate, tool=_TOOL, index=session.vulndb(results_dir, advisory_db)),
+    )
+    elapsed = round(time.perf_counter() - started, 3)
+    details_path = out_dir / "scan_details.json"
+    _write_atomic(
+        details_path,
+        {
+            "inputPath": str(root),
+            "incremental": True,
+            "updatedAt": utc_now_iso(),
+            "subprojects": {rel or ".": entry["types"] for rel, entry in projects.items()},
+            "rescanned": [r or "." for r in to_scan],
+            "reused": [r or "." for r in unchanged],
+            "removed": [r or "." for r in removed],
+            "errors": errors,
+            "components": len(aggregate["components"]),
+            "elapsedSeconds": elapsed,
+        },
+    )
+    _write_atomic(
+        state_path,
+        {"format": STATE_FORMAT, "root": str(root), "updatedAt": utc_now_iso(), "projects": projects},
+        fmt="json-compact",
+    )
+    return IncrementalResult(
+        artifacts=ScanArtifacts(out_dir, sbom_path, vuln_report_path, details_path),
+        state_path=state_path,
+        changed=tuple(to_scan),
+        unchanged=tuple(unchanged),
+        removed=tuple(removed),
+        errors=errors,
+        components=len(aggregate["components"]),
+        elapsed_seconds=elapsed,
+    )
@@ -0,0 +1,158 @@
+"""Archives inside the input (``vendor/*.zip``, vendored release tarballs).
+
+Each nested archive is read into memory and wrapped in the same ``ZipFS`` /
+``TarFS`` views as a top-level input, recursively up to ``max_depth``; nothing
+is written to disk. ``max_total_bytes`` / ``max_members`` bound everything
+opened below the input (archive bytes plus manifests/locks for zips, the whole
+decompressed stream for tarballs), so a zip bomb is cut off instead of
+exhausting memory. An archive over a limit, corrupt or unsafe is skipped and
+reported; the scan of everything else goes on.
+"""
+
+from __future__ import annotations
+
+import os
+import posixpath
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Iterable, Iterator
+
+from .detect import _DISCOVERY_MAX_DEPTH, NESTED_PRUNE_DIRS, _scan_dir
+from .vfs import TAR_KEEP_NAMES, ArchiveFS, TarFS, is_archive_name, open_archive_bytes
+from .zip_utils import ArchiveLimitError
+
+if TYPE_CHECKING:
+    from .vfs import ProjectFS
+
+# 内嵌路径分隔符：vendor/lib.zip!/pkg 表示 lib.zip 内的 pkg 目录
+NESTED_SEP = "!/"
+
+
+@dataclass(frozen=True)
+class NestedLimits:
+    # 输入本身为第 0 层；0 表示不打开内嵌压缩包
+    max_depth: int = 2
+    max_total_bytes: int = 256 * 1024 * 1024
+    max_members: int = 100_000
+
+
+DEFAULT_NESTED_LIMITS = NestedLimits()
+
+
+@dataclass(frozen=True)
+class NestedArchive:
+    """One archive opened in memory; ``member`` is its path inside the containing view."""
+
+    label: str
+    member: str
+    depth: int
+    fs: ArchiveFS
+    # 所在的上一层内嵌压缩包（None 表示直接位于输入中）
+    parent: str | None = None
+
+
+@dataclass
+class NestedScan:
+    archives: list[NestedArchive] = field(default_factory=list)
+    # label -> 跳过原因
+    skipped: dict[str, str] = field(default_factory=dict)
+    total_bytes: int = 0
+    members: int = 0
+
+    def close(self) -> None:
+        for a in self.archives:
+            a.fs.close()
+
+    def __enter__(self) -> "NestedScan":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+def nested_label(fs: "ProjectFS", rel: str, parent: str | None) -> str:
+    """``rel`` relative to the view's root, prefixed by the enclosing archive label."""
+    root = fs.root
+    if root and rel.startswith(f"{root}/"):
+        rel = rel[len(root) + 1 :]
+    return f"{parent}{NESTED_SEP}{rel}" if parent else rel
+
+
+def _archive_members(fs: "ProjectFS", prune: frozenset[str]) -> Iterator[str]:
+    """Archive-looking files in ``fs`` outside pruned directories, sorted."""
+    if fs.is_archive:
+        for rel in sorted(fs.iter_files()):
+            d, _sep, fn = rel.rpartition("/")
+            if is_archive_name(fn) and (not d or prune.isdisjoint(d.split("/"))):
+                yield rel
+        return
+    base = str(fs.location)
+    stack = [(base, 0)]
+    hits: list[str] = []
+    while stack:
+        d, depth = stack.pop()
+        names, subdirs = _scan_dir(d, prune)
+        rel_dir = os.path.relpath(d, base).replace(os.sep, "/")
+        for n in names:
+            rel = n if rel_dir == "." else f"{rel_dir}/{n}"
+            if is_archive_name(n) and fs.is_file(rel):
+                hits.append(rel)
+        if depth < _DISCOVERY_MAX_DEPTH:
+            stack.extend((s, depth + 1) for s in subdirs if os.path.basename(s) not in {".git", "__MACOSX"})
+    yield from sorted(hits)
+
+
+def find_nested_archives(
+    fs: "ProjectFS",
+    limits: NestedLimits = DEFAULT_NESTED_LIMITS,
+    *,
+    prune_dirs: Iterable[str] | None = None,
+) -> NestedScan:
+    """Open every archive nested in ``fs`` (breadth-first, parents before children)."""
+    import tarfile
+    import zipfile
+
+    prune = NESTED_PRUNE_DIRS if prune_dirs is None else frozenset(prune_dirs)
+    out = NestedScan()
+    queue: list[tuple["ProjectFS", str | None, int]] = [(fs, None, 1)]
+    try:
+        while queue:
+            cur, parent, depth = queue.pop(0)
+            if depth > limits.max_depth:
+                continue
+            for rel in _archive_members(cur, prune):
+                label = nested_label(cur, rel, parent)
+                try:
+                    size = cur.file_size(rel)
+                    room = limits.max_total_bytes - out.total_bytes
+                    if size > room:
+                        raise ArchiveLimitError(f"内嵌压缩包总大小超过上限 {limits.max_total_bytes} 字节")
+                    data = cur.read_bytes(rel)
+                    nfs = open_archive_bytes(
+                        cur.display_path(rel),
+                        data,
+                        max_members=limits.max_members - out.members,
+                        max_bytes=room - len(data),
+                    )
+                except (ArchiveLimitError, ValueError, OSError, EOFError, RuntimeError, zipfile.BadZipFile, tarfile.TarError) as e:
+                    out.skipped[label] = str(e) or type(e).__name__
+                    continue
+                members = list(nfs.iter_files())
+                cost = len(data)
+                if isinstance(nfs, TarFS):
+                    # tar：整个流已解压一遍
+                    cost += sum(nfs.file_size(m) for m in members)
+                else:
+                    # zip：成员按需读取，只计入之后会被读取的清单/lock
+                    cost += sum(nfs.file_size(m) for m in members if posixpath.basename(m) in TAR_KEEP_NAMES)
+                if out.total_bytes + cost > limits.max_total_bytes or out.members + len(members) > limits.max_members:
+                    nfs.close()
+                    out.skipped[label] = "内嵌压缩包总大小或成员数超过上限"
+                    continue
+                out.total_bytes += cost
+                out.members += len(members)
+                out.archives.append(NestedArchive(label=label, member=rel, depth=depth, fs=nfs, parent=parent))
+                queue.append((nfs, label, depth + 1))
+    except BaseException:
+        out.close()
+        raise
+    return out
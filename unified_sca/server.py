@@ -0,0 +1,334 @@
+"""Long-lived scan service (``sca serve``) and its thin client (``sca client``).
+
+The server keeps one interpreter and a ``ScanSession`` (detections, opened
+archives, SBOM cache with an in-memory layer, memory-mapped advisory indexes)
+alive between jobs, so an upload service no longer pays interpreter start-up
+and cold caches per request.
+
+Protocol: one JSON object per line in each direction over a Unix socket or a
+localhost TCP port. Requests carry an ``op``:
+
+- ``detect`` / ``scan``: submit a job (``path``, optional ``results_dir``,
+  ``sbom_format``, ``use_cache``, ``advisory_db``, ``projects``); with ``"wait": true`` the
+  reply is sent once the job has finished. ``results_dir`` must lie under the
+  server's results root (relative paths are taken from it)
+- ``result``: job state by ``id`` (``"wait": true`` blocks until it is done)
+- ``jobs`` / ``ping`` / ``shutdown``
+
+Replies are ``{"ok": true, ...}`` or ``{"ok": false, "error": "..."}``. A
+request line longer than the stream limit gets an error reply and the
+connection is closed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import os
+import signal
+import socket
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from sca_tools.utils import utc_now_iso
+
+from .session import ScanSession
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# 已结束任务最多保留的条数（供 result 查询），超出后按完成顺序淘汰
+MAX_FINISHED_JOBS = 1000
+_LINE_LIMIT = 16 * 1024 * 1024
+
+
+@dataclass
+class _Job:
+    id: str
+    op: str
+    path: str
+    status: str = "queued"
+    submitted_at: str = field(default_factory=utc_now_iso)
+    finished_at: str | None = None
+    elapsed_seconds: float | None = None
+    result: dict[str, Any] | None = None
+    error: str | None = None
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def to_dict(self) -> dict[str, Any]:
+        out: dict[str, Any] = {
+            "id": self.id,
+            "op": self.op,
+            "path": self.path,
+            "status": self.status,
+            "submittedAt": self.submitted_at,
+        }
+        if self.finished_at is not None:
+            out["finishedAt"] = self.finished_at
+            out["elapsedSeconds"] = self.elapsed_seconds
+        if self.result is not None:
+            out["result"] = self.result
+        if self.error is not None:
+            out["error"] = self.error
+        return out
+
+
+def _run_job(session: ScanSession, op: str, req: dict[str, Any]) -> dict[str, Any]:
+    """Executed on the worker pool; reuses the same code paths as the CLI.
+
+    ``results_dir`` has already been checked against the results root by ``ScanServer``.
+    """
+    from .batch import outcome_record
+
+    in_path = Path(req["path"]).expanduser().resolve()
+    if op == "detect":
+        det = session.detect(in_path, prune_dirs=req.get("prune"))
+        return {"projectRoot": str(det.project_root), "detectedTypes": list(det.detected_types), "evidence": det.evidence}
+
+    results_dir = Path(req["results_dir"])
+    results_dir.mkdir(parents=True, exist_ok=True)
+    outcome = session.scan(
+        in_path,
+        results_dir,
+        use_cache=req.get("use_cache", True),
+        sbom_format=req.get("sbom_format") or "json",
+        advisory_db=Path(req["advisory_db"]).expanduser() if req.get("advisory_db") else None,
+        projects=req.get("projects") or "auto",
+    )
+    return outcome_record(outcome)
+
+
+class ScanServer:
+    def __init__(self, *, workers: int | None = None, results_root: Path | None = None) -> None:
+        self.workers = max(1, workers or min(4, os.cpu_count() or 1))
+        # 客户端指定的 results_dir 只能落在该目录之下
+        self.results_root = (results_root or Path.cwd() / "results").expanduser().resolve()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="sca-serve")
+        self._session = ScanSession()
+        self._jobs: OrderedDict[str, _Job] = OrderedDict()
+        self._ids = itertools.count(1)
+        self._started = time.monotonic()
+        self._stop: asyncio.Event | None = None
+        self._tasks: set[asyncio.Task[None]] = set()
+        # 连接处理协程 -> 其 writer，关闭服务时逐个断开
+        self._conns: dict[asyncio.Task[Any], asyncio.StreamWriter] = {}
+
+    def _results_dir(self, raw: Any) -> Path:
+        root = self.results_root
+        if raw is None:
+            return root
+        if not isinstance(raw, str):
+            raise ValueError("results_dir 必须是字符串")
+        # 相对路径相对结果根目录；resolve 后再比较，符号链接与 .. 都无法逃出
+        path = (root / Path(raw).expanduser()).resolve()
+        if path != root and root not in path.parents:
+            raise ValueError(f"results_dir 必须位于服务端结果目录之下: {root}")
+        return path
+
+    def _submit(self, op: str, req: dict[str, Any]) -> _Job:
+        if not isinstance(req.get("path"), str):
+            raise ValueError("缺少 path")
+        if op == "scan":
+            req = {**req, "results_dir": str(self._results_dir(req.get("results_dir")))}
+        job = _Job(id=f"{next(self._ids)}", op=op, path=req["path"])
+        self._jobs[job.id] = job
+        task = asyncio.get_running_loop().create_task(self._execute(job, req))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _execute(self, job: _Job, req: dict[str, Any]) -> None:
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+
+        def _work() -> dict[str, Any]:
+            job.status = "running"
+            return _run_job(self._session, job.op, req)
+
+        try:
+            job.result = await loop.run_in_executor(self._pool, _work)
+            job.status = "done"
+        except Exception as e:
+            job.status = "error"
+            job.error = f"{type(e).__name__}: {e}"
+        job.finished_at = utc_now_iso()
+        job.elapsed_seconds = round(time.perf_counter() - started, 3)
+        job.done.set()
+        self._evict()
+
+    def _evict(self) -> None:
+        finished = [k for k, j in self._jobs.items() if j.done.is_set()]
+        for k in finished[: max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[k]
+
+    async def _dispatch(self, req: dict[str, Any]) -> dict[str, Any]:
+        op = req.get("op")
+        if op in ("detect", "scan"):
+            job = self._submit(op, req)
+            if req.get("wait"):
+                await job.done.wait()
+            return {"ok": True, "job": job.to_dict()}
+        if op == "result":
+            job = self._jobs.get(str(req.get("id")))
+            if job is None:
+                return {"ok": False, "error": f"任务不存在: {req.get('id')}"}
+            if req.get("wait"):
+                await job.done.wait()
+            return {"ok": True, "job": job.to_dict()}
+        if op == "jobs":
+            return {"ok": True, "jobs": [{k: v for k, v in j.to_dict().items() if k != "result"} for j in self._jobs.values()]}
+        if op == "ping":
+            return {
+                "ok": True,
+                "pid": os.getpid(),
+                "workers": self.workers,
+                "uptimeSeconds": round(time.monotonic() - self._started, 1),
+                "jobs": len(self._jobs),
+                "running": sum(1 for j in self._jobs.values() if not j.done.is_set()),
+                "warm": self._session.stats(),
+            }
+        if op == "shutdown":
+            assert self._stop is not None
+            self._stop.set()
+            return {"ok": True}
+        return {"ok": False, "error": f"未知操作: {op}"}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        assert task is not None
+        self._conns[task] = writer
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # 超过 _LINE_LIMIT 仍未读到换行（LimitOverrunError 在 readline 中转为 ValueError）：
+                    # 缓冲区已被丢弃，后续数据无法再按行对齐，回复错误后断开
+                    await self._reply(writer, {"ok": False, "error": f"请求行超过 {_LINE_LIMIT} 字节上限"})
+                    break
+                if not line:
+                    break
+                try:
+                    req = json.loads(line)
+                    if not isinstance(req, dict):
+                        raise ValueError("请求必须是 JSON 对象")
+                    resp = await self._dispatch(req)
+                except Exception as e:
+                    resp = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+                await self._reply(writer, resp)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # 服务关闭时仍在等待任务完成的连接被取消，直接断开即可
+            pass
+        finally:
+            self._conns.pop(task, None)
+            writer.close()
+
+    @staticmethod
+    async def _reply(writer: asyncio.StreamWriter, resp: dict[str, Any]) -> None:
+        writer.write(json.dumps(resp, ensure_ascii=False).encode("utf-8") + b"\n")
+        await writer.drain()
+
+    async def _close_connections(self, *, grace: float = 1.0) -> None:
+        """Close every client connection; handlers blocked in ``readline`` see EOF and return."""
+        for writer in list(self._conns.values()):
+            writer.close()
+        pending = list(self._conns)
+        if not pending:
+            return
+        _done, stuck = await asyncio.wait(pending, timeout=grace)
+        for task in stuck:
+            task.cancel()
+        await asyncio.gather(*stuck, return_exceptions=True)
+
+    async def serve(self, *, socket_path: Path | None = None, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> None:
+        self._stop = asyncio.Event()
+        if socket_path is not None:
+            if socket_path.exists():
+                socket_path.unlink()
+            # 在受限 umask 下创建 socket，文件一出现就只有属主可连接（事后 chmod 存在窗口期）
+            umask = os.umask(0o177)
+            try:
+                server = await asyncio.start_unix_server(self._handle, path=str(socket_path), limit=_LINE_LIMIT)
+            finally:
+                os.umask(umask)
+            where = f"unix:{socket_path}"
+        else:
+            server = await asyncio.start_server(self._handle, host=host, port=port, limit=_LINE_LIMIT)
+            where = f"tcp:{host}:{port}"
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self._stop.set)
+            except (NotImplementedError, RuntimeError):
+                # Windows 等平台不支持，依赖 KeyboardInterrupt / shutdown 请求
+                pass
+        print(
+            f"sca serve listening on {where} (workers={self.workers}, results={self.results_root}, pid={os.getpid()})",
+            flush=True,
+        )
+        try:
+            async with server:
+                await self._stop.wait()
+        finally:
+            server.close()
+            await self._close_connections()
+            await server.wait_closed()
+            self._pool.shutdown(wait=True)
+            self._session.close()
+            if socket_path is not None:
+                try:
+                    socket_path.unlink()
+                except OSError:
+                    pass
+
+
+def run_server(
+    *,
+    socket_path: Path | None = None,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    workers: int | None = None,
+    results_root: Path | None = None,
+) -> int:
+    try:
+        asyncio.run(
+            ScanServer(workers=workers, results_root=results_root).serve(socket_path=socket_path, host=host, port=port)
+        )
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+class ScanClient:
+    """Blocking client; one connection can carry any number of requests."""
+
+    def __init__(self, *, socket_path: Path | None = None, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> None:
+        if socket_path is not None:
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._sock.connect(str(socket_path))
+        else:
+            self._sock = socket.create_connection((host, port))
+        self._rfile = self._sock.makefile("rb")
+
+    def request(self, payload: dict[str, Any]) -> dict[str, Any]:
+        self._sock.sendall(json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n")
+        line = self._rfile.readline()
+        if not line:
+            raise ConnectionError("服务端已断开连接")
+        return json.loads(line)
+
+    def close(self) -> None:
+        self._rfile.close()
+        self._sock.close()
+
+    def __enter__(self) -> "ScanClient":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
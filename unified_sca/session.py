@@ -0,0 +1,185 @@
+"""Warm state for long-lived processes (``sca serve`` / ``sca shell``).
+
+A ``ScanSession`` keeps, for the life of the process:
+
+- detections per input, revalidated by mtime/size of the input and of the
+  marker files the detection was based on
+- opened archive views (zip member index, tar manifests read in one pass),
+  revalidated by size/mtime/inode
+- one ``WarmSbomCache`` per results dir: parsed-lock results are keyed by the
+  content hash of the lock, so a changed lock can never hit a stale entry
+- memory-mapped advisory indexes, re-opened when the index file is rebuilt
+
+All methods are thread-safe; scans of different inputs run concurrently.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterable
+
+from sca_tools.cache import WarmSbomCache, default_cache_dir
+from sca_tools.vulndb import VulnIndex, resolve_index
+
+from .detect import Detection, detect_fs
+from .nested import DEFAULT_NESTED_LIMITS, NestedLimits
+from .vfs import ArchiveFS, ProjectFS, is_archive_path, open_archive_fs, open_project_fs
+
+if TYPE_CHECKING:
+    from .cli import ScanOutcome
+
+_Stamp = tuple[tuple[int, int, int], ...]
+
+
+def _stat_stamp(p: Path) -> tuple[int, int, int]:
+    try:
+        st = os.stat(p)
+    except OSError:
+        return (-1, -1, -1)
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def _detection_stamp(input_path: Path, det: Detection) -> _Stamp:
+    if input_path.is_file():
+        return (_stat_stamp(input_path),)
+    # 目录：输入根目录、识别出的项目根目录以及命中的表征文件
+    parts = [_stat_stamp(input_path), _stat_stamp(det.project_root)]
+    for names in det.evidence.values():
+        parts.extend(_stat_stamp(det.project_root / n) for n in names)
+    return tuple(parts)
+
+
+class ScanSession:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._caches: dict[Path, WarmSbomCache] = {}
+        # index path -> (stat 指纹, 已打开的索引)
+        self._indexes: dict[Path, tuple[tuple[int, int, int], VulnIndex]] = {}
+        self._detections: dict[tuple[Path, tuple[str, ...] | None], tuple[_Stamp, Detection]] = {}
+        self._archives: dict[Path, tuple[tuple[int, int, int], ArchiveFS]] = {}
+        # 失效但可能仍被后台任务使用的对象，会话结束时统一关闭
+        self._retired: list[ArchiveFS] = []
+        self.hits = {"detection": 0, "archive": 0}
+
+    def cache(self, results_dir: Path) -> WarmSbomCache:
+        with self._lock:
+            c = self._caches.get(results_dir)
+            if c is None:
+                c = self._caches[results_dir] = WarmSbomCache(default_cache_dir(results_dir))
+            return c
+
+    def vulndb(self, results_dir: Path, advisory_db: Path | None) -> VulnIndex | None:
+        index_path = resolve_index(results_dir, advisory_db)
+        if index_path is None:
+            return None
+        stamp = _stat_stamp(index_path)
+        with self._lock:
+            hit = self._indexes.get(index_path)
+            if hit is not None and hit[0] == stamp:
+                return hit[1]
+            # 旧索引不主动 close：仍在运行的任务可能持有它，引用释放后自动 unmap
+            idx = VulnIndex(index_path)
+            self._indexes[index_path] = (stamp, idx)
+            return idx
+
+    def open_fs(self, input_path: Path) -> ProjectFS:
+        """Shared view of ``input_path``; archives stay open for the session."""
+        if not is_archive_path(input_path):
+            return open_project_fs(input_path)
+        stamp = _stat_stamp(input_path)
+        with self._lock:
+            hit = self._archives.get(input_path)
+            if hit is not None and hit[0] == stamp:
+                self.hits["archive"] += 1
+                return hit[1]
+        fs = open_archive_fs(input_path)
+        with self._lock:
+            old = self._archives.get(input_path)
+            if old is not None:
+                self._retired.append(old[1])
+            self._archives[input_path] = (stamp, fs)
+        return fs
+
+    def detect(self, input_path: Path, *, prune_dirs: Iterable[str] | None = None) -> Detection:
+        input_path = input_path.resolve()
+        key = (input_path, tuple(prune_dirs) if prune_dirs is not None else None)
+        with self._lock:
+            hit = self._detections.get(key)
+        if hit is not None and hit[0] == _detection_stamp(input_path, hit[1]):
+            with self._lock:
+                self.hits["detection"] += 1
+            return hit[1]
+        if not (input_path.is_dir() or is_archive_path(input_path)):
+            raise FileNotFoundError(f"输入路径必须是目录或压缩包: {input_path}")
+        fs = self.open_fs(input_path)
+        det = detect_fs(fs, prune_dirs=prune_dirs)
+        if not fs.is_archive:
+            fs.close()
+        with self._lock:
+            self._detections[key] = (_detection_stamp(input_path, det), det)
+        return det
+
+    def scan(
+        self,
+        input_path: Path,
+        results_dir: Path,
+        *,
+        use_cache: bool = True,
+        sbom_format: str = "json",
+        advisory_db: Path | None = None,
+        projects: str = "auto",
+        nested: NestedLimits | None = DEFAULT_NESTED_LIMITS,
+        profile: str | None = None,
+        profile_top: int | None = None,
+    ) -> "ScanOutcome":
+        from .cli import scan_with_state
+
+        input_path = input_path.resolve()
+        det = self.detect(input_path)
+        fs = self.open_fs(input_path)
+        try:
+            return scan_with_state(
+                input_path,
+                results_dir,
+                cache=self.cache(results_dir) if use_cache else None,
+                sbom_format=sbom_format,
+                vulndb=self.vulndb(results_dir, advisory_db),
+                fs=fs,
+                detection=det,
+                projects=projects,
+                nested=nested,
+                profile=profile,
+                profile_top=profile_top,
+            )
+        finally:
+            if not fs.is_archive:
+                fs.close()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "detections": len(self._detections),
+                "archives": len(self._archives),
+                "hits": dict(self.hits),
+                "sbomCaches": {str(k): v.memory_size for k, v in self._caches.items()},
+                "advisoryIndexes": [str(k) for k in self._indexes],
+            }
+
+    def clear(self) -> None:
+        """Drop every cached detection/archive/SBOM (disk cache entries are kept)."""
+        with self._lock:
+            self._detections.clear()
+            self._retired.extend(fs for _, fs in self._archives.values())
+            self._archives.clear()
+            for c in self._caches.values():
+                c.forget()
+
+    def close(self) -> None:
+        with self._lock:
+            for fs in self._retired + [fs for _, fs in self._archives.values()]:
+                fs.close()
+            self._retired.clear()
+            self._archives.clear()
+            self._detections.clear()
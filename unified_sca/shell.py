@@ -1,58 +1,308 @@
 from __future__ import annotations
 
+import argparse
+import json
+import os
 import shlex
 import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable
 
-from .cli import main as cli_main
+from .cli import (
+    UnsupportedProjectError,
+    _extract_filters,
+    _nested_limits,
+    _normalize_argv,
+    _print_detection,
+    _print_detection_list,
+    _print_scan_outcome,
+    _resolve_input_path,
+    build_parser,
+    detect_first_level,
+    detect_one,
+    main as cli_main,
+)
+from .detect import dir_has_markers
+from .session import ScanSession
+from sca_tools import tracing
 
 
 HELP_TEXT = """可用命令：
-  detect <path> [--first-level] [--keep-workdir] [--work-base <dir>]
-  scan <path> --results-dir <dir>
+  detect <path> [--first-level] [--keep-workdir] [--work-base <dir>] [--trace <out.json>]
+  scan <path> --results-dir <dir> [--first-level] [--sbom-format ...] [--advisory-db ...]
+       [--trace <out.json>] [--profile cpu|mem]
+  <detect/scan 命令> &      后台执行，提示符立即返回
+  jobs                      查看后台任务
+  wait [<id> ...]           等待后台任务结束并输出结果（不带 id 时等待全部）
+  session [clear]           查看/清空本会话缓存（识别结果、已打开的压缩包、解析过的 lock）
   help
   exit / quit
 
 示例：
   detect /path/to/test_project
   scan /path/to/sample_npm --results-dir /path/to/results
+  scan /path/to/big.zip --results-dir /path/to/results &
 """
 
 
+@dataclass
+class _Job:
+    id: int
+    command: str
+    future: "Future[int]"
+    started: float = field(default_factory=time.perf_counter)
+    lines: list[str] = field(default_factory=list)
+    finished: float | None = None
+    reported: bool = False
+
+    @property
+    def status(self) -> str:
+        if not self.future.done():
+            return "running"
+        if self.future.exception() is not None or self.future.result() != 0:
+            return "failed"
+        return "done"
+
+
+def _execute(session: ScanSession, argv: list[str], out: Callable[[str], None]) -> int:
+    """Run one detect/scan through the session caches; other commands go to ``cli_main``."""
+    argv = _normalize_argv(argv)
+    args = build_parser().parse_args(argv)
+    trace = getattr(args, "trace", None)
+    # 转交 cli_main 的命令由其自行处理 --trace
+    delegated = (args.cmd == "detect" and args.projects) or (args.cmd == "scan" and args.incremental)
+    if not trace or delegated or args.cmd not in ("detect", "scan"):
+        return _execute_args(session, args, argv, out)
+    if args.cmd == "scan" and args.first_level:
+        out("--trace 不能与 --first-level 同时使用")
+        return 2
+    trace_path = _resolve_input_path(trace)
+    with tracing.tracing() as tracer:
+        with tracing.span("main", cmd=args.cmd):
+            code = _execute_args(session, args, argv, out)
+    tracer.write_chrome_trace(trace_path)
+    out(f"trace: {trace_path}")
+    return code
+
+
+def _execute_args(session: ScanSession, args: argparse.Namespace, argv: list[str], out: Callable[[str], None]) -> int:
+    if args.cmd == "detect":
+        in_path = _resolve_input_path(args.path)
+        prune_dirs = [x.strip() for x in args.prune.split(",") if x.strip()] if args.prune is not None else None
+        work_base = _resolve_input_path(args.work_base)
+        if args.projects:
+            return cli_main(argv)
+        if args.first_level or (in_path.is_dir() and not dir_has_markers(in_path)):
+            if not in_path.is_dir():
+                out("--first-level 只能用于目录路径")
+                return 2
+            dets = detect_first_level(
+                in_path, keep_workdir=bool(args.keep_workdir), work_base=work_base, prune_dirs=prune_dirs
+            )
+            _print_detection_list(dets, out)
+        elif args.keep_workdir:
+            det = detect_one(
+                in_path, keep_workdir=True, work_base=work_base, prune_dirs=prune_dirs, **_extract_filters(args)
+            )
+            _print_detection(det, out)
+        else:
+            _print_detection(session.detect(in_path, prune_dirs=prune_dirs), out)
+        return 0
+
+    if args.cmd == "scan":
+        in_path = _resolve_input_path(args.path)
+        results_dir = _resolve_input_path(args.results_dir)
+        results_dir.mkdir(parents=True, exist_ok=True)
+        advisory_db = _resolve_input_path(args.advisory_db) if args.advisory_db else None
+        if args.incremental:
+            return cli_main(argv)
+        if args.first_level:
+            if not in_path.is_dir():
+                out("--first-level 只能用于目录路径")
+                return 2
+            from .batch import scan_first_level
+
+            summary = scan_first_level(
+                in_path,
+                results_dir,
+                jobs=args.jobs,
+                use_cache=not args.no_cache,
+                sbom_format=args.sbom_format,
+                advisory_db=advisory_db,
+                on_result=lambda rec: out(json.dumps(rec, ensure_ascii=False)),
+                nested=_nested_limits(args),
+                profile=args.profile,
+                profile_top=args.profile_top,
+            )
+            out(f"index: {summary.index_path}")
+            return 0 if summary.failed == 0 else 1
+        try:
+            outcome = session.scan(
+                in_path,
+                results_dir,
+                use_cache=not args.no_cache,
+                sbom_format=args.sbom_format,
+                advisory_db=advisory_db,
+                projects=args.projects,
+                nested=_nested_limits(args),
+                profile=args.profile,
+                profile_top=args.profile_top,
+            )
+        except UnsupportedProjectError as e:
+            out(str(e))
+            return 1
+        _print_scan_outcome(outcome, out)
+        return 0
+
+    code = cli_main(argv)
+    return int(code or 0)
+
+
+class _Shell:
+    def __init__(self) -> None:
+        self.session = ScanSession()
+        self.pool = ThreadPoolExecutor(max_workers=max(1, min(4, os.cpu_count() or 1)), thread_name_prefix="sca-job")
+        self.jobs: dict[int, _Job] = {}
+        self._next_id = 1
+
+    def submit(self, argv: list[str], command: str) -> None:
+        # 参数错误在前台直接报告，避免把必然失败的任务放到后台
+        args = build_parser().parse_args(_normalize_argv(argv))
+        if args.cmd not in ("detect", "scan"):
+            print("仅 detect/scan 支持后台执行(&)")
+            return
+        job_id = self._next_id
+        self._next_id += 1
+        lines: list[str] = []
+        future = self.pool.submit(_execute, self.session, argv, lines.append)
+        job = _Job(job_id, command, future, lines=lines)
+        future.add_done_callback(lambda _f, j=job: setattr(j, "finished", time.perf_counter()))
+        self.jobs[job_id] = job
+        print(f"[{job_id}] {command}")
+
+    def _report(self, job: _Job) -> None:
+        job.reported = True
+        elapsed = (job.finished or time.perf_counter()) - job.started
+        print(f"[{job.id}] {job.status} ({elapsed:.2f}s) {job.command}")
+        for line in job.lines:
+            print(line)
+        exc = job.future.exception()
+        if exc is not None:
+            print(f"执行失败: {exc}")
+
+    def report_finished(self) -> None:
+        for job in self.jobs.values():
+            if job.future.done() and not job.reported:
+                self._report(job)
+
+    def list_jobs(self) -> None:
+        if not self.jobs:
+            print("(无后台任务)")
+            return
+        for job in self.jobs.values():
+            elapsed = (job.finished or time.perf_counter()) - job.started
+            print(f"[{job.id}] {job.status:<7} {elapsed:8.2f}s  {job.command}")
+
+    def wait(self, ids: list[str]) -> None:
+        targets: list[_Job] = []
+        for raw in ids:
+            job = self.jobs.get(int(raw)) if raw.isdigit() else None
+            if job is None:
+                print(f"任务不存在: {raw}")
+                continue
+            targets.append(job)
+        if not ids:
+            targets = [j for j in self.jobs.values() if not j.reported]
+        for job in targets:
+            try:
+                job.future.result()
+            except BaseException:
+                # 失败原因在 _report 中输出
+                pass
+            self._report(job)
+
+    def session_cmd(self, argv: list[str]) -> None:
+        if argv[1:] == ["clear"]:
+            self.session.clear()
+            print("会话缓存已清空")
+            return
+        print(json.dumps(self.session.stats(), ensure_ascii=False, indent=2))
+
+    def close(self) -> None:
+        running = [j for j in self.jobs.values() if not j.future.done()]
+        if running:
+            print(f"等待 {len(running)} 个后台任务结束...")
+        self.pool.shutdown(wait=True)
+        self.report_finished()
+        self.session.close()
+
+
 def run_shell() -> int:
     print("SCA Shell (输入 help 查看用法，exit 退出)")
+    sh = _Shell()
+    try:
+        _loop(sh)
+    finally:
+        sh.close()
+    return 0
+
+
+def _loop(sh: _Shell) -> None:
     while True:
+        sh.report_finished()
         try:
             line = input("sca> ").strip()
         except (EOFError, KeyboardInterrupt):
             print()
-            return 0
+            return
 
         if not line:
             continue
         if line in {"exit", "quit"}:
-            return 0
+            return
         if line == "help":
             print(HELP_TEXT)
             continue
 
+        background = line.endswith("&")
+        if background:
+            line = line[:-1].rstrip()
+
         try:
             argv = shlex.split(line)
         except ValueError as e:
             print(f"解析命令失败: {e}")
             continue
+        if not argv:
+            continue
 
-        # 调用同一套 CLI 逻辑执行子命令
+        if argv[0] == "jobs":
+            sh.list_jobs()
+            continue
+        if argv[0] == "wait":
+            sh.wait(argv[1:])
+            continue
+        if argv[0] == "session":
+            sh.session_cmd(argv)
+            continue
+
+        # 调用同一套 CLI 逻辑执行子命令（detect/scan 走会话缓存）
         try:
-            code = cli_main(argv)
-            # cli_main 返回 int；为避免 shell 直接退出，这里只打印错误码
+            if background:
+                sh.submit(argv, line)
+                continue
+            code = _execute(sh.session, argv, print)
+            # 为避免 shell 直接退出，这里只打印错误码
             if code not in (0, None):
                 print(f"(exit code {code})")
         except SystemExit as e:
             # argparse 可能会抛 SystemExit
             code = e.code if isinstance(e.code, int) else 1
             if code != 0:
+                if not isinstance(e.code, int) and e.code is not None:
+                    print(e.code, file=sys.stderr)
                 print(f"(exit code {code})")
         except Exception as e:
             print(f"执行失败: {e}")
-
-
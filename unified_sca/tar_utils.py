@@ -0,0 +1,228 @@
+"""Tar archives (.tar, .tar.gz/.tgz, .tar.bz2, .tar.xz, .tar.zst) as one forward-only stream.
+
+Compressed tarballs cannot be indexed without decompressing them, so the
+archive (a file, or an in-memory file object for nested archives) is read
+exactly once in ``r|*`` stream mode (no seeking, no temp files): every member
+name is recorded and only the members the caller asks for are kept in
+memory. The Zip Slip / junk-member rules are the ones from ``zip_utils``.
+zstd needs ``compression.zstd`` (Python 3.14+) or the optional
+``zstandard`` package.
+"""
+
+from __future__ import annotations
+
+import os
+import posixpath
+from dataclasses import dataclass, field
+from pathlib import Path, PurePath
+from typing import TYPE_CHECKING, BinaryIO, Callable, Iterable
+
+from sca_tools.tracing import count, traced
+
+from .zip_utils import (
+    ArchiveLimitError,
+    ExtractResult,
+    _default_file_mode,
+    _should_skip_member,
+    compile_glob,
+    guess_archive_root,
+    is_safe_member_name,
+    normalize_member_name,
+)
+
+if TYPE_CHECKING:
+    import tarfile
+
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz", ".tar.zst", ".tar.zstd", ".tzst")
+_ZSTD_SUFFIXES = (".tar.zst", ".tar.zstd", ".tzst")
+# 单个缓存成员的上限：清单/lock 不会超过该大小，超出时只记录不缓存
+MAX_KEEP_MEMBER_BYTES = 256 * 1024 * 1024
+_COPY_BUFSIZE = 1024 * 1024
+
+
+def tar_suffix(p: PurePath) -> str | None:
+    name = p.name.lower()
+    for suffix in TAR_SUFFIXES:
+        if name.endswith(suffix):
+            return suffix
+    return None
+
+
+def is_tar_path(p: Path) -> bool:
+    return p.is_file() and tar_suffix(p) is not None
+
+
+def _open_zstd(path: Path, fileobj: BinaryIO | None = None) -> BinaryIO:
+    try:
+        from compression import zstd  # type: ignore[import-not-found]  # py3.14+
+
+        return zstd.ZstdFile(fileobj if fileobj is not None else path, "rb")  # type: ignore[no-any-return]
+    except ImportError:
+        pass
+    try:
+        import zstandard  # type: ignore[import-not-found]
+    except ImportError:
+        raise RuntimeError(f"读取 {path.name} 需要 zstd 支持：pip install zstandard") from None
+    raw = fileobj if fileobj is not None else open(path, "rb")
+    try:
+        return zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)  # type: ignore[no-any-return]
+    except Exception:
+        raw.close()
+        raise
+
+
+def open_tar_stream(path: Path, *, fileobj: BinaryIO | None = None) -> tarfile.TarFile:
+    """Forward-only ``TarFile`` over ``path`` (or ``fileobj``, ``path`` then only names it).
+
+    gzip/bz2/xz are detected by tarfile itself.
+    """
+    import tarfile
+
+    if tar_suffix(path) in _ZSTD_SUFFIXES:
+        fp = _open_zstd(path, fileobj)
+        try:
+            tf = tarfile.open(fileobj=fp, mode="r|")
+        except Exception:
+            fp.close()
+            raise
+        # TarFile 不会关闭外部传入的 fileobj，关闭时一并关闭解压流
+        close = tf.close
+
+        def _close() -> None:
+            try:
+                close()
+            finally:
+                fp.close()
+
+        tf.close = _close  # type: ignore[method-assign]
+        return tf
+    if fileobj is not None:
+        return tarfile.open(fileobj=fileobj, mode="r|*")
+    return tarfile.open(path, mode="r|*")
+
+
+def _member_name(info: tarfile.TarInfo) -> str | None:
+    """Normalized name of a regular file worth looking at, None to skip; raises on Zip Slip."""
+    if _should_skip_member(info.name):
+        return None
+    norm = normalize_member_name(info.name)
+    if not is_safe_member_name(norm):
+        raise ValueError(f"tar 包含非法路径: {info.name}")
+    # 只处理普通文件；符号/硬链接、设备文件等一律忽略
+    if not info.isreg():
+        return None
+    rel = posixpath.normpath(norm)
+    return None if rel == "." else rel
+
+
+@dataclass
+class TarIndex:
+    """Result of one pass: every file's size, plus the bytes of the kept ones."""
+
+    sizes: dict[str, int] = field(default_factory=dict)
+    data: dict[str, bytes] = field(default_factory=dict)
+
+
+def index_tar(
+    path: Path,
+    *,
+    keep: Callable[[str, int], bool],
+    fileobj: BinaryIO | None = None,
+    max_members: int | None = None,
+    max_bytes: int | None = None,
+) -> TarIndex:
+    """Read ``path`` once; members for which ``keep(rel, size)`` is true are held in memory.
+
+    ``max_members`` / ``max_bytes`` (sum of member sizes, i.e. the decompressed
+    stream) abort the pass with ``ArchiveLimitError`` as soon as they are exceeded.
+    """
+    index = TarIndex()
+    total = 0
+    with open_tar_stream(path, fileobj=fileobj) as tf:
+        for info in tf:
+            rel = _member_name(info)
+            if rel is None:
+                continue
+            total += info.size
+            if max_members is not None and len(index.sizes) >= max_members:
+                raise ArchiveLimitError(f"{path.name}: 成员数超过上限 {max_members}")
+            if max_bytes is not None and total > max_bytes:
+                raise ArchiveLimitError(f"{path.name}: 解压后大小超过上限 {max_bytes} 字节")
+            index.sizes[rel] = info.size
+            if info.size <= MAX_KEEP_MEMBER_BYTES and keep(rel, info.size):
+                src = tf.extractfile(info)
+                if src is not None:
+                    index.data[rel] = src.read()
+    return index
+
+
+@traced("extract")
+def safe_extract_tar(
+    tar_path: Path,
+    work_dir: Path,
+    *,
+    include: Iterable[str] | None = None,
+    exclude: Iterable[str] | None = None,
+) -> ExtractResult:
+    """Stream-extract a tarball with the same rules and filters as ``safe_extract_zip``.
+
+    A stream cannot be validated up front, so each member is checked before it
+    is written; on an unsafe member the partial output is removed.
+    """
+    import shutil
+
+    tp = tar_path.resolve()
+    if not tp.is_file() or tar_suffix(tp) is None:
+        raise ValueError(f"不是 tar 文件: {tp}")
+    work = work_dir.resolve()
+    work.mkdir(parents=True, exist_ok=True)
+    inc = [compile_glob(p, anchored=False) for p in include or ()]
+    exc = [compile_glob(p, anchored=False) for p in exclude or ()]
+    default_mode = _default_file_mode()
+    base = str(work)
+    made: set[str] = set()
+    names: list[str] = []
+    written = 0
+    filtered = 0
+    try:
+        with open_tar_stream(tp) as tf:
+            for info in tf:
+                rel = _member_name(info)
+                if rel is None:
+                    continue
+                if (inc and not any(r.fullmatch(rel) for r in inc)) or any(r.fullmatch(rel) for r in exc):
+                    filtered += 1
+                    continue
+                parent = posixpath.dirname(rel)
+                if parent and parent not in made:
+                    os.makedirs(os.path.join(base, parent), exist_ok=True)
+                    while parent and parent not in made:
+                        made.add(parent)
+                        parent = posixpath.dirname(parent)
+                dest = os.path.join(base, rel)
+                src = tf.extractfile(info)
+                if src is None:
+                    continue
+                with open(dest, "wb") as dst:
+                    shutil.copyfileobj(src, dst, _COPY_BUFSIZE)
+                mode = info.mode & 0o777
+                if mode and mode != default_mode:
+                    try:
+                        os.chmod(dest, mode)
+                    except OSError:
+                        pass
+                names.append(rel)
+                written += info.size
+    except ValueError:
+        shutil.rmtree(work, ignore_errors=True)
+        raise
+
+    count(bytesRead=tp.stat().st_size, bytesWritten=written, filesExtracted=len(names))
+    root = guess_archive_root(names)
+    return ExtractResult(
+        work_dir=work,
+        extracted_root=work / root if root else work,
+        files=len(names),
+        bytes_written=written,
+        filtered=filtered,
+    )
@@ -0,0 +1,325 @@
+"""Read-only project views over a directory or an archive.
+
+Detection and the analyzers only ever need a handful of manifest/lock files.
+For archives the member table is indexed once and just those members are
+streamed into memory; nothing is extracted to disk. Tarballs have no member
+table, so they are read in a single forward pass that keeps only manifests
+and locks (see ``tar_utils``). Archives nested inside the input are opened
+from bytes with the same classes (see ``nested``).
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import posixpath
+from pathlib import Path, PurePosixPath
+from typing import TYPE_CHECKING, BinaryIO, Iterator, Protocol, Union
+
+from sca_tools.registry import analyzer_specs
+
+from .detect import _MARKER_INDEX, DEFAULT_PRUNE_DIRS, NESTED_PRUNE_DIRS
+from .tar_utils import index_tar, is_tar_path, tar_suffix
+from .zip_utils import (
+    ArchiveLimitError,
+    _should_skip_member,
+    guess_archive_root,
+    is_safe_member_name,
+    normalize_member_name,
+)
+
+if TYPE_CHECKING:
+    import zipfile
+
+# 顺序读取 tar 时保留的成员：各生态的清单/lock（含分析器额外查找的 lock 名）
+TAR_KEEP_NAMES: frozenset[str] = frozenset(_MARKER_INDEX).union(*(s.inputs for s in analyzer_specs().values()))
+# 顺序读取 tar 时额外保留的内嵌压缩包总字节数（供 nested 在内存中继续打开）
+TAR_KEEP_ARCHIVE_BYTES = 256 * 1024 * 1024
+
+
+class ProjectFS(Protocol):
+    """Minimal file view shared by detect/scan.
+
+    Paths are normalized posix strings relative to the view; ``root`` is the
+    directory that plays the role of the old ``extracted_root`` ("" = top).
+    """
+
+    location: Path
+    root: str
+    is_archive: bool
+
+    def iter_files(self) -> Iterator[str]: ...
+
+    def is_file(self, rel: str) -> bool: ...
+
+    def read_bytes(self, rel: str) -> bytes: ...
+
+    def open_binary(self, rel: str) -> BinaryIO: ...
+
+    def file_size(self, rel: str) -> int: ...
+
+    def find(self, name: str) -> str | None: ...
+
+    def display_path(self, rel: str) -> Path: ...
+
+    def close(self) -> None: ...
+
+
+class DirFS:
+    """Plain directory; ``find`` only looks at the top level (as before)."""
+
+    is_archive = False
+
+    def __init__(self, root_dir: Path) -> None:
+        self.location = root_dir.resolve()
+        self.root = ""
+
+    def iter_files(self) -> Iterator[str]:
+        base = str(self.location)
+        for dirpath, dirnames, filenames in os.walk(base):
+            dirnames[:] = [d for d in dirnames if d not in {".git", "__MACOSX"}]
+            rel_dir = os.path.relpath(dirpath, base)
+            for fn in filenames:
+                yield fn if rel_dir == "." else f"{rel_dir.replace(os.sep, '/')}/{fn}"
+
+    def is_file(self, rel: str) -> bool:
+        return (self.location / rel).is_file()
+
+    def read_bytes(self, rel: str) -> bytes:
+        return (self.location / rel).read_bytes()
+
+    def open_binary(self, rel: str) -> BinaryIO:
+        return open(self.location / rel, "rb")
+
+    def file_size(self, rel: str) -> int:
+        return (self.location / rel).stat().st_size
+
+    def find(self, name: str) -> str | None:
+        return name if self.is_file(name) else None
+
+    def display_path(self, rel: str) -> Path:
+        return self.location / rel if rel else self.location
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "DirFS":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+class ZipFS:
+    """Zip archive indexed from ``infolist()``; members are read lazily.
+
+    Applies the same filtering (__MACOSX/.git/.DS_Store) and Zip Slip rules as
+    ``safe_extract_zip``.
+    """
+
+    is_archive = True
+
+    def __init__(self, zip_path: Path, *, data: bytes | None = None, max_members: int | None = None) -> None:
+        """``data`` opens an in-memory archive; ``zip_path`` then only names it."""
+        import zipfile
+
+        zp = zip_path if data is not None else zip_path.resolve()
+        if data is None and not zp.exists():
+            raise FileNotFoundError(f"zip 不存在: {zp}")
+        if zp.suffix.lower() != ".zip":
+            raise ValueError(f"不是 zip 文件: {zp}")
+        self.location = zp
+        self._zf = zipfile.ZipFile(io.BytesIO(data) if data is not None else zp, "r")
+        self._members: dict[str, zipfile.ZipInfo] = {}
+        try:
+            infos = self._zf.infolist()
+            if max_members is not None and len(infos) > max_members:
+                raise ArchiveLimitError(f"{zp.name}: 成员数超过上限 {max_members}")
+            for info in infos:
+                if _should_skip_member(info.filename):
+                    continue
+                norm = normalize_member_name(info.filename)
+                if not is_safe_member_name(norm):
+                    raise ValueError(f"zip 包含非法路径(Zip Slip): {info.filename}")
+                if info.is_dir() or norm.endswith("/"):
+                    continue
+                self._members[posixpath.normpath(norm)] = info
+        except Exception:
+            self._zf.close()
+            raise
+        self.root = guess_archive_root(self._members)
+
+    def iter_files(self) -> Iterator[str]:
+        return iter(self._members)
+
+    def is_file(self, rel: str) -> bool:
+        return rel in self._members
+
+    def _info(self, rel: str) -> zipfile.ZipInfo:
+        info = self._members.get(rel)
+        if info is None:
+            raise FileNotFoundError(f"zip 内不存在: {rel}")
+        return info
+
+    def read_bytes(self, rel: str) -> bytes:
+        with self._zf.open(self._info(rel), "r") as src:
+            return src.read()
+
+    def open_binary(self, rel: str) -> BinaryIO:
+        return self._zf.open(self._info(rel), "r")  # type: ignore[return-value]
+
+    def file_size(self, rel: str) -> int:
+        return self._info(rel).file_size
+
+    def find(self, name: str) -> str | None:
+        """``root/name`` first, then the first member with that basename."""
+        direct = posixpath.join(self.root, name) if self.root else name
+        if direct in self._members:
+            return direct
+        hits = sorted(m for m in self._members if posixpath.basename(m) == name)
+        return hits[0] if hits else None
+
+    def display_path(self, rel: str) -> Path:
+        return self.location / rel if rel else self.location
+
+    def close(self) -> None:
+        self._zf.close()
+
+    def __enter__(self) -> "ZipFS":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+class TarFS:
+    """Tarball (optionally gzip/bz2/xz/zstd compressed) read in one sequential pass.
+
+    Every file name and size is indexed; only members named in ``keep_names``
+    and nested archives up to ``keep_archive_bytes`` in total (outside pruned
+    directories such as node_modules) are held in memory, so reading any other
+    member raises ``FileNotFoundError``.
+    """
+
+    is_archive = True
+
+    def __init__(
+        self,
+        tar_path: Path,
+        *,
+        keep_names: frozenset[str] = TAR_KEEP_NAMES,
+        keep_archive_bytes: int = TAR_KEEP_ARCHIVE_BYTES,
+        data: bytes | None = None,
+        max_members: int | None = None,
+        max_bytes: int | None = None,
+    ) -> None:
+        tp = tar_path if data is not None else tar_path.resolve()
+        if data is None and not tp.exists():
+            raise FileNotFoundError(f"tar 不存在: {tp}")
+        if tar_suffix(tp) is None:
+            raise ValueError(f"不是 tar 文件: {tp}")
+        self.location = tp
+        archive_budget = [keep_archive_bytes]
+
+        def _keep(rel: str, size: int) -> bool:
+            d, _sep, fn = rel.rpartition("/")
+            parts = d.split("/") if d else []
+            if fn in keep_names:
+                return DEFAULT_PRUNE_DIRS.isdisjoint(parts)
+            if is_archive_name(fn) and NESTED_PRUNE_DIRS.isdisjoint(parts) and size <= archive_budget[0]:
+                archive_budget[0] -= size
+                return True
+            return False
+
+        index = index_tar(
+            tp,
+            keep=_keep,
+            fileobj=io.BytesIO(data) if data is not None else None,
+            max_members=max_members,
+            max_bytes=max_bytes,
+        )
+        self._sizes = index.sizes
+        self._data = index.data
+        self.root = guess_archive_root(self._sizes)
+
+    def iter_files(self) -> Iterator[str]:
+        return iter(self._sizes)
+
+    def is_file(self, rel: str) -> bool:
+        return rel in self._sizes
+
+    def read_bytes(self, rel: str) -> bytes:
+        data = self._data.get(rel)
+        if data is None:
+            if rel in self._sizes:
+                raise FileNotFoundError(f"tar 成员未在顺序读取时保留(仅保留清单/lock/内嵌压缩包): {rel}")
+            raise FileNotFoundError(f"tar 内不存在: {rel}")
+        return data
+
+    def open_binary(self, rel: str) -> BinaryIO:
+        return io.BytesIO(self.read_bytes(rel))
+
+    def file_size(self, rel: str) -> int:
+        size = self._sizes.get(rel)
+        if size is None:
+            raise FileNotFoundError(f"tar 内不存在: {rel}")
+        return size
+
+    def find(self, name: str) -> str | None:
+        """``root/name`` first, then the first member with that basename."""
+        direct = posixpath.join(self.root, name) if self.root else name
+        if direct in self._sizes:
+            return direct
+        hits = sorted(m for m in self._data if posixpath.basename(m) == name)
+        return hits[0] if hits else None
+
+    def display_path(self, rel: str) -> Path:
+        return self.location / rel if rel else self.location
+
+    def close(self) -> None:
+        self._data = {}
+
+    def __enter__(self) -> "TarFS":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+ArchiveFS = Union[ZipFS, TarFS]
+
+
+def is_archive_name(name: str) -> bool:
+    """Whether a file or member name looks like a zip/tar archive (no filesystem access)."""
+    p = PurePosixPath(name)
+    return p.suffix.lower() == ".zip" or tar_suffix(p) is not None
+
+
+def is_archive_path(p: Path) -> bool:
+    return p.is_file() and is_archive_name(p.name)
+
+
+def open_archive_fs(input_path: Path) -> ArchiveFS:
+    if is_tar_path(input_path):
+        return TarFS(input_path)
+    return ZipFS(input_path)
+
+
+def open_archive_bytes(
+    location: Path, data: bytes, *, max_members: int | None = None, max_bytes: int | None = None
+) -> ArchiveFS:
+    """Archive held in memory (e.g. a member of another archive); ``location`` names it.
+
+    ``max_bytes`` only bounds tarballs, whose whole stream is decompressed.
+    """
+    if tar_suffix(location) is not None:
+        return TarFS(location, data=data, max_members=max_members, max_bytes=max_bytes)
+    return ZipFS(location, data=data, max_members=max_members)
+
+
+def open_project_fs(input_path: Path) -> DirFS | ArchiveFS:
+    if input_path.is_dir():
+        return DirFS(input_path)
+    if is_archive_path(input_path):
+        return open_archive_fs(input_path)
+    raise FileNotFoundError("输入必须是目录或压缩包（.zip / .tar / .tar.gz / .tar.zst 等）")
@@ -0,0 +1,179 @@
+"""File watching for ``sca scan --incremental --watch``.
+
+On Linux the tree is watched with inotify (via ctypes, one watch per
+non-pruned directory); elsewhere, or when inotify is unavailable or the watch
+limit is hit, the analyzer inputs are polled by size/mtime. Either way
+``wait()`` only returns True for changes that can affect the SBOM: a marker
+or another file an analyzer reads (``AnalyzerSpec.inputs``) written, moved or
+deleted, or a directory created/removed (which may add or drop a sub-project).
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Iterable, Protocol
+
+from sca_tools.registry import analyzer_specs
+
+from .detect import _MARKER_INDEX, DEFAULT_PRUNE_DIRS, _scan_dir, analyzer_inputs, iter_project_dirs
+
+# 变更后等待该时长无新事件再触发，合并 git checkout / npm install 等批量写入
+DEFAULT_DEBOUNCE = 0.5
+DEFAULT_POLL_INTERVAL = 2.0
+# 表征文件之外，分析器还会读取的文件（requirements.lock 等）变化也要触发
+_INPUT_NAMES: frozenset[str] = frozenset(_MARKER_INDEX).union(*(s.inputs for s in analyzer_specs().values()))
+
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_ISDIR = 0x40000000
+_WATCH_MASK = _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE | _IN_DELETE_SELF | _IN_ONLYDIR
+_EVENT = struct.Struct("iIII")
+
+
+class Watcher(Protocol):
+    def wait(self, timeout: float | None = None) -> bool: ...
+
+    def close(self) -> None: ...
+
+
+class InotifyWatcher:
+    def __init__(self, root: Path, *, prune_dirs: Iterable[str] | None = None, debounce: float = DEFAULT_DEBOUNCE) -> None:
+        libc_name = ctypes.util.find_library("c")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "inotify 不可用")
+        self._libc = libc
+        self._prune = DEFAULT_PRUNE_DIRS if prune_dirs is None else frozenset(prune_dirs)
+        self._debounce = debounce
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            e = ctypes.get_errno()
+            raise OSError(e, os.strerror(e))
+        self._dirs: dict[int, str] = {}
+        try:
+            self._add_tree(str(root.resolve()))
+        except BaseException:
+            os.close(self._fd)
+            raise
+
+    def _add_tree(self, top: str) -> None:
+        stack = [top]
+        while stack:
+            d = stack.pop()
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(d), _WATCH_MASK)
+            if wd < 0:
+                e = ctypes.get_errno()
+                if e in (errno.ENOENT, errno.ENOTDIR, errno.EACCES):
+                    continue
+                # ENOSPC：超出 fs.inotify.max_user_watches，由调用方退回轮询
+                raise OSError(e, os.strerror(e), d)
+            self._dirs[wd] = d
+            _, children = _scan_dir(d, self._prune)
+            stack.extend(children)
+
+    def _drain(self) -> bool:
+        relevant = False
+        while True:
+            try:
+                buf = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return relevant
+            off = 0
+            while off < len(buf):
+                wd, mask, _cookie, length = _EVENT.unpack_from(buf, off)
+                name = os.fsdecode(buf[off + _EVENT.size : off + _EVENT.size + length].rstrip(b"\0"))
+                off += _EVENT.size + length
+                if mask & _IN_Q_OVERFLOW:
+                    relevant = True
+                elif mask & _IN_IGNORED:
+                    self._dirs.pop(wd, None)
+                elif mask & _IN_ISDIR:
+                    if name in self._prune:
+                        continue
+                    relevant = True
+                    parent = self._dirs.get(wd)
+                    if parent is not None and mask & (_IN_CREATE | _IN_MOVED_TO):
+                        try:
+                            self._add_tree(os.path.join(parent, name))
+                        except OSError as e:
+                            print(f"无法监听新目录 {parent}/{name}: {e}", file=sys.stderr)
+                elif mask & _IN_DELETE_SELF or name in _INPUT_NAMES:
+                    relevant = True
+
+    def wait(self, timeout: float | None = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            ready, _, _ = select.select([self._fd], [], [], remaining)
+            if not ready:
+                return False
+            if self._drain():
+                break
+        while select.select([self._fd], [], [], self._debounce)[0]:
+            self._drain()
+        return True
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def _marker_snapshot(root: Path, prune_dirs: Iterable[str] | None) -> dict[str, tuple[int, int]]:
+    snap: dict[str, tuple[int, int]] = {}
+    for d, ev in iter_project_dirs(root, prune_dirs=prune_dirs):
+        for n in analyzer_inputs(ev):
+            try:
+                st = os.stat(d / n)
+            except OSError:
+                continue
+            snap[str(d / n)] = (st.st_size, st.st_mtime_ns)
+    return snap
+
+
+class PollingWatcher:
+    def __init__(self, root: Path, *, prune_dirs: Iterable[str] | None = None, interval: float = DEFAULT_POLL_INTERVAL) -> None:
+        self._root = root.resolve()
+        self._prune = prune_dirs
+        self._interval = interval
+        self._snapshot = _marker_snapshot(self._root, prune_dirs)
+
+    def wait(self, timeout: float | None = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            pause = self._interval if deadline is None else min(self._interval, deadline - time.monotonic())
+            if pause <= 0:
+                return False
+            time.sleep(pause)
+            snap = _marker_snapshot(self._root, self._prune)
+            if snap != self._snapshot:
+                self._snapshot = snap
+                return True
+
+    def close(self) -> None:
+        pass
+
+
+def open_watcher(root: Path, *, prune_dirs: Iterable[str] | None = None, interval: float = DEFAULT_POLL_INTERVAL) -> Watcher:
+    """inotify where available, polling every ``interval`` seconds otherwise."""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root, prune_dirs=prune_dirs)
+        except (OSError, AttributeError) as e:
+            print(f"inotify 不可用({e})，改用轮询（间隔 {interval}s）", file=sys.stderr)
+    return PollingWatcher(root, prune_dirs=prune_dirs, interval=interval)
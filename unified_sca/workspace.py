@@ -0,0 +1,478 @@
+"""Monorepo discovery: every project root in one tree walk, workspace-aware.
+
+``detect_project_types`` keeps only the best-scoring directory, which is right
+for "a zip with one project wrapped in a folder" but scans one arbitrary
+package of a monorepo. Here every directory with markers is collected in a
+single walk (one ``scandir`` per directory, or the archive member index),
+then workspace declarations are applied:
+
+- npm / yarn: ``"workspaces"`` in package.json (list or ``{"packages": [...]}``)
+- Cargo: ``[workspace] members`` / ``exclude`` in Cargo.toml
+- uv: ``[tool.uv.workspace] members`` / ``exclude`` in pyproject.toml
+- Maven: ``<modules>`` in pom.xml (the analyzer resolves the whole reactor)
+
+Members are covered by their workspace root's lock, so they are not scanned
+separately for that ecosystem; they are reported as children of the root.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import posixpath
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Iterable
+
+from sca_tools.registry import get_spec, scannable_types
+from sca_tools.tracing import bind, pool_size, span
+
+from .detect import _DISCOVERY_MAX_DEPTH, DEFAULT_PRUNE_DIRS, Detection, _evidence_in, iter_project_dirs
+from .nested import NESTED_SEP
+from .zip_utils import compile_glob
+
+if TYPE_CHECKING:
+    from sca_tools.base import ScanArtifacts, ScanContext
+
+    from .cli import ScanOutcome
+    from .nested import NestedScan
+    from .vfs import ProjectFS
+
+PROJECT_MODES = ("auto", "all", "best")
+
+# workspace 类型 -> (声明所在清单, 覆盖的生态)
+_WORKSPACE_KINDS: dict[str, tuple[str, str]] = {
+    "npm": ("package.json", "javascript"),
+    "cargo": ("Cargo.toml", "rust"),
+    "uv": ("pyproject.toml", "python"),
+    "maven": ("pom.xml", "java"),
+}
+# 先做字节级预筛，只有可能声明 workspace 的清单才完整解析
+_WORKSPACE_HINTS: dict[str, bytes] = {
+    "npm": b'"workspaces"',
+    "cargo": b"workspace",
+    "uv": b"tool.uv.workspace",
+    "maven": b"<modules>",
+}
+
+
+@dataclass(frozen=True)
+class ProjectRoot:
+    """One project inside the scanned tree; ``rel`` is a path inside the fs view."""
+
+    rel: str
+    evidence: dict[str, list[str]]
+    # 本目录声明的 workspace 类型及其成员目录
+    workspaces: tuple[str, ...] = ()
+    members: tuple[str, ...] = ()
+
+    @property
+    def detected_types(self) -> tuple[str, ...]:
+        return tuple(sorted(self.evidence))
+
+    @property
+    def scan_types(self) -> tuple[str, ...]:
+        # 只看文件名：目录里要有该分析器能解析的输入（见 AnalyzerSpec.can_handle）
+        return scannable_types(self.evidence)
+
+    def estimate_cost(self, fs: "ProjectFS") -> float:
+        """Sum of ``AnalyzerSpec.estimate_cost`` over ``scan_types`` (input sizes from ``fs``)."""
+
+        def _size(name: str) -> int | None:
+            try:
+                return fs.file_size(posixpath.join(self.rel, name) if self.rel else name)
+            except (OSError, KeyError):
+                return None
+
+        return sum(spec.estimate_cost(_size) for t in self.scan_types if (spec := get_spec(t)) is not None)
+
+
+def _marker_dirs(fs: "ProjectFS", prune: frozenset[str], max_depth: int) -> dict[str, dict[str, list[str]]]:
+    """rel dir -> evidence for every directory with markers, root included."""
+    if not fs.is_archive:
+        out: dict[str, dict[str, list[str]]] = {}
+        for d, ev in iter_project_dirs(fs.location, prune_dirs=prune, max_depth=max_depth):
+            rel = d.relative_to(fs.location).as_posix()
+            out["" if rel == "." else rel] = ev
+        return out
+
+    root = fs.root
+    prefix = f"{root}/" if root else ""
+    files_by_dir: dict[str, list[str]] = {}
+    for rel in fs.iter_files():
+        d, _sep, fn = rel.rpartition("/")
+        if d != root:
+            if not d.startswith(prefix):
+                continue
+            parts = d[len(prefix):].split("/")
+            if len(parts) > max_depth or not prune.isdisjoint(parts):
+                continue
+        files_by_dir.setdefault(d, []).append(fn)
+    out = {}
+    for d in sorted(files_by_dir, key=lambda x: (x.count("/"), x)):
+        ev = _evidence_in(files_by_dir[d])
+        if ev:
+            out[d] = ev
+    return out
+
+
+def _load_manifest(fs: "ProjectFS", rel: str, kind: str) -> dict[str, Any] | None:
+    manifest = _WORKSPACE_KINDS[kind][0]
+    try:
+        data = fs.read_bytes(posixpath.join(rel, manifest) if rel else manifest)
+    except OSError:
+        return None
+    if _WORKSPACE_HINTS[kind] not in data:
+        return None
+    try:
+        if kind == "npm":
+            doc = json.loads(data)
+        elif kind == "maven":
+            import xml.etree.ElementTree as ET
+
+            from sca_tools.analyzers.java_maven import POM_CACHE
+
+            # 经分析器的 POM 缓存按内容解析，随后扫描根项目时不再重复解析
+            try:
+                doc = {"modules": POM_CACHE.parse_bytes(data).modules}
+            except ET.ParseError:
+                return None
+        else:
+            from sca_tools.tomllock import load_toml
+
+            doc = load_toml(data)
+    except (ValueError, UnicodeDecodeError):
+        return None
+    return doc if isinstance(doc, dict) else None
+
+
+def _workspace_patterns(kind: str, doc: dict[str, Any]) -> tuple[list[str], list[str]] | None:
+    """(members, exclude) globs declared by ``doc``, None when it is no workspace root."""
+    if kind == "npm":
+        ws = doc.get("workspaces")
+        if isinstance(ws, dict):
+            ws = ws.get("packages")
+        if not isinstance(ws, list):
+            return None
+        pats = [p for p in ws if isinstance(p, str)]
+        return [p for p in pats if not p.startswith("!")], [p[1:] for p in pats if p.startswith("!")]
+    if kind == "maven":
+        # <module> 是相对目录（或指向另一个 pom 文件），按字面匹配
+        dirs = [posixpath.normpath(posixpath.dirname(m) if m.endswith(".xml") else m) for m in doc["modules"]]
+        return [d for d in dirs if d and d != "." and not d.startswith("..")], []
+    if kind == "cargo":
+        ws = doc.get("workspace")
+    else:
+        ws = ((doc.get("tool") or {}).get("uv") or {}).get("workspace")
+    if not isinstance(ws, dict):
+        return None
+    members = [p for p in ws.get("members") or [] if isinstance(p, str)]
+    exclude = [p for p in ws.get("exclude") or [] if isinstance(p, str)]
+    return members, exclude
+
+
+def discover_projects(
+    fs: "ProjectFS", *, prune_dirs: Iterable[str] | None = None, max_depth: int = _DISCOVERY_MAX_DEPTH
+) -> list[ProjectRoot]:
+    """Every project root under ``fs.root`` (root included), parents before children."""
+    prune = DEFAULT_PRUNE_DIRS if prune_dirs is None else frozenset(prune_dirs)
+    dirs = _marker_dirs(fs, prune, max_depth)
+
+    declared: dict[str, list[str]] = {}
+    members_of: dict[str, set[str]] = {}
+    covered: dict[str, set[str]] = {}
+    for rel, ev in dirs.items():
+        names = {n for hits in ev.values() for n in hits}
+        for kind, (manifest, eco) in _WORKSPACE_KINDS.items():
+            if manifest not in names:
+                continue
+            doc = _load_manifest(fs, rel, kind)
+            pats = _workspace_patterns(kind, doc) if doc is not None else None
+            if pats is None:
+                continue
+            declared.setdefault(rel, []).append(kind)
+            include = [compile_glob(p) for p in pats[0]]
+            exclude = [compile_glob(p) for p in pats[1]]
+            prefix = f"{rel}/" if rel else ""
+            for cand, cand_ev in dirs.items():
+                if cand == rel or not cand.startswith(prefix) or manifest not in cand_ev.get(eco, ()):
+                    continue
+                sub = cand[len(prefix):]
+                if any(p.fullmatch(sub) for p in include) and not any(p.fullmatch(sub) for p in exclude):
+                    members_of.setdefault(rel, set()).add(cand)
+                    covered.setdefault(cand, set()).add(eco)
+
+    roots: list[ProjectRoot] = []
+    for rel, ev in dirs.items():
+        own = {t: v for t, v in ev.items() if t not in covered.get(rel, ())}
+        if not own:
+            continue
+        roots.append(
+            ProjectRoot(
+                rel=rel,
+                evidence=own,
+                workspaces=tuple(declared.get(rel, ())),
+                members=tuple(sorted(members_of.get(rel, ()))),
+            )
+        )
+    roots.sort(key=lambda r: (r.rel.count("/") if r.rel else -1, r.rel))
+    return roots
+
+
+def select_project_roots(
+    fs: "ProjectFS",
+    detection: Detection,
+    mode: str,
+    *,
+    prune_dirs: Iterable[str] | None = None,
+) -> list[ProjectRoot] | None:
+    """Roots to scan separately, or None to keep the single-root behaviour.
+
+    ``auto`` only looks further when the input root itself has no markers and
+    more than one scannable project turns up; ``all`` always does; ``best``
+    never does.
+    """
+    if mode == "best":
+        return None
+    if mode == "auto" and detection.project_root == fs.display_path(fs.root):
+        return None
+    roots = discover_projects(fs, prune_dirs=prune_dirs)
+    scannable = [r for r in roots if r.scan_types]
+    if len(scannable) > 1 or (mode == "all" and scannable):
+        return roots
+    return None
+
+
+def _parent_of(rel: str, refs: dict[str, str]) -> str | None:
+    """Ref of the nearest enclosing project root."""
+    while rel:
+        rel = posixpath.dirname(rel)
+        if rel in refs:
+            return refs[rel]
+    return None
+
+
+def project_label(fs: "ProjectFS", rel: str) -> str:
+    root = fs.root
+    if root and (rel == root or rel.startswith(f"{root}/")):
+        rel = rel[len(root):].lstrip("/")
+    return rel or "."
+
+
+@dataclass(frozen=True)
+class _Unit:
+    """One project root to scan, in the input itself or in a nested archive."""
+
+    fs: "ProjectFS"
+    root: ProjectRoot
+    label: str
+    ref: str
+    parent: str | None
+    archive: str | None = None
+
+
+def _prefixed(label: str, prefix: str | None) -> str:
+    if not prefix:
+        return label
+    return prefix if label == "." else f"{prefix}{NESTED_SEP}{label}"
+
+
+def _units(fs: "ProjectFS", roots: list[ProjectRoot], nested: "NestedScan | None") -> list[_Unit]:
+    """Roots of the input and of every nested archive, each with its parent project ref."""
+    units: list[_Unit] = []
+    view_refs: dict[str | None, dict[str, str]] = {}
+    archive_parent: dict[str | None, str | None] = {None: None}
+
+    def _add(view: "ProjectFS", view_roots: list[ProjectRoot], archive: str | None, outer: str | None) -> None:
+        refs = {r.rel: f"project:{_prefixed(project_label(view, r.rel), archive)}" for r in view_roots}
+        view_refs[archive] = refs
+        for r in view_roots:
+            units.append(
+                _Unit(
+                    fs=view,
+                    root=r,
+                    label=refs[r.rel][len("project:"):],
+                    ref=refs[r.rel],
+                    parent=_parent_of(r.rel, refs) or outer,
+                    archive=archive,
+                )
+            )
+
+    _add(fs, roots, None, None)
+    for a in nested.archives if nested is not None else ():
+        # 内嵌压缩包挂在所在目录最近的项目下；没有则挂在上一层压缩包的父项目下
+        outer = _parent_of(a.member, view_refs.get(a.parent, {})) or archive_parent.get(a.parent)
+        archive_parent[a.label] = outer
+        _add(a.fs, discover_projects(a.fs), a.label, outer)
+    return units
+
+
+def scan_projects(
+    ctx: "ScanContext",
+    roots: list[ProjectRoot],
+    *,
+    jobs: int | None = None,
+    nested: "NestedScan | None" = None,
+) -> "ScanOutcome":
+    """Scan every root of ``roots`` in parallel and write one hierarchical SBOM.
+
+    Projects inside ``nested`` archives become components of the project that
+    contains the archive. Output goes to ``<results>/workspace/<project>/<ts>/``;
+    each root's analyzer outputs are kept under ``projects/`` next to it.
+    """
+    import shutil
+    from concurrent.futures import ThreadPoolExecutor
+
+    from sca_tools.base import ScanArtifacts
+    from sca_tools.context import open_scan_context
+    from sca_tools.merge import ProjectNode, merge_cyclonedx, nest_cyclonedx
+    from sca_tools.registry import scan_types
+    from sca_tools.utils import read_json, sbom_file_name, slug, ts_compact, unique_output_dir, write_json
+
+    from .cli import ScanOutcome
+
+    started = time.perf_counter()
+    project_name = ctx.project_name
+    out_dir = unique_output_dir(ctx.results_dir / "workspace" / slug(project_name) / ts_compact())
+    units = _units(ctx.fs, roots, nested)
+    # 预估成本高的项目先提交，避免最大的 lock 最后才开始解析而拖长总耗时
+    scannable = sorted((u for u in units if u.root.scan_types), key=lambda u: -u.root.estimate_cost(u.fs))
+
+    def _one(unit: _Unit) -> tuple[dict[str, ScanArtifacts], dict[str, str], dict[str, Any] | None]:
+        with span("project", label=unit.label):
+            root = unit.root
+            det = Detection(
+                project_root=unit.fs.display_path(root.rel),
+                detected_types=root.scan_types,
+                evidence={t: root.evidence[t] for t in root.scan_types},
+            )
+            proj_results = out_dir / "projects" / slug(unit.label.replace("/", "__"))
+            try:
+                with open_scan_context(
+                    ctx.input_path,
+                    proj_results,
+                    cache=ctx.cache,
+                    sbom_format="json-compact",
+                    vulndb=ctx.vulndb,
+                    fs=unit.fs,
+                    detection=det,
+                    strict_root=True,
+                ) as sub:
+                    per_type, errors = scan_types(
+                        detected_types=root.scan_types, input_path=ctx.input_path, results_dir=proj_results, context=sub
+                    )
+            except Exception as e:
+                return {}, {t: f"{type(e).__name__}: {e}" for t in root.scan_types}, None
+            sboms = [read_json(a.sbom_path) for a in per_type.values()]
+            sbom = sboms[0] if len(sboms) == 1 else merge_cyclonedx(sboms, unit.label) if sboms else None
+            return per_type, errors, sbom
+
+    workers = pool_size(max(1, min(jobs or os.cpu_count() or 1, len(scannable) or 1, 8)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sca-project") as pool:
+        results = dict(zip((u.ref for u in scannable), pool.map(bind(_one), scannable)))
+
+    per_type: dict[str, ScanArtifacts] = {}
+    errors: dict[str, str] = {}
+    vulns: list[dict[str, Any]] = []
+    total_packages = 0
+    refs = {u.ref for u in units}
+    nodes: list[ProjectNode] = []
+    details: dict[str, Any] = {}
+    for unit in units:
+        root = unit.root
+        pt, errs, sbom = results.get(unit.ref, ({}, {}, None))
+        name = unit.label
+        for t, a in pt.items():
+            per_type[f"{name}:{t}"] = a
+            try:
+                report = read_json(a.vuln_report_path)
+            except (OSError, ValueError):
+                continue
+            total_packages += int(report.get("total_packages") or 0)
+            vulns.extend({**v, "project": name} for v in report.get("vulnerabilities") or [])
+        for t, msg in errs.items():
+            errors[f"{name}:{t}"] = msg
+        props = [{"name": "sca:path", "value": name}]
+        if unit.archive:
+            props.append({"name": "sca:archive", "value": unit.archive})
+        props.extend({"name": "sca:workspace", "value": k} for k in root.workspaces)
+        if not root.scan_types:
+            props.append({"name": "sca:scanned", "value": "false"})
+        nodes.append(ProjectNode(ref=unit.ref, name=name, parent=unit.parent, sbom=sbom, properties=props))
+        members = [_prefixed(project_label(unit.fs, m), unit.archive) for m in root.members]
+        for member in members:
+            if f"project:{member}" not in refs:
+                nodes.append(
+                    ProjectNode(
+                        ref=f"project:{member}",
+                        name=member,
+                        parent=unit.ref,
+                        sbom=None,
+                        properties=[{"name": "sca:path", "value": member}, {"name": "sca:workspaceMember", "value": "true"}],
+                    )
+                )
+        details[name] = {
+            "detectedTypes": list(root.detected_types),
+            "scannedTypes": sorted(pt),
+            **({"archive": unit.archive} if unit.archive else {}),
+            **({"workspaces": list(root.workspaces)} if root.workspaces else {}),
+            **({"members": members} if members else {}),
+            **({"perType": {t: str(a.output_dir) for t, a in sorted(pt.items())}} if pt else {}),
+            **({"errors": errs} if errs else {}),
+        }
+
+    if not per_type:
+        shutil.rmtree(out_dir, ignore_errors=True)
+        raise RuntimeError("; ".join(f"{k}: {msg}" for k, msg in errors.items()) or "没有可扫描的项目")
+
+    with span("merge"):
+        sbom = nest_cyclonedx(nodes, project_name)
+        sbom_path = out_dir / sbom_file_name(ctx.sbom_format)
+        vuln_report_path = out_dir / "vuln_report.json"
+        details_path = out_dir / "scan_details.json"
+        write_json(sbom_path, sbom, fmt=ctx.sbom_format)
+        write_json(
+            vuln_report_path,
+            {
+                "generated_at": sbom["metadata"]["timestamp"],
+                "tool": "sca-workspace",
+                "total_packages": total_packages,
+                "vulnerabilities_found": len(vulns),
+                "vulnerabilities": vulns,
+            },
+        )
+        write_json(
+            details_path,
+            {
+                "inputPath": str(ctx.input_path),
+                "projects": details,
+                **(
+                    {
+                        "nestedArchives": {
+                            "opened": [a.label for a in nested.archives],
+                            "skipped": nested.skipped,
+                            "bytes": nested.total_bytes,
+                            "members": nested.members,
+                        }
+                    }
+                    if nested is not None
+                    else {}
+                ),
+                "errors": errors,
+                "elapsedSeconds": round(time.perf_counter() - started, 3),
+            },
+        )
+
+    scanned = tuple(sorted({k.rpartition(":")[2] for k in per_type}))
+    evidence: dict[str, list[str]] = {}
+    for unit in units:
+        for t, names in unit.root.evidence.items():
+            sep = NESTED_SEP if unit.label == unit.archive else "/"
+            evidence.setdefault(t, []).extend(n if unit.label == "." else f"{unit.label}{sep}{n}" for n in names)
+    det = Detection(
+        project_root=ctx.fs.display_path(ctx.fs.root),
+        detected_types=tuple(sorted(evidence)),
+        evidence=evidence,
+    )
+    artifacts = ScanArtifacts(out_dir, sbom_path, vuln_report_path, details_path)
+    return ScanOutcome(det, scanned, artifacts, per_type, errors, projects=tuple(u.label for u in scannable))
@@ -1,15 +1,31 @@
 from __future__ import annotations
 
-import shutil
-import zipfile
+import os
+import posixpath
+import re
 from dataclasses import dataclass
 from pathlib import Path
-import os
+from typing import TYPE_CHECKING, Iterable
+
+from sca_tools.tracing import count, pool_size, traced
+
+# zipfile / shutil / 线程池只在真正解压时导入，识别路径不加载
+if TYPE_CHECKING:
+    import zipfile
+
 
 @dataclass(frozen=True)
 class ExtractResult:
     work_dir: Path
     extracted_root: Path
+    files: int = 0
+    bytes_written: int = 0
+    # 被 include/exclude 过滤掉的成员数
+    filtered: int = 0
+
+
+class ArchiveLimitError(ValueError):
+    """An archive opened in memory exceeded its member-count or size budget."""
 
 
 def _should_skip_member(member_name: str) -> bool:
@@ -26,16 +42,158 @@ def _should_skip_member(member_name: str) -> bool:
     return False
 
 
-def _is_within_directory(base_dir: Path, target: Path) -> bool:
-    try:
-        target.resolve().relative_to(base_dir.resolve())
+def normalize_member_name(name: str) -> str:
+    # 某些 zip（尤其 Windows 打包）会使用反斜杠作为分隔符；统一规范化为 /
+    name = name.replace("\\", "/")
+    # 防御：移除前导 /
+    name = name.lstrip("/")
+    return name
+
+
+def is_safe_member_name(norm: str) -> bool:
+    """Pure string Zip Slip check for an already normalized member name."""
+    if not norm:
         return True
-    except Exception:
+    # Windows 盘符（C:/...）同样视为越界
+    if len(norm) >= 2 and norm[1] == ":":
         return False
+    collapsed = posixpath.normpath(norm)
+    return collapsed != ".." and not collapsed.startswith("../")
+
+
+def guess_archive_root(names: Iterable[str]) -> str:
+    """Root directory of an archive from its normalized member names.
+
+    Returns the single top-level directory (without trailing /) or "".
+    """
+    top_dirs: set[str] = set()
+    for name in names:
+        head, sep, _rest = name.partition("/")
+        if not sep:
+            # 顶层存在文件
+            return ""
+        top_dirs.add(head)
+        if len(top_dirs) > 1:
+            return ""
+    return next(iter(top_dirs)) if top_dirs else ""
+
+
+def _glob_segment(seg: str) -> str:
+    out: list[str] = []
+    i = 0
+    while i < len(seg):
+        c = seg[i]
+        if c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[" and "]" in seg[i + 2 :]:
+            j = seg.index("]", i + 2)
+            body = seg[i + 1 : j]
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            out.append("[" + body.replace("\\", "\\\\") + "]")
+            i = j
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+def compile_glob(pattern: str, *, anchored: bool = True) -> re.Pattern[str]:
+    """Path glob -> regex for ``fullmatch`` on normalized posix paths.
+
+    ``*`` / ``?`` stay inside one segment, ``**`` spans any number of
+    segments and a trailing ``/`` means "everything below". Unanchored
+    patterns may match at any depth (``node_modules/**`` also hits
+    ``a/node_modules/x``) unless they start with ``/``.
+    """
+    pat = pattern.strip().replace("\\", "/")
+    if pat.startswith("/"):
+        anchored = True
+    while pat.startswith("./"):
+        pat = pat[2:]
+    if pat.endswith("/"):
+        pat += "**"
+    segs = [s for s in pat.strip("/").split("/") if s and s != "."]
+    body = ""
+    for i, seg in enumerate(segs):
+        last = i == len(segs) - 1
+        if seg == "**":
+            body += ".*" if last else "(?:[^/]+/)*"
+        else:
+            body += _glob_segment(seg) + ("" if last else "/")
+    return re.compile(body if anchored else "(?:[^/]+/)*" + body)
+
+
+# 大于该大小的成员交给线程池写出（zlib 解压时释放 GIL），小文件在主线程顺序写出
+PARALLEL_MEMBER_BYTES = 1024 * 1024
+_COPY_BUFSIZE = 1024 * 1024
 
 
-def safe_extract_zip(zip_path: Path, work_dir: Path) -> ExtractResult:
-    """Safely extract zip to work_dir, preventing Zip Slip."""
+def _read_umask() -> int:
+    # os.umask 只能先改再恢复，而 umask 是进程级的：serve/shell 中其他线程恰在此时创建的文件
+    # 会得到 0o666。Linux 上从 /proc 只读获取；其他平台只在首次解压时交换一次
+    try:
+        with open("/proc/self/status", encoding="ascii", errors="replace") as fp:
+            for line in fp:
+                if line.startswith("Umask:"):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError, IndexError):
+        pass
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+_file_mode: int | None = None
+
+
+def _default_file_mode() -> int:
+    """Mode new files get under the umask (read once); members with this mode skip the chmod."""
+    global _file_mode
+    if _file_mode is None:
+        _file_mode = 0o666 & ~_read_umask()
+    return _file_mode
+
+
+def _write_member(zf: zipfile.ZipFile, info: zipfile.ZipInfo, dest: str, mode: int) -> int:
+    import shutil
+
+    with zf.open(info, "r") as src, open(dest, "wb") as dst:
+        if info.file_size < PARALLEL_MEMBER_BYTES:
+            dst.write(src.read())
+        else:
+            shutil.copyfileobj(src, dst, _COPY_BUFSIZE)
+    if mode:
+        try:
+            os.chmod(dest, mode)
+        except OSError:
+            pass
+    return info.file_size
+
+
+@traced("extract")
+def safe_extract_zip(
+    zip_path: Path,
+    work_dir: Path,
+    *,
+    include: Iterable[str] | None = None,
+    exclude: Iterable[str] | None = None,
+    jobs: int | None = None,
+) -> ExtractResult:
+    """Safely extract zip to work_dir, preventing Zip Slip.
+
+    Every member is validated by string normalization before anything is
+    written; directories are created once each, parents first. ``include`` /
+    ``exclude`` are globs (see ``compile_glob``, unanchored) matched against
+    the member path, e.g. ``exclude=["node_modules/**", "target/**", "*.png"]``.
+    Members of ``PARALLEL_MEMBER_BYTES`` or more are written on ``jobs``
+    threads, streamed in fixed-size chunks.
+    """
+    import zipfile
+    from concurrent.futures import ThreadPoolExecutor
+
     zp = zip_path.resolve()
     if not zp.exists():
         raise FileNotFoundError(f"zip 不存在: {zp}")
@@ -44,64 +202,80 @@ def safe_extract_zip(zip_path: Path, work_dir: Path) -> ExtractResult:
 
     work = work_dir.resolve()
     work.mkdir(parents=True, exist_ok=True)
+    inc = [compile_glob(p, anchored=False) for p in include or ()]
+    exc = [compile_glob(p, anchored=False) for p in exclude or ()]
+    default_mode = _default_file_mode()
 
     with zipfile.ZipFile(zp, "r") as zf:
-        members = [m for m in zf.infolist() if not _should_skip_member(m.filename)]
-
-        def _normalized_name(name: str) -> str:
-            # 某些 zip（尤其 Windows 打包）会使用反斜杠作为分隔符；统一规范化为 /
-            name = name.replace("\\", "/")
-            # 防御：移除前导 /
-            name = name.lstrip("/")
-            return name
-
-        # 先校验所有成员，防 Zip Slip
-        for member in members:
-            norm = _normalized_name(member.filename)
-            dest = work / norm
-            if not _is_within_directory(work, dest):
-                raise ValueError(f"zip 包含非法路径(Zip Slip): {member.filename}")
-
-        # 逐个手工解压到规范化后的路径（避免 zipfile.extract 把 '\' 当普通字符）
-        for member in members:
-            norm = _normalized_name(member.filename)
-            out_path = work / norm
-
-            # 目录项
-            if member.is_dir() or norm.endswith("/"):
-                out_path.mkdir(parents=True, exist_ok=True)
+        # 先校验、过滤全部成员（防 Zip Slip，纯字符串判断，不访问文件系统）
+        files: list[tuple[zipfile.ZipInfo, str]] = []
+        dirs: set[str] = set()
+        filtered = 0
+        for info in zf.infolist():
+            if _should_skip_member(info.filename):
                 continue
+            norm = normalize_member_name(info.filename)
+            if not is_safe_member_name(norm):
+                raise ValueError(f"zip 包含非法路径(Zip Slip): {info.filename}")
+            rel = posixpath.normpath(norm) if norm else "."
+            if rel == ".":
+                continue
+            if info.is_dir() or norm.endswith("/"):
+                if not any(r.fullmatch(rel + "/") for r in exc):
+                    dirs.add(rel)
+                continue
+            if (inc and not any(r.fullmatch(rel) for r in inc)) or any(r.fullmatch(rel) for r in exc):
+                filtered += 1
+                continue
+            files.append((info, rel))
+            parent = posixpath.dirname(rel)
+            if parent:
+                dirs.add(parent)
 
-            out_path.parent.mkdir(parents=True, exist_ok=True)
-            with zf.open(member, "r") as src, open(out_path, "wb") as dst:
-                shutil.copyfileobj(src, dst)
-
-            # best-effort: restore executable bit if present (unix)
+        # 每个目录只创建一次：补齐祖先目录后按路径排序，父目录总在子目录之前
+        for d in list(dirs):
+            while True:
+                d = posixpath.dirname(d)
+                if not d or d in dirs:
+                    break
+                dirs.add(d)
+        base = str(work)
+        for d in sorted(dirs):
             try:
-                mode = (member.external_attr >> 16) & 0o777
-                if mode:
-                    os.chmod(out_path, mode)
-            except Exception:
+                os.mkdir(os.path.join(base, d))
+            except FileExistsError:
                 pass
 
-    extracted_root = _guess_extracted_root(work)
-    return ExtractResult(work_dir=work, extracted_root=extracted_root)
-
+        written = 0
+        large: list[tuple[zipfile.ZipInfo, str, int]] = []
+        for info, rel in files:
+            mode = (info.external_attr >> 16) & 0o777
+            # 与默认权限相同时不再 chmod
+            mode = mode if mode and mode != default_mode else 0
+            dest = os.path.join(base, rel)
+            if info.file_size >= PARALLEL_MEMBER_BYTES:
+                large.append((info, dest, mode))
+            else:
+                written += _write_member(zf, info, dest, mode)
+        if large:
+            workers = pool_size(max(1, min(jobs or os.cpu_count() or 1, len(large), 8)))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sca-unzip") as pool:
+                for n in pool.map(lambda job: _write_member(zf, *job), large):
+                    written += n
 
-def _guess_extracted_root(work_dir: Path) -> Path:
-    """Try to return the 'real' project root inside extracted dir.
-
-    - If there's exactly one top-level directory: use it
-    - Else: use work_dir itself
-    """
-    entries = [p for p in work_dir.iterdir() if p.name not in {".DS_Store"}]
-    top_dirs = [p for p in entries if p.is_dir()]
-    top_files = [p for p in entries if p.is_file()]
-    if len(top_dirs) == 1 and not top_files:
-        return top_dirs[0]
-    return work_dir
+    count(bytesRead=zp.stat().st_size, bytesWritten=written, filesExtracted=len(files))
+    root = guess_archive_root(rel for _info, rel in files)
+    return ExtractResult(
+        work_dir=work,
+        extracted_root=work / root if root else work,
+        files=len(files),
+        bytes_written=written,
+        filtered=filtered,
+    )
 
 
 def cleanup_work_dir(work_dir: Path) -> None:
+    import shutil
+
     if work_dir.exists():
         shutil.rmtree(work_dir, ignore_errors=True)